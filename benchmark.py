@@ -0,0 +1,326 @@
+import os
+import sys
+import glob
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BASE_DIR, "benchmark_baseline.json")
+
+SCALES = {
+    "small": {"systems": 40, "regions": 15, "routes": 4000, "users": 10},
+    "medium": {"systems": 150, "regions": 50, "routes": 40000, "users": 100},
+    "full": {"systems": 500, "regions": 100, "routes": 200000, "users": 1000},
+}
+
+# name, command (relative to the synthetic PhotoUserData checkout)
+STAGES = [
+    ("snapshot", ["photodata_snapshot.py"]),
+    ("validate_all", ["validate.py"]),
+    ("generate_pages", ["per_system_pages.py"]),
+    ("validate_counties", ["validate_counties.py"]),
+    ("route_index", ["route_index.py"]),
+    ("history", ["history.py"]),
+    ("incremental_noop", ["build.py", "--incremental"]),
+]
+
+# Scripts without a --jobs option
+SERIAL_SCRIPTS = ("photodata_snapshot.py", "route_index.py", "history.py")
+
+# Differences below these are treated as noise when comparing to baseline
+NOISE_FLOOR = {"seconds": 0.2, "peak_rss_mb": 5.0}
+
+
+# ---------------- Synthetic data ----------------
+
+def write_rows(path, header, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(";".join(header) + "\n")
+        for row in rows:
+            f.write(";".join(row) + "\n")
+
+
+def generate_tree(root, systems, regions, routes, users, coverage=0.3, seed=1):
+    """
+    Writes a synthetic PhotoData/ + PhotoUserData/ pair under root, laid
+    out exactly like the real checkouts, with the scripts copied in.
+
+    Returns:
+      path of the synthetic PhotoUserData directory
+    """
+    rng = random.Random(seed)
+
+    data_dir = os.path.join(root, "PhotoData")
+    user_dir = os.path.join(root, "PhotoUserData")
+
+    for sub in ("_systems", "_regions", "_counties"):
+        os.makedirs(os.path.join(data_dir, sub), exist_ok=True)
+    os.makedirs(os.path.join(user_dir, "list_files"), exist_ok=True)
+
+    region_codes = [f"R{i:03d}" for i in range(regions)]
+    system_codes = [f"sys{i:03d}" for i in range(systems)]
+
+    write_rows(
+        os.path.join(data_dir, "regions.csv"),
+        ["code", "name", "country", "continent", "regionType"],
+        [[code, f"Region {code}", "USA", "NA", "state"] for code in region_codes]
+    )
+    write_rows(
+        os.path.join(data_dir, "systems.csv"),
+        ["System", "CountryCode", "Name", "Color", "Level", "Tier"],
+        [[code, "USA", f"System {code}", "blue", "active", "1"] for code in system_codes]
+    )
+
+    # Route names repeat across regions within a system, like interstates
+    by_system = {code: [] for code in system_codes}
+    by_region = {code: [] for code in region_codes}
+    pairs = set()
+
+    while len(pairs) < routes:
+        system = rng.choice(system_codes)
+        region = rng.choice(region_codes)
+        route = f"{system.upper()}-{rng.randrange(routes // systems * 2 + 1)}"
+
+        if (region, route) in pairs:
+            continue
+
+        pairs.add((region, route))
+        by_system[system].append((region, route))
+        by_region[region].append((system, route))
+
+    for system, rows in by_system.items():
+        write_rows(
+            os.path.join(data_dir, "_systems", f"{system}.csv"),
+            ["System", "Region", "Route", "Banner", "Abbrev", "City"],
+            [[system, region, route, "", "", ""] for region, route in rows]
+        )
+
+    for region, rows in by_region.items():
+        rng.shuffle(rows)
+        write_rows(
+            os.path.join(data_dir, "_regions", f"{region}.csv"),
+            ["System", "Region", "Route"],
+            [[system, region, route] for system, route in rows]
+        )
+
+        counties = [f"County {i}" for i in range(max(1, len(rows) // 20))]
+        county_rows = []
+        for _, route in rows:
+            for county in rng.sample(counties, min(len(counties), rng.choice((1, 1, 2)))):
+                county_rows.append([region, route, county])
+
+        write_rows(
+            os.path.join(data_dir, "_counties", f"{region}_counties.csv"),
+            ["Region", "Route", "County"],
+            county_rows
+        )
+
+    all_pairs = sorted(pairs)
+
+    for i in range(users):
+        caught = rng.sample(all_pairs, int(len(all_pairs) * coverage * rng.random()))
+
+        with open(os.path.join(user_dir, "list_files", f"user{i:04d}.list"), "w", encoding="utf-8") as f:
+            f.write("## Last Updated 1 January 2026 ##\n\n")
+            for region, route in caught:
+                if rng.random() < 0.3:
+                    f.write(f"{region} {route} https://example.com/{region}/{route}.jpg\n")
+                else:
+                    f.write(f"{region} {route}\n")
+            f.write(f"{region_codes[0]} NOSUCHROUTE\n")
+
+    # Modules resolve paths from their own location. Copies, not symlinks:
+    # Python puts a symlinked script's *real* directory on sys.path, so the
+    # imported modules would read and write the real checkout instead
+    for script in glob.glob(os.path.join(BASE_DIR, "*.py")):
+        shutil.copy2(script, os.path.join(user_dir, os.path.basename(script)))
+
+    return user_dir
+
+
+# ---------------- Measurement ----------------
+
+def output_state(output_dir):
+    state = {}
+
+    for dirpath, dirnames, filenames in os.walk(output_dir):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for filename in filenames:
+            if filename.endswith(".html"):
+                path = os.path.join(dirpath, filename)
+                state[path] = os.stat(path).st_mtime_ns
+
+    return state
+
+
+def run_stage(user_dir, command, jobs):
+    """
+    Runs one script in the synthetic checkout, with --timings.
+
+    Returns:
+      dict with seconds, peak_rss_mb, pages written and timings (the
+      script's own instrument stage table)
+    """
+    output_dir = os.path.join(user_dir, "outputs")
+    before = output_state(output_dir)
+    timings_path = os.path.join(os.path.dirname(user_dir), "timings.json")
+
+    args = [sys.executable, os.path.join(user_dir, command[0]), *command[1:], "--timings", timings_path]
+    if command[0] not in SERIAL_SCRIPTS:
+        args += ["--jobs", str(jobs)]
+
+    start = time.perf_counter()
+    with open(os.devnull, "w") as devnull:
+        proc = subprocess.Popen(args, cwd=user_dir, stdout=devnull)
+        _, status, usage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - start
+
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise RuntimeError(f"{' '.join(command)} failed with status {status}")
+
+    after = output_state(output_dir)
+    pages = sum(1 for path, mtime in after.items() if before.get(path) != mtime)
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak_rss = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+    with open(timings_path, encoding="utf-8") as f:
+        timings = json.load(f)["stages"]
+    os.remove(timings_path)
+
+    return {
+        "seconds": round(seconds, 3),
+        "peak_rss_mb": round(peak_rss, 1),
+        "pages": pages,
+        "pages_per_sec": round(pages / seconds, 1) if seconds else 0.0,
+        "timings": {name: round(value, 3) for name, value in timings.items()},
+    }
+
+
+def run_benchmark(params, jobs=1, keep=None):
+    root = keep or tempfile.mkdtemp(prefix="photo_bench_")
+
+    try:
+        start = time.perf_counter()
+        user_dir = generate_tree(root, **params)
+        generate_seconds = time.perf_counter() - start
+
+        stages = {}
+        for name, command in STAGES:
+            stages[name] = run_stage(user_dir, command, jobs)
+            print(
+                f"  {name:<18} {stages[name]['seconds']:>8.2f}s "
+                f"{stages[name]['peak_rss_mb']:>8.1f} MB "
+                f"{stages[name]['pages']:>8} pages "
+                f"{stages[name]['pages_per_sec']:>9.1f} pages/s"
+            )
+            for inner, value in sorted(stages[name]["timings"].items(), key=lambda t: t[1], reverse=True):
+                print(f"    {inner:<26} {value:>8.3f}s")
+    finally:
+        if not keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    full = [stages[name] for name, _ in STAGES if name not in ("snapshot", "incremental_noop")]
+    total_seconds = sum(stage["seconds"] for stage in full)
+    total_pages = sum(stage["pages"] for stage in full)
+
+    return {
+        "params": params,
+        "jobs": jobs,
+        "generate_seconds": round(generate_seconds, 3),
+        "stages": stages,
+        "end_to_end": {
+            "seconds": round(total_seconds, 3),
+            "pages": total_pages,
+            "pages_per_sec": round(total_pages / total_seconds, 1) if total_seconds else 0.0,
+            "peak_rss_mb": max(stage["peak_rss_mb"] for stage in full),
+        },
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """
+    Returns:
+      list of human-readable regressions (empty when within tolerance)
+    """
+    regressions = []
+
+    if baseline.get("params") != report["params"] or baseline.get("jobs") != report["jobs"]:
+        return [f"baseline was recorded with {baseline.get('params')} / jobs={baseline.get('jobs')}"]
+
+    for name, stage in report["stages"].items():
+        old = baseline["stages"].get(name)
+        if not old:
+            continue
+
+        for metric in ("seconds", "peak_rss_mb"):
+            if (
+                old[metric]
+                and stage[metric] > old[metric] * (1 + tolerance)
+                and stage[metric] - old[metric] > NOISE_FLOOR[metric]
+            ):
+                regressions.append(
+                    f"{name}: {metric} {stage[metric]} vs baseline {old[metric]} "
+                    f"(+{(stage[metric] / old[metric] - 1) * 100:.0f}%)"
+                )
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the page generators on synthetic data.")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--systems", type=int)
+    parser.add_argument("--regions", type=int)
+    parser.add_argument("--routes", type=int)
+    parser.add_argument("--users", type=int)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--jobs", type=int, default=1, metavar="N")
+    parser.add_argument("--report", metavar="PATH", help="write the JSON report here")
+    parser.add_argument("--keep", metavar="DIR", help="generate into DIR and keep it")
+    parser.add_argument("--save-baseline", action="store_true", help=f"store the result as {os.path.basename(BASELINE_PATH)}")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (default 0.25 = 25%%)")
+    args = parser.parse_args()
+
+    params = dict(SCALES[args.scale])
+    for key in params:
+        if getattr(args, key) is not None:
+            params[key] = getattr(args, key)
+    params["seed"] = args.seed
+
+    print(f"Benchmark: {params}, jobs={args.jobs}")
+    report = run_benchmark(params, jobs=args.jobs, keep=args.keep)
+
+    e2e = report["end_to_end"]
+    print(
+        f"  {'end_to_end':<18} {e2e['seconds']:>8.2f}s {e2e['peak_rss_mb']:>8.1f} MB "
+        f"{e2e['pages']:>8} pages {e2e['pages_per_sec']:>9.1f} pages/s"
+    )
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {BASELINE_PATH}")
+
+    elif os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        regressions = compare_to_baseline(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"⚠️  {line}")
+
+        if regressions:
+            sys.exit(1)
+
+        print("No regressions against baseline.")
@@ -0,0 +1,251 @@
+import os
+import argparse
+
+import instrument
+from list_parser import parse_list
+import validate
+import per_system_pages
+import validate_counties
+import precompress
+import completion_store
+import history
+import route_index
+
+
+def cached_list_reader():
+    """
+    Returns:
+      read_list(path, known=None) -> list_parser.parse_list result, parsing
+      each .list file at most once per build no matter how many stages use
+      it. A call with a different `known` route set re-parses, so unknown
+      routes are always checked against the caller's set; a call without
+      one reuses whatever is cached.
+    """
+    cache = {}
+
+    def read_list(path, known=None):
+        # Stages reach the same list through different relative paths
+        # (validate_counties goes through ../PhotoUserData/list_files)
+        key = os.path.realpath(path)
+        cached = cache.get(key)
+
+        if cached is None or (known is not None and cached[0] is not known):
+            cached = cache[key] = (known, *parse_list(path, known))
+
+        return cached[1], cached[2]
+
+    return read_list
+
+
+# ---------------- Stages ----------------
+#
+# Each stage takes the build context and runs one of the page generators
+# with the shared list reader.
+
+
+def summary_stage(ctx):
+    validate.validate_all(
+        incremental=ctx["incremental"],
+        leaderboard_top=ctx["leaderboard_top"],
+        leaderboard_page_size=ctx["leaderboard_page_size"],
+        jobs=ctx["jobs"],
+        read_list=ctx["read_list"],
+        data=ctx["catalogs"].get("summary")
+    )
+
+
+def pages_stage(ctx):
+    per_system_pages.generate_pages(
+        incremental=ctx["incremental"],
+        jobs=ctx["jobs"],
+        read_list=ctx["read_list"],
+        catalog=ctx["catalogs"].get("pages"),
+        output_format=ctx["pages_format"],
+        compress=ctx["gzip"]
+    )
+
+
+def counties_stage(ctx):
+    validate_counties.validate_counties(
+        incremental=ctx["incremental"],
+        jobs=ctx["jobs"],
+        read_list=ctx["read_list"],
+        county_tables=ctx["catalogs"].get("counties")
+    )
+
+
+def routes_stage(ctx):
+    route_index.build_route_index(
+        incremental=ctx["incremental"],
+        read_list=ctx["read_list"],
+        catalog=ctx["catalogs"].get("routes")
+    )
+
+
+def history_stage(ctx):
+    history.record_history(
+        incremental=ctx["incremental"],
+        read_list=ctx["read_list"],
+        catalog=ctx["catalogs"].get("history")
+    )
+
+
+def store_stage(ctx):
+    conn = completion_store.open_store()
+    loaded, removed, unchanged = completion_store.sync_store(conn, read_list=ctx["read_list"])
+    conn.close()
+
+    print(f"🗄  {loaded} files loaded, {removed} removed, {unchanged} unchanged")
+
+
+def compress_stage(ctx):
+    precompress.precompress()
+
+
+STAGES = {
+    "summary": summary_stage,
+    "pages": pages_stage,
+    "counties": counties_stage,
+    "routes": routes_stage,
+    "history": history_stage,
+    "store": store_stage,
+    "compress": compress_stage,
+}
+
+# store and compress are opt-in: --stages summary,pages,counties,routes,history,store
+DEFAULT_STAGES = ("summary", "pages", "counties", "routes", "history")
+
+CATALOG_LOADERS = {
+    "summary": validate.load_validation_data,
+    "pages": per_system_pages.load_route_catalog,
+    "counties": validate_counties.load_county_tables,
+    "routes": per_system_pages.load_route_catalog,
+    "history": per_system_pages.load_route_catalog,
+}
+
+
+def load_catalogs(stages):
+    """
+    Returns:
+      stage name -> its preloaded PhotoData catalog, for build(catalogs=...);
+      stages with the same loader (pages, routes) share one catalog
+    """
+    loaded = {}
+    catalogs = {}
+
+    for name, loader in CATALOG_LOADERS.items():
+        if name in stages:
+            if loader not in loaded:
+                loaded[loader] = loader()
+            catalogs[name] = loaded[loader]
+
+    return catalogs
+
+
+def build(
+    stages=DEFAULT_STAGES,
+    incremental=False,
+    jobs=1,
+    leaderboard_top=None,
+    leaderboard_page_size=None,
+    pages_format="html",
+    gzip=False,
+    catalogs=None
+):
+    """
+    Runs the selected stages in pipeline order, parsing every .list file
+    once for all of them.
+
+    catalogs:
+      see load_catalogs; stages without one load their own
+    """
+    ctx = {
+        "incremental": incremental,
+        "jobs": jobs,
+        "leaderboard_top": leaderboard_top,
+        "leaderboard_page_size": leaderboard_page_size,
+        "pages_format": pages_format,
+        "gzip": gzip,
+        "read_list": cached_list_reader(),
+        "catalogs": catalogs or {},
+    }
+
+    for name, stage in STAGES.items():
+        if name in stages:
+            print(f"\n==== {name} ====")
+            stage(ctx)
+
+
+def parse_stages(value):
+    stages = [name.strip() for name in value.split(",") if name.strip()]
+
+    unknown = [name for name in stages if name not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage(s): {', '.join(unknown)} "
+            f"(choose from {', '.join(STAGES)})"
+        )
+
+    return stages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build every output page in one pass.")
+    parser.add_argument(
+        "--stages",
+        type=parse_stages,
+        default=list(DEFAULT_STAGES),
+        help=f"comma-separated stages to run, from {','.join(STAGES)} "
+             f"(default: {','.join(DEFAULT_STAGES)})"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild users whose .list file changed since the last run"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="build users in N worker processes"
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        metavar="N",
+        help="only list the N highest-ranked users on the leaderboard"
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        metavar="N",
+        help="split the leaderboard into pages of N users"
+    )
+    parser.add_argument(
+        "--pages-format",
+        choices=["html", "json"],
+        default="html",
+        help="output of the pages stage (see per_system_pages.py --format)"
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="gzip the JSON payloads (with --pages-format json)"
+    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    instrument.start(args)
+
+    build(
+        stages=args.stages,
+        incremental=args.incremental,
+        jobs=args.jobs,
+        leaderboard_top=args.top,
+        leaderboard_page_size=args.page_size,
+        pages_format=args.pages_format,
+        gzip=args.gzip
+    )
+
+    instrument.finish(args.timings)
@@ -0,0 +1,178 @@
+import os
+import json
+import hashlib
+
+import instrument
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, ".build_cache")
+
+MANIFEST_VERSION = 2
+
+# Manifests this process saved, by path: (mtime_ns, size, manifest). A
+# long-running process (watch.py) gets them back without re-reading the
+# JSON as long as nothing else rewrote the file.
+_SAVED = {}
+
+# What each manifest file held when this process last loaded or saved
+# it, by path: (mtime_ns, size, sha1 of the JSON). save_manifest() skips
+# the write when the file is untouched since and the JSON is the same.
+_ON_DISK = {}
+
+
+def manifest_path(name):
+    return os.path.join(CACHE_DIR, f"{name}_manifest.json")
+
+
+def new_manifest():
+    return {"version": MANIFEST_VERSION, "data": {}, "users": {}}
+
+
+def load_manifest(name):
+    """
+    Loads the manifest written by the previous run of a script.
+    A missing or unreadable manifest is treated as "nothing built yet".
+    """
+    with instrument.stage("manifest.load"):
+        return read_manifest(manifest_path(name))
+
+
+def read_manifest(path):
+    if not os.path.exists(path):
+        return new_manifest()
+
+    saved = _SAVED.get(path)
+    if saved is not None:
+        stat = os.stat(path)
+        if saved[:2] == (stat.st_mtime_ns, stat.st_size):
+            return saved[2]
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        manifest = json.loads(text)
+    except (OSError, ValueError):
+        return new_manifest()
+
+    instrument.record_read(path)
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        return new_manifest()
+
+    _ON_DISK[path] = file_state(path, text)
+    return manifest
+
+
+def save_manifest(name, manifest):
+    """
+    Writes the manifest as compact JSON, unless the file already holds
+    exactly this manifest (a no-op incremental run rewrites nothing).
+    """
+    path = manifest_path(name)
+
+    with instrument.stage("manifest.save"):
+        text = json.dumps(manifest, separators=(",", ":"))
+
+        if os.path.exists(path) and _ON_DISK.get(path) == file_state(path, text):
+            return
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = path + ".tmp"
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+        os.replace(tmp_path, path)
+        instrument.record_write(path)
+
+        stat = os.stat(path)
+        _SAVED[path] = (stat.st_mtime_ns, stat.st_size, manifest)
+        _ON_DISK[path] = file_state(path, text)
+
+
+def file_state(path, text):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size, hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+def manifest_key(path):
+    return os.path.relpath(path, BASE_DIR).replace(os.sep, "/")
+
+
+def file_fingerprint(path, previous=None):
+    """
+    Returns:
+      {"mtime": mtime_ns, "size": bytes, "sha1": hex digest}
+
+    The file is only re-hashed when its mtime or size differ from the
+    previous fingerprint, so an unchanged tree costs one stat per file.
+    """
+    st = os.stat(path)
+
+    if (
+        previous
+        and previous.get("mtime") == st.st_mtime_ns
+        and previous.get("size") == st.st_size
+    ):
+        return previous
+
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+
+    return {"mtime": st.st_mtime_ns, "size": st.st_size, "sha1": h.hexdigest()}
+
+
+def same_content(a, b):
+    return bool(a) and bool(b) and a.get("sha1") == b.get("sha1")
+
+
+def script_files(*names):
+    """
+    Returns:
+      paths of the named modules next to this one, so a script can
+      fingerprint the shared code its pages depend on along with itself
+    """
+    return [os.path.join(BASE_DIR, f"{name}.py") for name in names]
+
+
+def source_files(dirs=(), files=()):
+    """
+    Returns:
+      sorted list of every .csv under dirs plus the given files that exist
+    """
+    paths = []
+
+    for directory in dirs:
+        if not os.path.isdir(directory):
+            continue
+
+        for filename in os.listdir(directory):
+            if filename.endswith(".csv"):
+                paths.append(os.path.join(directory, filename))
+
+    for path in files:
+        if os.path.exists(path):
+            paths.append(path)
+
+    return sorted(paths)
+
+
+def fingerprint_sources(paths, previous):
+    """
+    Returns:
+      manifest_key -> fingerprint for every path
+    """
+    return {
+        manifest_key(path): file_fingerprint(path, previous.get(manifest_key(path)))
+        for path in paths
+    }
+
+
+def sources_changed(old, new):
+    if old.keys() != new.keys():
+        return True
+
+    return any(not same_content(old[key], new[key]) for key in new)
@@ -0,0 +1,276 @@
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:  # optional: fall back to per-user bitsets
+    np = None
+
+from route_bitsets import user_route_bitsets, count_range, new_bitset, set_bit, has_bit
+
+
+def group_index(id_ranges):
+    """
+    id_ranges:
+      group -> (start, stop), contiguous and in ID order
+
+    Returns:
+      array mapping every ID to its group's column
+    """
+    sizes = [stop - start for start, stop in id_ranges.values()]
+    return np.repeat(np.arange(len(sizes)), sizes)
+
+
+def sparse_product(rows, cols, id_groups, n_users, n_groups):
+    """
+    (users × IDs incidence, given as coordinates) @ (IDs × groups membership).
+
+    Every ID belongs to exactly one group, so the membership matrix is one-hot
+    and the product reduces to counting (user, group) cells with bincount.
+    Repeated (user, ID) coordinates are counted once.
+    """
+    n_ids = max(len(id_groups), 1)
+
+    cells = np.unique(np.asarray(rows, dtype=np.int64) * n_ids + np.asarray(cols, dtype=np.int64))
+    rows, cols = np.divmod(cells, n_ids)
+
+    counts = np.bincount(
+        rows * n_groups + id_groups[cols],
+        minlength=n_users * n_groups
+    )
+    return counts.reshape(n_users, n_groups)
+
+
+def build_completion_tables(route_table, user_pairs):
+    """
+    Scores every user against every system and region in one go.
+
+    route_table:
+      see route_bitsets.build_route_table
+    user_pairs:
+      list of (user_id, iterable of (region, route))
+
+    Returns dict:
+      users:          user_ids, in row order
+      systems:        system files, in column order
+      regions:        region codes, in column order
+      system_caught:  users × systems caught counts
+      region_caught:  users × regions caught counts
+      route_caught:   per-user number of caught region routes
+
+    Uses NumPy when it is installed, per-user bitsets otherwise; both give
+    the same counts.
+    """
+    users = [user_id for user_id, _ in user_pairs]
+    systems = list(route_table["system_ranges"])
+    regions = list(route_table["region_ranges"])
+
+    tables = {"users": users, "systems": systems, "regions": regions}
+
+    if np is None:
+        system_caught = []
+        region_caught = []
+
+        for _, pairs in user_pairs:
+            region_bits, system_bits = user_route_bitsets(route_table, pairs)
+            system_caught.append([
+                count_range(system_bits, id_range)
+                for id_range in route_table["system_ranges"].values()
+            ])
+            region_caught.append([
+                count_range(region_bits, id_range)
+                for id_range in route_table["region_ranges"].values()
+            ])
+
+        tables.update(
+            system_caught=system_caught,
+            region_caught=region_caught,
+            route_caught=[sum(row) for row in region_caught],
+        )
+        return tables
+
+    route_ids = route_table["route_ids"]
+    region_rows, region_cols = [], []
+    system_rows, system_cols = [], []
+
+    for row, (_, pairs) in enumerate(user_pairs):
+        for key in pairs:
+            ids = route_ids.get(key)
+            if ids is None:
+                continue
+
+            region_id, system_id = ids
+            if region_id >= 0:
+                region_rows.append(row)
+                region_cols.append(region_id)
+            if system_id >= 0:
+                system_rows.append(row)
+                system_cols.append(system_id)
+
+    system_caught = sparse_product(
+        system_rows, system_cols,
+        group_index(route_table["system_ranges"]),
+        len(users), len(systems)
+    )
+    region_caught = sparse_product(
+        region_rows, region_cols,
+        group_index(route_table["region_ranges"]),
+        len(users), len(regions)
+    )
+
+    tables.update(
+        system_caught=system_caught.tolist(),
+        region_caught=region_caught.tolist(),
+        route_caught=region_caught.sum(axis=1).tolist(),
+    )
+    return tables
+
+
+def completion_summary(tables, kind, row, totals, names):
+    """
+    kind:
+      "system" or "region"
+    row:
+      the user's row in tables["users"]
+    totals:
+      group -> total routes
+    names:
+      group -> display name
+
+    Returns:
+      list of (name, matched, total, pct) for every group with at least
+      one catch, highest completion first
+    """
+    summary = []
+
+    for group, matched in zip(tables[f"{kind}s"], tables[f"{kind}_caught"][row]):
+        total = totals[group]
+        pct = (matched / total * 100) if total else 0.0
+
+        if matched > 0:
+            summary.append((names[group], matched, total, pct))
+
+    summary.sort(key=lambda r: r[3], reverse=True)
+    return summary
+
+
+def leaderboard_rows(tables, total_routes):
+    """
+    Returns:
+      list of (user_id, caught, total, pct) in row order
+    """
+    return [
+        (
+            user_id,
+            caught,
+            total_routes,
+            caught / total_routes * 100 if total_routes else 0.0,
+        )
+        for user_id, caught in zip(tables["users"], tables["route_caught"])
+    ]
+
+
+def build_county_tables(county_tables, user_pairs, regions=None):
+    """
+    Scores every user against every county at once.
+
+    county_tables:
+      see validate_counties.load_county_tables
+    user_pairs:
+      list of (user_id, iterable of (region, route))
+    regions:
+      only score these states (default: all of them)
+
+    Returns dict:
+      users:  user_ids, in row order
+      states: region -> list with one (caught, flags) per user, where caught
+              holds the per-county caught counts and flags has one byte
+              (1 = caught) per county route, with the county route lists
+              concatenated in order
+    """
+    users = [user_id for user_id, _ in user_pairs]
+    route_ids = county_tables["route_ids"]
+    states = {}
+
+    selected = [
+        (region, county_ids)
+        for region, (_, county_ids) in county_tables["states"].items()
+        if regions is None or region in regions
+    ]
+
+    if np is None:
+        user_bits = []
+
+        for _, pairs in user_pairs:
+            bits = new_bitset(len(route_ids))
+            for key in pairs:
+                route_id = route_ids.get(key)
+                if route_id is not None:
+                    set_bit(bits, route_id)
+            user_bits.append(bits)
+
+        for region, county_ids in selected:
+            members = list(chain.from_iterable(county_ids.values()))
+            per_user = []
+
+            for bits in user_bits:
+                flags = bytes(has_bit(bits, route_id) for route_id in members)
+                caught = []
+                offset = 0
+                for ids in county_ids.values():
+                    caught.append(sum(flags[offset:offset + len(ids)]))
+                    offset += len(ids)
+                per_user.append((caught, flags))
+
+            states[region] = per_user
+
+        return {"users": users, "states": states}
+
+    # Every route ID belongs to one state; number each selected state's
+    # distinct member routes 0..n so its coordinates can be scattered into
+    # a users × state routes block
+    id_state = np.full(len(route_ids), -1, dtype=np.int32)
+    id_local = np.zeros(len(route_ids), dtype=np.int32)
+    state_members = []
+
+    for position, (_, county_ids) in enumerate(selected):
+        members = np.fromiter(chain.from_iterable(county_ids.values()), dtype=np.int32)
+        distinct = np.unique(members)
+        id_state[distinct] = position
+        id_local[distinct] = np.arange(len(distinct), dtype=np.int32)
+        state_members.append((len(distinct), np.searchsorted(distinct, members)))
+
+    # Sparse incidence: (row, route ID) coordinates of every caught route
+    # in the selected states, grouped by state
+    user_ids = []
+    for _, pairs in user_pairs:
+        ids = np.array([route_ids[key] for key in pairs if key in route_ids], dtype=np.int32)
+        user_ids.append(ids[id_state[ids] >= 0])
+
+    rows = np.repeat(np.arange(len(users), dtype=np.int32), [len(ids) for ids in user_ids])
+    cols = np.concatenate([np.empty(0, dtype=np.int32)] + user_ids)
+
+    order = np.argsort(id_state[cols], kind="stable")
+    rows, cols = rows[order], cols[order]
+    bounds = np.searchsorted(id_state[cols], np.arange(len(selected) + 1))
+
+    for position, (region, county_ids) in enumerate(selected):
+        n_distinct, member_cols = state_members[position]
+        picked = slice(bounds[position], bounds[position + 1])
+
+        block = np.zeros((len(users), n_distinct), dtype=np.uint8)
+        block[rows[picked], id_local[cols[picked]]] = 1
+        flags = block[:, member_cols]
+
+        # Per-county sums as differences of a running total over the members
+        ends = np.cumsum([len(ids) for ids in county_ids.values()], dtype=np.int64)
+        starts = ends - [len(ids) for ids in county_ids.values()]
+        running = np.zeros((len(users), len(member_cols) + 1), dtype=np.int64)
+        np.cumsum(flags, axis=1, out=running[:, 1:])
+        caught = running[:, ends] - running[:, starts]
+
+        states[region] = [
+            (caught[row].tolist(), flags[row].tobytes())
+            for row in range(len(users))
+        ]
+
+    return {"users": users, "states": states}
@@ -0,0 +1,500 @@
+import os
+import glob
+import sqlite3
+import argparse
+from tabulate import tabulate
+
+from build_manifest import CACHE_DIR, manifest_key, file_fingerprint, same_content
+from list_parser import parse_list
+from photodata_snapshot import photodata_sources
+import instrument
+import validate
+import per_system_pages
+import validate_counties
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LIST_DIR = os.path.join(BASE_DIR, "list_files")
+
+STORE_PATH = os.path.join(CACHE_DIR, "completion.sqlite3")
+
+SCHEMA_VERSION = 2
+
+# --------------------------------------- #
+# Optional SQLite copy of PhotoData and every parsed .list file, for
+# ad-hoc questions ("which users caught TX FM488?") and for deriving the
+# summaries the page generators compute.
+#
+# Every row carries the manifest key of the file it came from. sync_store
+# fingerprints each input like the build manifests do and only re-parses
+# files whose hash changed: their old rows are deleted and the new ones
+# inserted in the same transaction.
+#
+# system_routes keeps every row of the system CSVs, repeats included,
+# because the state pages count them. A route listed by several systems
+# is credited to one of them, the last file in name order, like the page
+# generators do: route_owners.
+# --------------------------------------- #
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path  TEXT PRIMARY KEY,
+    kind  TEXT NOT NULL,
+    mtime INTEGER NOT NULL,
+    size  INTEGER NOT NULL,
+    sha1  TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS names (
+    kind   TEXT NOT NULL,
+    code   TEXT NOT NULL,
+    name   TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (kind, code)
+);
+
+CREATE TABLE IF NOT EXISTS system_routes (
+    system   TEXT NOT NULL,
+    region   TEXT NOT NULL,
+    route    TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    source   TEXT NOT NULL,
+    PRIMARY KEY (system, position)
+);
+CREATE INDEX IF NOT EXISTS system_routes_route ON system_routes (region, route);
+
+-- SQLite takes the bare column (system) from the row holding MAX(source)
+CREATE VIEW IF NOT EXISTS route_owners AS
+    SELECT region, route, system, MAX(source) AS source
+    FROM system_routes
+    GROUP BY region, route;
+
+CREATE TABLE IF NOT EXISTS region_routes (
+    region   TEXT NOT NULL,
+    route    TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    source   TEXT NOT NULL,
+    PRIMARY KEY (region, route)
+);
+
+CREATE TABLE IF NOT EXISTS county_routes (
+    region   TEXT NOT NULL,
+    county   TEXT NOT NULL,
+    route    TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    source   TEXT NOT NULL,
+    PRIMARY KEY (region, county, route)
+);
+CREATE INDEX IF NOT EXISTS county_routes_route ON county_routes (region, route);
+
+CREATE TABLE IF NOT EXISTS entries (
+    user   TEXT NOT NULL,
+    region TEXT NOT NULL,
+    route  TEXT NOT NULL,
+    url    TEXT,
+    line   INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (user, region, route)
+);
+CREATE INDEX IF NOT EXISTS entries_route ON entries (region, route);
+CREATE INDEX IF NOT EXISTS entries_route_upper ON entries (upper(region), upper(route));
+"""
+
+DATA_TABLES = ("names", "system_routes", "region_routes", "county_routes", "entries")
+
+
+def open_store(path=STORE_PATH):
+    """
+    Opens (creating when needed) the store. A store written by another
+    schema version is dropped and rebuilt from scratch by the next sync.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.execute("DROP VIEW IF EXISTS route_owners")
+        for table in ("files", *DATA_TABLES):
+            conn.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# ---------------- Loading ----------------
+
+def insert_system_names(conn, source, path):
+    conn.executemany(
+        "INSERT OR REPLACE INTO names VALUES ('system', ?, ?, ?)",
+        [(code, name, source) for code, name in validate.load_system_name_map(path).items()]
+    )
+
+
+def insert_region_names(conn, source, path):
+    conn.executemany(
+        "INSERT OR REPLACE INTO names VALUES ('region', ?, ?, ?)",
+        [(code, name, source) for code, name in validate.load_region_name_map(path).items()]
+    )
+
+
+def insert_system(conn, source, path):
+    system_name = os.path.splitext(os.path.basename(path))[0]
+
+    conn.executemany(
+        "INSERT INTO system_routes VALUES (?, ?, ?, ?, ?)",
+        [
+            (system_name, region, route, position, source)
+            for position, (region, route) in enumerate(per_system_pages.load_system_routes(path))
+        ]
+    )
+
+
+def insert_region(conn, source, path):
+    region = os.path.splitext(os.path.basename(path))[0]
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO region_routes VALUES (?, ?, ?, ?)",
+        [
+            (region, route, position, source)
+            for position, route in enumerate(per_system_pages.load_region_route_order(region, path))
+        ]
+    )
+
+
+def insert_counties(conn, source, path):
+    region, county_routes = validate_counties.load_state_counties(path)
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO county_routes VALUES (?, ?, ?, ?, ?)",
+        [
+            (region, county, route, position, source)
+            for county, routes in county_routes.items()
+            for position, route in enumerate(routes)
+        ]
+    )
+
+
+def insert_list(conn, source, path, read_list=parse_list):
+    user = os.path.splitext(os.path.basename(path))[0]
+    entries, _ = read_list(path)
+
+    # Last entry wins, as in list_parser.listed_routes
+    latest = {(entry.region, entry.route): entry for entry in entries}
+
+    conn.executemany(
+        "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (user, entry.region, entry.route, entry.url, entry.line, source)
+            for entry in latest.values()
+        ]
+    )
+
+
+LOADERS = {
+    "system_names": insert_system_names,
+    "region_names": insert_region_names,
+    "system": insert_system,
+    "region": insert_region,
+    "counties": insert_counties,
+}
+
+
+def source_kind(path):
+    directory = os.path.basename(os.path.dirname(path))
+    filename = os.path.basename(path)
+
+    if filename == "systems.csv" and directory == "PhotoData":
+        return "system_names"
+    if filename == "regions.csv" and directory == "PhotoData":
+        return "region_names"
+    if directory == "_systems":
+        return "system"
+    if directory == "_regions":
+        return "region"
+    if directory == "_counties" and filename.endswith("_counties.csv"):
+        return "counties"
+    if filename.endswith(".list"):
+        return "list"
+
+    return None
+
+
+def store_sources():
+    """
+    Returns:
+      manifest key -> (kind, path) for every PhotoData CSV and .list file
+    """
+    paths = photodata_sources() + sorted(glob.glob(os.path.join(LIST_DIR, "*.list")))
+    sources = {}
+
+    for path in paths:
+        kind = source_kind(path)
+        if kind is not None:
+            sources[manifest_key(path)] = (kind, path)
+
+    return sources
+
+
+def delete_source(conn, source):
+    for table in DATA_TABLES:
+        conn.execute(f"DELETE FROM {table} WHERE source = ?", (source,))
+
+
+def sync_store(conn, read_list=parse_list):
+    """
+    Brings the store up to date with PhotoData and list_files/, re-parsing
+    only added files and files whose content hash changed.
+
+    read_list:
+      see validate.score_users; build.py passes its shared reader
+
+    Returns:
+      (files re-loaded, files removed, files unchanged)
+    """
+    sources = store_sources()
+    stored = {
+        path: {"mtime": mtime, "size": size, "sha1": sha1}
+        for path, mtime, size, sha1 in conn.execute("SELECT path, mtime, size, sha1 FROM files")
+    }
+
+    loaded = 0
+    unchanged = 0
+
+    with instrument.stage("store.sync"), conn:
+        for key, (kind, path) in sources.items():
+            previous = stored.get(key)
+            fingerprint = file_fingerprint(path, previous)
+
+            if same_content(previous, fingerprint):
+                unchanged += 1
+                if fingerprint is not previous:
+                    # Touched but identical: remember the new stat
+                    conn.execute(
+                        "UPDATE files SET mtime = ?, size = ? WHERE path = ?",
+                        (fingerprint["mtime"], fingerprint["size"], key)
+                    )
+                continue
+
+            delete_source(conn, key)
+            if kind == "list":
+                insert_list(conn, key, path, read_list)
+            else:
+                LOADERS[kind](conn, key, path)
+            conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (key, kind, fingerprint["mtime"], fingerprint["size"], fingerprint["sha1"])
+            )
+            loaded += 1
+
+        removed = stored.keys() - sources.keys()
+        for key in removed:
+            delete_source(conn, key)
+            conn.execute("DELETE FROM files WHERE path = ?", (key,))
+
+    return loaded, len(removed), unchanged
+
+
+# ---------------- Queries ----------------
+
+def users_with_route(conn, region, route):
+    """
+    Returns:
+      list of (user, proof url) for every user who listed region route
+    """
+    return conn.execute(
+        "SELECT user, url FROM entries WHERE region = ? AND route = ? ORDER BY user",
+        (region, route)
+    ).fetchall()
+
+
+def completion_summary(conn, user, kind):
+    """
+    Same rows as validate.py's per-user system / region tables: systems
+    count each route name once and are credited with the routes they own
+    (see route_owners), regions count listed region routes.
+
+    kind:
+      "system" or "region"
+
+    Returns:
+      list of (name, matched, total, pct) for every group with at least one
+      catch, highest completion first
+    """
+    if kind == "system":
+        query = """
+            SELECT t.grp, COALESCE(n.name, t.grp), c.matched, t.total
+            FROM (SELECT system AS grp, COUNT(DISTINCT route) AS total
+                  FROM system_routes GROUP BY system) AS t
+            JOIN (SELECT o.system AS grp, COUNT(DISTINCT o.route) AS matched
+                  FROM entries e
+                  JOIN route_owners o ON o.region = e.region AND o.route = e.route
+                  WHERE e.user = ?
+                  GROUP BY o.system) AS c USING (grp)
+            LEFT JOIN names n ON n.kind = 'system' AND n.code = t.grp
+        """
+    else:
+        query = """
+            SELECT t.grp, COALESCE(n.name, t.grp), c.matched, t.total
+            FROM (SELECT region AS grp, COUNT(*) AS total
+                  FROM region_routes GROUP BY region) AS t
+            JOIN (SELECT r.region AS grp, COUNT(*) AS matched
+                  FROM entries e
+                  JOIN region_routes r ON r.region = e.region AND r.route = e.route
+                  WHERE e.user = ?
+                  GROUP BY r.region) AS c USING (grp)
+            LEFT JOIN names n ON n.kind = 'region' AND n.code = t.grp
+        """
+
+    summary = [
+        (name, matched, total, matched / total * 100 if total else 0.0)
+        for _, name, matched, total in conn.execute(query, (user,))
+    ]
+    summary.sort(key=lambda r: (-r[3], r[0]))
+    return summary
+
+
+def leaderboard(conn):
+    """
+    Returns:
+      list of (user, caught, total, pct), most caught region routes first
+    """
+    total = conn.execute("SELECT COUNT(*) FROM region_routes").fetchone()[0]
+
+    rows = conn.execute("""
+        SELECT u.user, COUNT(r.route) AS caught
+        FROM (SELECT DISTINCT user FROM entries) AS u
+        LEFT JOIN entries e ON e.user = u.user
+        LEFT JOIN region_routes r ON r.region = e.region AND r.route = e.route
+        GROUP BY u.user
+        ORDER BY caught DESC, u.user
+    """).fetchall()
+
+    return [
+        (user, caught, total, caught / total * 100 if total else 0.0)
+        for user, caught in rows
+    ]
+
+
+def state_summary(conn, user, region):
+    """
+    Same counts as the system table on per_system_pages.py's state pages
+    (see per_system_pages.state_system_counts): done counts the listed
+    routes of the region's CSV that the system owns, total every row of
+    the system in the region.
+
+    Returns:
+      list of (system, done, total) for every system with routes in region
+    """
+    return conn.execute("""
+        SELECT t.system, COALESCE(d.done, 0), t.total
+        FROM (SELECT system, COUNT(*) AS total
+              FROM system_routes WHERE region = ? GROUP BY system) AS t
+        LEFT JOIN (SELECT o.system, COUNT(*) AS done
+                   FROM region_routes r
+                   JOIN entries e ON e.user = ? AND e.region = r.region AND e.route = r.route
+                   JOIN route_owners o ON o.region = r.region AND o.route = r.route
+                   WHERE r.region = ?
+                   GROUP BY o.system) AS d USING (system)
+        ORDER BY t.system
+    """, (region, user, region)).fetchall()
+
+
+def county_summary(conn, user, region):
+    """
+    Same counts as validate_counties.py (routes compared upper-cased).
+
+    Returns:
+      list of (county, total, matched) in the county CSV's order
+    """
+    return conn.execute("""
+        SELECT c.county, COUNT(*), COUNT(e.user)
+        FROM county_routes c
+        LEFT JOIN entries e
+          ON e.user = ? AND upper(e.region) = c.region AND upper(e.route) = c.route
+        WHERE c.region = ?
+        GROUP BY c.county
+        ORDER BY MIN(c.rowid)
+    """, (user, region.upper())).fetchall()
+
+
+def print_table(rows, headers):
+    print(tabulate(rows, headers=headers, tablefmt="github"))
+
+
+def percent_rows(rows):
+    return [(*row[:-1], f"{row[-1]:.2f}%") for row in rows]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync and query the SQLite completion store.")
+    parser.add_argument(
+        "--db",
+        default=STORE_PATH,
+        help=f"store path (default: {os.path.relpath(STORE_PATH, BASE_DIR)})"
+    )
+    parser.add_argument(
+        "--no-sync",
+        action="store_true",
+        help="query the store as it is instead of syncing it first"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("sync", help="load changed PhotoData and .list files")
+
+    who = commands.add_parser("who", help="users who caught a route")
+    who.add_argument("region")
+    who.add_argument("route")
+
+    user = commands.add_parser("user", help="a user's system and region completion")
+    user.add_argument("user")
+
+    commands.add_parser("leaderboard", help="every user's region route count")
+
+    state = commands.add_parser("state", help="a user's per-system completion in one state")
+    state.add_argument("user")
+    state.add_argument("region")
+
+    counties = commands.add_parser("counties", help="a user's county completion in one state")
+    counties.add_argument("user")
+    counties.add_argument("region")
+
+    sql = commands.add_parser("sql", help="run a read-only SQL query")
+    sql.add_argument("query")
+
+    args = parser.parse_args()
+
+    conn = open_store(args.db)
+
+    if not args.no_sync or args.command == "sync":
+        loaded, removed, unchanged = sync_store(conn)
+        print(f"🗄  {loaded} files loaded, {removed} removed, {unchanged} unchanged")
+
+    if args.command == "who":
+        print_table(users_with_route(conn, args.region, args.route), ["User", "Proof"])
+
+    elif args.command == "user":
+        print("Systems:")
+        print_table(percent_rows(completion_summary(conn, args.user, "system")),
+                    ["System", "Matched", "Total", "Completion"])
+        print("Regions:")
+        print_table(percent_rows(completion_summary(conn, args.user, "region")),
+                    ["State", "Matched", "Total", "Completion"])
+
+    elif args.command == "leaderboard":
+        print_table(percent_rows(leaderboard(conn)), ["User", "Routes", "Total", "Completion"])
+
+    elif args.command == "state":
+        print_table(state_summary(conn, args.user, args.region), ["System", "Completed", "Total"])
+
+    elif args.command == "counties":
+        print_table(county_summary(conn, args.user, args.region), ["County", "Total Routes", "Completed"])
+
+    elif args.command == "sql":
+        conn.execute("PRAGMA query_only = ON")
+        cursor = conn.execute(args.query)
+        print_table(cursor.fetchall(), [column[0] for column in cursor.description or ()])
+
+    conn.close()
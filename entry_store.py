@@ -0,0 +1,86 @@
+import os
+import json
+
+import instrument
+from build_manifest import CACHE_DIR
+
+
+ENTRY_STORE_DIR = os.path.join(CACHE_DIR, "entries")
+
+# Versions kept per user; a script that falls further behind than this
+# finds no entries to diff against and rebuilds that user in full
+KEEP_VERSIONS = 4
+
+# --------------------------------------- #
+# The parsed entries of every .list version the scripts built from, shared
+# by all of them instead of each manifest carrying its own copy:
+#
+#   .build_cache/entries/{user}/{sha1 of the .list}.json
+#
+# holds pack_entries(listed_routes(...)) of that exact file content
+# (parsing doesn't depend on PhotoData, so the entries are a function of
+# the content alone). A manifest only records the fingerprint of the list
+# it built from; on the next run load_entries(user, that fingerprint)
+# gives back the entries to diff the changed list against. A file is
+# written once, by the first script that parses that version.
+# --------------------------------------- #
+
+
+def entries_path(user, list_fp):
+    return os.path.join(ENTRY_STORE_DIR, user, f"{list_fp['sha1']}.json")
+
+
+def load_entries(user, list_fp):
+    """
+    Returns:
+      the packed entries of the list version with this fingerprint, or
+      None when no fingerprint is given or they aren't stored (any more)
+    """
+    if not list_fp:
+        return None
+
+    path = entries_path(user, list_fp)
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            packed = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    instrument.record_read(path)
+    return packed
+
+
+def save_entries(user, list_fp, packed):
+    """
+    Stores the packed entries of the list version with this fingerprint,
+    unless they already are, and drops the user's least recently stored
+    versions beyond KEEP_VERSIONS.
+    """
+    path = entries_path(user, list_fp)
+
+    if os.path.exists(path):
+        # A list reverted to an earlier version: keep that one the newest
+        os.utime(path)
+        return
+
+    user_dir = os.path.dirname(path)
+    os.makedirs(user_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(packed, f, separators=(",", ":"))
+
+    os.replace(tmp_path, path)
+    instrument.record_write(path)
+
+    versions = sorted(
+        (entry.stat().st_mtime_ns, entry.path)
+        for entry in os.scandir(user_dir)
+        if entry.name.endswith(".json")
+    )
+    for _, old_path in versions[:-KEEP_VERSIONS]:
+        try:
+            os.remove(old_path)
+        except FileNotFoundError:
+            pass  # pruned by another script in the meantime
@@ -0,0 +1,943 @@
+import os
+import re
+import json
+import bisect
+import hashlib
+import argparse
+import itertools
+import subprocess
+from datetime import datetime, timezone
+
+from build_manifest import (
+    CACHE_DIR,
+    load_manifest,
+    save_manifest,
+    file_fingerprint,
+    same_content,
+    source_files,
+    fingerprint_sources,
+    sources_changed,
+    script_files,
+)
+from list_parser import parse_list, listed_routes
+import instrument
+import render
+import per_system_pages
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LIST_DIR = os.path.join(BASE_DIR, "list_files")
+HISTORY_DIR = os.path.join(BASE_DIR, "history")
+
+HISTORY_OUTPUT_DIR = os.path.join(render.OUTPUT_DIR, "history")
+SYSTEM_HISTORY_DIR = os.path.join(HISTORY_OUTPUT_DIR, "systems")
+HISTORY_INDEX = os.path.join(HISTORY_OUTPUT_DIR, "index.html")
+
+# Shared modules whose code shapes these pages: the incremental manifest
+# treats a change to any of them like a change to this script
+SHARED_MODULES = ("render", "list_parser", "per_system_pages")
+
+SERIES_CACHE = os.path.join(CACHE_DIR, "history_series.json")
+SERIES_VERSION = 1
+
+# A full checkpoint is appended after this many deltas
+CHECKPOINT_EVERY = 16
+
+# How much of the end of a history file an index checks to tell that the
+# file was only appended to since
+TAIL_BYTES = 256
+
+# --------------------------------------- #
+# history/{user}.jsonl holds one record per build in which the user's
+# listed (region, route) set changed, oldest first. Unlike outputs/ and
+# .build_cache/ this is durable data that can't be rebuilt, committed to
+# the repository alongside list_files/ (see README):
+#
+#   {"time":"2026-03-27T00:00:00Z","kind":"checkpoint","routes":[[r, route], ...]}
+#   {"time":"2026-04-02T00:00:00Z","kind":"delta","added":[...],"removed":[...]}
+#
+# The first record is a checkpoint; after every CHECKPOINT_EVERY deltas a
+# checkpoint of the current set is appended as well (same time as the
+# delta). A revision's time comes from the list itself (see revision_time),
+# never from the clock of the machine that built it, so everyone building
+# the same list appends the same line.
+#
+# The time is a fixed-width prefix of every line. The history manifest
+# keeps an index of each file (byte offset and time of every checkpoint),
+# so state_at seeks straight to the last checkpoint before the requested
+# time and only parses the records from there.
+# --------------------------------------- #
+
+TIME_SLICE = slice(len('{"time":"'), len('{"time":"2026-01-01T00:00:00Z'))
+CHECKPOINT_MARK = b'"kind":"checkpoint"'
+
+# "## Last Updated 27 March 2026 ##" near the top of a .list file
+LAST_UPDATED = re.compile(r"Last Updated:?\s+(\d{1,2} [A-Za-z]+ \d{4}|\d{4}-\d{2}-\d{2})", re.IGNORECASE)
+LAST_UPDATED_FORMATS = ("%d %B %Y", "%d %b %Y", "%Y-%m-%d")
+HEADER_LINES = 10
+
+
+def format_time(moment):
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def normalize_time(value):
+    """
+    Returns:
+      a record time for "YYYY-MM-DD" (end of that day) or a full
+      "YYYY-MM-DDTHH:MM:SSZ" timestamp
+    """
+    if len(value) == len("2026-01-01"):
+        return f"{value}T23:59:59Z"
+    return value
+
+
+def history_path(user):
+    return os.path.join(HISTORY_DIR, f"{user}.jsonl")
+
+
+# ---------------- Revision times ----------------
+
+def revision_time(list_path, after=None):
+    """
+    Returns:
+      the time to record a new revision of the list (which may have been
+      deleted) at, the first of:
+        - the day of its "## Last Updated ... ##" header
+        - the time of the last commit touching it, when it's unmodified
+          since that commit
+        - its modification time
+      but never before `after` (the user's latest recorded revision), so
+      the history file stays in time order
+    """
+    time = header_time(list_path) or commit_time(list_path) or modified_time(list_path)
+
+    if time is None or (after is not None and time < after):
+        return after
+    return time
+
+
+def header_time(list_path):
+    """
+    Returns:
+      the start of the day named in the list's "Last Updated" header (UTC),
+      or None without one
+    """
+    try:
+        with open(list_path, encoding="utf-8", errors="replace") as f:
+            head = [f.readline() for _ in range(HEADER_LINES)]
+    except OSError:
+        return None
+
+    for line in head:
+        match = LAST_UPDATED.search(line)
+        if match is None:
+            continue
+
+        for date_format in LAST_UPDATED_FORMATS:
+            try:
+                day = datetime.strptime(match.group(1), date_format)
+            except ValueError:
+                continue
+            return format_time(day.replace(tzinfo=timezone.utc))
+
+    return None
+
+
+def commit_time(path):
+    """
+    Returns:
+      the commit time of the last git commit touching path, or None when
+      the file differs from that commit, was never committed, or git isn't
+      available
+    """
+    directory, name = os.path.split(path)
+
+    try:
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--", name],
+            cwd=directory, capture_output=True, text=True, check=True
+        )
+        if status.stdout.strip():
+            return None
+
+        log = subprocess.run(
+            ["git", "log", "-1", "--format=%ct", "--", name],
+            cwd=directory, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+    if not log.stdout.strip():
+        return None
+
+    return format_time(datetime.fromtimestamp(int(log.stdout), timezone.utc))
+
+
+def modified_time(path):
+    try:
+        return format_time(datetime.fromtimestamp(os.path.getmtime(path), timezone.utc))
+    except OSError:
+        return None
+
+
+# ---------------- Records ----------------
+
+def record_line(time, kind, **fields):
+    payload = {"time": time, "kind": kind, **fields}
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False) + "\n"
+
+
+def sorted_pairs(pairs):
+    return [list(pair) for pair in sorted(pairs)]
+
+
+def history_index(user, index=None):
+    """
+    Indexes the user's history file, reusing `index` (from an earlier
+    call) for the part of the file it covers when the file was only
+    appended to since.
+
+    Returns:
+      {"size": bytes indexed, "tail": sha1 of their last TAIL_BYTES,
+       "checkpoints": [[time, byte offset], ...], "since_checkpoint":
+       deltas after the last checkpoint, "last": time of the last record},
+      or None without a history file
+    """
+    path = history_path(user)
+    size = history_size(user)
+
+    if size is None:
+        return None
+
+    if index is not None and index_holds(path, index):
+        if index["size"] == size:
+            return index
+    else:
+        index = {"size": 0, "tail": None, "checkpoints": [], "since_checkpoint": 0, "last": None}
+
+    offset = index["size"]
+    checkpoints = list(index["checkpoints"])
+    since_checkpoint = index["since_checkpoint"]
+    last = index["last"]
+
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # a record still being written
+
+            last = line[TIME_SLICE].decode("ascii")
+            if CHECKPOINT_MARK in line:
+                checkpoints.append([last, offset])
+                since_checkpoint = 0
+            else:
+                since_checkpoint += 1
+            offset += len(line)
+
+    return {
+        "size": offset,
+        "tail": tail_hash(path, offset),
+        "checkpoints": checkpoints,
+        "since_checkpoint": since_checkpoint,
+        "last": last,
+    }
+
+
+def history_size(user):
+    try:
+        return os.path.getsize(history_path(user))
+    except FileNotFoundError:
+        return None
+
+
+def tail_hash(path, size):
+    with open(path, "rb") as f:
+        f.seek(max(size - TAIL_BYTES, 0))
+        return hashlib.sha1(f.read(min(size, TAIL_BYTES))).hexdigest()
+
+
+def index_holds(path, index):
+    """
+    Returns:
+      whether the file still starts with the bytes the index (or a series
+      cache entry) covered, going by their tail
+    """
+    try:
+        return os.path.getsize(path) >= index["size"] and tail_hash(path, index["size"]) == index["tail"]
+    except OSError:
+        return False
+
+
+def read_records(user, index, until=None):
+    """
+    index:
+      history_index(user)
+
+    Returns:
+      the records from the last checkpoint at or before `until` (default:
+      the end of the file) up to `until`, parsed
+    """
+    if index is None:
+        return []
+
+    checkpoints = index["checkpoints"]
+    if until is not None:
+        checkpoints = checkpoints[:bisect.bisect_right([time for time, _ in checkpoints], until)]
+    if not checkpoints:
+        return []
+
+    records = []
+
+    with open(history_path(user), "rb") as f:
+        f.seek(checkpoints[-1][1])
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            if until is not None and line[TIME_SLICE].decode("ascii") > until:
+                break
+            records.append(json.loads(line))
+
+    return records
+
+
+def replay(records):
+    """
+    Returns:
+      (set of (region, route), deltas since the last checkpoint)
+    """
+    state = set()
+    since_checkpoint = 0
+
+    for record in records:
+        if record["kind"] == "checkpoint":
+            state = {tuple(pair) for pair in record["routes"]}
+            since_checkpoint = 0
+        else:
+            state -= {tuple(pair) for pair in record["removed"]}
+            state |= {tuple(pair) for pair in record["added"]}
+            since_checkpoint += 1
+
+    return state, since_checkpoint
+
+
+def state_at(user, when=None, index=None):
+    """
+    index:
+      the user's index from the history manifest, if at hand; it's
+      brought up to date either way
+
+    Returns:
+      the user's listed (region, route) pairs as of `when` (a record time,
+      see normalize_time; default: the latest revision)
+    """
+    state, _ = replay(read_records(user, history_index(user, index), until=when))
+    return state
+
+
+def append_revision(user, routes, previous, since_checkpoint, time):
+    """
+    Appends the change from previous to routes (sets of pairs) to the
+    user's history.
+
+    previous:
+      the last recorded set, or None when the user has no history yet
+
+    Returns:
+      the number of changed pairs
+    """
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+
+    with open(history_path(user), "a", encoding="utf-8") as f:
+        if previous is None:
+            f.write(record_line(time, "checkpoint", routes=sorted_pairs(routes)))
+            return len(routes)
+
+        added = routes - previous
+        removed = previous - routes
+
+        if not added and not removed:
+            return 0
+
+        f.write(record_line(time, "delta", added=sorted_pairs(added), removed=sorted_pairs(removed)))
+
+        if since_checkpoint + 1 >= CHECKPOINT_EVERY:
+            f.write(record_line(time, "checkpoint", routes=sorted_pairs(routes)))
+
+    return len(added) + len(removed)
+
+
+def revisions(user, start=0, end=None):
+    """
+    Replays the user's history between two byte offsets (default: all of
+    it; an offset is the end of a record, e.g. the size in a
+    history_index).
+
+    Returns:
+      list of (time, added pairs, removed pairs), oldest first; the first
+      checkpoint of the file is the first revision, adding its routes,
+      while later checkpoints only repeat the replayed state and are
+      skipped without being parsed
+    """
+    result = []
+
+    try:
+        f = open(history_path(user), "rb")
+    except FileNotFoundError:
+        return result
+
+    with f:
+        f.seek(start)
+        offset = start
+
+        for line in f:
+            if (end is not None and offset >= end) or not line.endswith(b"\n"):
+                break
+
+            if CHECKPOINT_MARK not in line:
+                record = json.loads(line)
+                result.append((
+                    record["time"],
+                    {tuple(pair) for pair in record["added"]},
+                    {tuple(pair) for pair in record["removed"]},
+                ))
+            elif offset == 0:
+                record = json.loads(line)
+                result.append((record["time"], {tuple(pair) for pair in record["routes"]}, set()))
+
+            offset += len(line)
+
+    return result
+
+
+# ---------------- Series ----------------
+
+def user_series(user_revisions, known):
+    """
+    known:
+      container of the (region, route) pairs that count
+
+    Returns:
+      list of (time, caught) after every revision
+    """
+    series = []
+    caught = 0
+
+    for time, added, removed in user_revisions:
+        caught += sum(1 for pair in added if pair in known)
+        caught -= sum(1 for pair in removed if pair in known)
+        series.append((time, caught))
+
+    return series
+
+
+def new_series_state():
+    return {"last": None, "holders": {}, "caught": {}, "series": {}}
+
+
+def system_series(all_revisions, route_system, state=None):
+    """
+    Counts, per system, the routes photographed by at least one user over
+    time.
+
+    all_revisions:
+      user -> revisions(user), or only the revisions after `state`
+    state:
+      a result of this function to carry on from (default: the start);
+      none of the new revisions may be older than its "last"
+
+    Returns:
+      {"last": time of the latest revision, "holders": (region, route) ->
+       number of users listing it, "caught": system -> routes,
+       "series": system -> list of (time, routes)}, where a series only
+      has a point where its count changed, so the result doesn't depend on
+      the order of revisions at the same time
+    """
+    state = state or new_series_state()
+    holders = state["holders"]
+    caught = state["caught"]
+    series = state["series"]
+
+    events = sorted(
+        (revision for user_revisions in all_revisions.values() for revision in user_revisions),
+        key=lambda revision: revision[0]
+    )
+
+    for time, group in itertools.groupby(events, key=lambda revision: revision[0]):
+        touched = set()
+
+        for _, added, removed in group:
+            for pair in removed:
+                system_name = route_system.get(pair)
+                if system_name is None:
+                    continue
+                holders[pair] -= 1
+                if holders[pair] == 0:
+                    del holders[pair]
+                    caught[system_name] -= 1
+                touched.add(system_name)
+
+            for pair in added:
+                system_name = route_system.get(pair)
+                if system_name is None:
+                    continue
+                holders[pair] = holders.get(pair, 0) + 1
+                if holders[pair] == 1:
+                    caught[system_name] = caught.get(system_name, 0) + 1
+                touched.add(system_name)
+
+        for system_name in touched:
+            set_point(series.setdefault(system_name, []), time, caught.get(system_name, 0))
+
+        state["last"] = time
+
+    return state
+
+
+def set_point(points, time, value):
+    """
+    Sets the value at `time` (not before any point so far) in a series
+    that only has a point where the value changed.
+    """
+    if points and points[-1][0] == time:
+        points.pop()
+    if not points or points[-1][1] != value:
+        points.append((time, value))
+
+
+def carried(points, last):
+    """
+    Returns:
+      points with the line carried on to `last` (the latest revision of
+      any user)
+    """
+    if points and points[-1][0] != last:
+        return points + [(last, points[-1][1])]
+    return points
+
+
+# --------------------------------------- #
+# .build_cache/history_series.json keeps the system_series state of the
+# last run along with how far into each history file it got ("size" and
+# "tail" like a history_index), so redrawing the system charts after a few
+# lists changed only reads the new records rather than every history file.
+# --------------------------------------- #
+
+def load_series():
+    """
+    Returns:
+      the cached system_series state with its "users" marks, or None
+    """
+    try:
+        with open(SERIES_CACHE, encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if cached.get("version") != SERIES_VERSION:
+        return None
+
+    instrument.record_read(SERIES_CACHE)
+
+    return {
+        "users": cached["users"],
+        "last": cached["last"],
+        "holders": {(region, route): count for region, route, count in cached["holders"]},
+        "caught": cached["caught"],
+        "series": {
+            system_name: [tuple(point) for point in points]
+            for system_name, points in cached["series"].items()
+        },
+    }
+
+
+def save_series(state):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{SERIES_CACHE}.{os.getpid()}.tmp"
+
+    payload = {
+        "version": SERIES_VERSION,
+        "users": state["users"],
+        "last": state["last"],
+        "holders": [[region, route, count] for (region, route), count in sorted(state["holders"].items())],
+        "caught": state["caught"],
+        "series": state["series"],
+    }
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+
+    os.replace(tmp_path, SERIES_CACHE)
+    instrument.record_write(SERIES_CACHE)
+
+
+def update_series(indexes, route_system, reset=False):
+    """
+    Brings the cached system_series state up to date with the history
+    files, starting over when reset is set (the routes or this script
+    changed), when a file was rewritten rather than appended to, or when
+    a new revision is older than the cached ones.
+
+    indexes:
+      user -> history_index(user) of every user with history
+
+    Returns:
+      the system_series state of all their revisions
+    """
+    state = None if reset else load_series()
+
+    if state is not None and not all(
+        user in indexes and index_holds(history_path(user), mark)
+        for user, mark in state["users"].items()
+    ):
+        state = None
+
+    def new_revisions(state):
+        marks = state["users"] if state else {}
+        return {
+            user: revisions(user, marks[user]["size"] if user in marks else 0, index["size"])
+            for user, index in indexes.items()
+        }
+
+    all_revisions = new_revisions(state)
+
+    if state is not None and state["last"] is not None and any(
+        time < state["last"] for user_revisions in all_revisions.values() for time, _, _ in user_revisions
+    ):
+        state = None
+        all_revisions = new_revisions(state)
+
+    if state is not None:
+        del state["users"]
+
+    state = system_series(all_revisions, route_system, state)
+    state["users"] = {user: {"size": index["size"], "tail": index["tail"]} for user, index in indexes.items()}
+    save_series(state)
+
+    return state
+
+
+# ---------------- Charts ----------------
+
+CHART_WIDTH = 640
+CHART_HEIGHT = 240
+CHART_PAD = 40
+
+
+def timestamp(time):
+    return datetime.fromisoformat(time.replace("Z", "+00:00")).timestamp()
+
+
+def svg_chart(points, total):
+    """
+    Draws points ((time, value), oldest first) as a step line on a 0..total
+    axis.
+
+    Returns:
+      inline <svg> markup
+    """
+    plot_w = CHART_WIDTH - 2 * CHART_PAD
+    plot_h = CHART_HEIGHT - 2 * CHART_PAD
+    top = max(total, max((value for _, value in points), default=0), 1)
+
+    times = [timestamp(time) for time, _ in points]
+    start = times[0] if times else 0.0
+    span = (times[-1] - start) if times else 0.0
+
+    def x(t):
+        # Revisions on a single day share their time: centre them
+        return CHART_PAD + (t - start) / span * plot_w if span else CHART_PAD + plot_w / 2
+
+    def y(value):
+        return CHART_PAD + plot_h - value / top * plot_h
+
+    parts = [
+        f"<svg class='chart' width='{CHART_WIDTH}' height='{CHART_HEIGHT}' "
+        f"viewBox='0 0 {CHART_WIDTH} {CHART_HEIGHT}' xmlns='http://www.w3.org/2000/svg'>\n",
+        f"<rect x='{CHART_PAD}' y='{CHART_PAD}' width='{plot_w}' height='{plot_h}' fill='none' stroke='#ccc'/>\n",
+        f"<text x='{CHART_PAD - 4}' y='{CHART_PAD + 4}' text-anchor='end'>{top}</text>\n",
+        f"<text x='{CHART_PAD - 4}' y='{CHART_PAD + plot_h + 4}' text-anchor='end'>0</text>\n",
+    ]
+
+    if points:
+        path = [f"M{x(times[0]):.1f},{y(points[0][1]):.1f}"]
+        for t, (_, value) in zip(times[1:], points[1:]):
+            path.append(f"H{x(t):.1f}V{y(value):.1f}")
+
+        parts.append(f"<path d='{''.join(path)}' fill='none' stroke='#2a6fdb' stroke-width='2'/>\n")
+        parts.extend(
+            f"<circle cx='{x(t):.1f}' cy='{y(value):.1f}' r='3' fill='#2a6fdb'>"
+            f"<title>{time[:10]}: {value}</title></circle>\n"
+            for t, (time, value) in zip(times, points)
+        )
+        parts.append(
+            f"<text x='{CHART_PAD}' y='{CHART_HEIGHT - CHART_PAD / 2}'>{points[0][0][:10]}</text>\n"
+            f"<text x='{CHART_PAD + plot_w}' y='{CHART_HEIGHT - CHART_PAD / 2}' text-anchor='end'>{points[-1][0][:10]}</text>\n"
+        )
+
+    parts.append("</svg>\n")
+    return "".join(parts)
+
+
+# ---------------- Pages ----------------
+
+USER_HISTORY_HEAD = render.compile_template("""
+<div class='nav'>
+<a href='index.html'>All progress charts</a>
+<a href='../users/{user}/systems.html'>Systems</a>
+</div>
+
+<h1>{user} – Progress</h1>
+<p>{caught} of {total} routes.</p>
+<div class='chart'>
+{chart}</div>
+
+<table>
+<tr>
+  <th>Date</th>
+  <th>Added</th>
+  <th>Removed</th>
+  <th>Routes</th>
+</tr>
+""")
+
+SYSTEM_HISTORY_HEAD = render.compile_template("""
+<div class='nav'>
+<a href='../index.html'>All progress charts</a>
+</div>
+
+<h1>{name} – Progress</h1>
+<p>{caught} of {total} routes photographed by at least one user.</p>
+<div class='chart'>
+{chart}</div>
+</body>
+</html>
+""")
+
+
+def write_user_history(user, user_revisions, catalog):
+    out_path = os.path.join(HISTORY_OUTPUT_DIR, f"{user}.html")
+    known = catalog["route_system"]
+    series = user_series(user_revisions, known)
+
+    parts = [
+        render.page_head(out_path, f"{user} – Progress", "report"),
+        render.fill(
+            USER_HISTORY_HEAD,
+            user=user,
+            caught=series[-1][1] if series else 0,
+            total=len(known),
+            chart=svg_chart(series, len(known))
+        ),
+    ]
+
+    # Newest first
+    for (time, added, removed), (_, caught) in reversed(list(zip(user_revisions, series))):
+        parts.append(
+            "<tr>"
+            f"<td>{time[:10]}</td>"
+            f"<td class='num'>+{sum(1 for pair in added if pair in known)}</td>"
+            f"<td class='num'>−{sum(1 for pair in removed if pair in known)}</td>"
+            f"<td class='num'>{caught}</td>"
+            "</tr>\n"
+        )
+
+    parts.append(render.PAGE_FOOT)
+
+    return render.write_page(out_path, parts)
+
+
+def write_system_history(system_name, series, catalog):
+    out_path = os.path.join(SYSTEM_HISTORY_DIR, f"{system_name}.html")
+    total = len(catalog["system_routes"][system_name])
+    name = per_system_pages.SYSTEM_FULLNAMES.get(system_name, system_name)
+
+    parts = [
+        render.page_head(out_path, f"{name} – Progress", "report"),
+        render.fill(
+            SYSTEM_HISTORY_HEAD,
+            name=name,
+            caught=series[-1][1] if series else 0,
+            total=total,
+            chart=svg_chart(series, total)
+        ),
+    ]
+
+    return render.write_page(out_path, parts)
+
+
+def write_history_index(users, catalog):
+    parts = [render.page_head(HISTORY_INDEX, "Progress", "user-index"), "\n<h1>Progress</h1>\n<h3>Users</h3>\n<ul>\n"]
+    parts.extend(f"<li><a href='{user}.html'>{user}</a></li>\n" for user in sorted(users))
+    parts.append("</ul>\n<h3>Systems</h3>\n<ul>\n")
+    parts.extend(
+        f"<li><a href='systems/{system_name}.html'>"
+        f"{per_system_pages.SYSTEM_FULLNAMES.get(system_name, system_name)}</a></li>\n"
+        for system_name in catalog["system_routes"]
+    )
+    parts.append("</ul>\n</body>\n</html>\n")
+
+    return render.write_page(HISTORY_INDEX, parts)
+
+
+# ---------------- Build ----------------
+
+def record_history(incremental=False, read_list=parse_list, catalog=None):
+    """
+    Appends a revision to history/{user}.jsonl for every user whose listed
+    routes changed since their last recorded revision, then redraws the
+    progress charts.
+
+    Lists are only parsed when their file changed since the last run. The
+    history manifest keeps only the list fingerprint and the
+    history_index of each user; the last recorded set is replayed from the
+    file's last checkpoint.
+
+    With incremental=True, only the charts of users with a new revision
+    are redrawn (the system charts cover every user and are redrawn
+    whenever anything changed, carrying on from the cached series), unless
+    PhotoData or this script changed.
+
+    read_list and catalog let a caller (build.py) share already parsed
+    lists and an already loaded per_system_pages.load_route_catalog().
+    """
+    manifest = load_manifest("history")
+
+    render.reset_stats()
+    render.write_stylesheet()
+
+    data_sources = fingerprint_sources(
+        source_files(
+            dirs=[per_system_pages.SYSTEMS_DIR],
+            files=[
+                per_system_pages.SYSTEMS_INDEX,
+                os.path.abspath(__file__),
+                *script_files(*SHARED_MODULES),
+            ]
+        ),
+        manifest["data"]
+    )
+    redraw_all = not incremental or sources_changed(manifest["data"], data_sources)
+
+    users = {}
+    changed_users = []
+
+    with instrument.stage("history.record"):
+        for list_file in sorted(os.listdir(LIST_DIR)):
+            if not list_file.endswith(".list"):
+                continue
+
+            user = os.path.splitext(list_file)[0]
+            list_path = os.path.join(LIST_DIR, list_file)
+
+            previous = manifest["users"].get(user, {})
+            list_fp = file_fingerprint(list_path, previous.get("list"))
+
+            if (
+                previous.get("index")
+                and same_content(previous.get("list"), list_fp)
+                and history_size(user) == previous["index"]["size"]
+            ):
+                users[user] = {**previous, "list": list_fp}
+                continue
+
+            index = history_index(user, previous.get("index"))
+            if index is not None and index != previous.get("index"):
+                # Records added elsewhere (e.g. pulled along with the list)
+                changed_users.append(user)
+            if index is not None:
+                last, _ = replay(read_records(user, index))
+            else:
+                last = None
+
+            with instrument.user("history.record", user):
+                entries, _ = read_list(list_path)
+                routes = set(listed_routes(entries))
+
+            if routes != last:
+                count = append_revision(
+                    user, routes, last,
+                    index["since_checkpoint"] if index else 0,
+                    revision_time(list_path, index["last"] if index else None)
+                )
+                index = history_index(user, index)
+                if user not in changed_users:
+                    changed_users.append(user)
+                print(f"🕓 {user}: {count} changed routes recorded")
+
+            users[user] = {"list": list_fp, "index": index}
+
+        # Lists that were deleted since the last run end with an empty set;
+        # their history (and chart) is kept
+        for user in manifest["users"].keys() - users.keys():
+            previous = manifest["users"][user]
+            index = previous.get("index")
+
+            if previous.get("list") is not None:
+                index = history_index(user, index)
+                last, since_checkpoint = replay(read_records(user, index))
+
+                if last:
+                    list_path = os.path.join(LIST_DIR, f"{user}.list")
+                    append_revision(user, set(), last, since_checkpoint, revision_time(list_path, index["last"]))
+                    index = history_index(user, index)
+                    changed_users.append(user)
+                    print(f"🗑  {user}: list removed, {len(last)} routes recorded as removed")
+
+            users[user] = {"list": None, "index": index}
+
+    if redraw_all or changed_users:
+        if catalog is None:
+            with instrument.stage("history.load"):
+                catalog = per_system_pages.load_route_catalog()
+
+        with instrument.stage("history.write"):
+            os.makedirs(SYSTEM_HISTORY_DIR, exist_ok=True)
+
+            for user in (users if redraw_all else changed_users):
+                print(f"📄 {write_user_history(user, revisions(user), catalog)}")
+
+            indexes = {user: entry["index"] for user, entry in users.items() if entry["index"]}
+            state = update_series(indexes, catalog["route_system"], reset=redraw_all)
+            for system_name in catalog["system_routes"]:
+                points = carried(state["series"].get(system_name, []), state["last"])
+                print(f"📄 {write_system_history(system_name, points, catalog)}")
+
+            print(f"📄 {write_history_index(users, catalog)}")
+
+    manifest["data"] = data_sources
+    manifest["users"] = users
+    save_manifest("history", manifest)
+
+    print(render.stats_line())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record list revisions and draw progress charts.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only redraw the charts of users with a new revision"
+    )
+    parser.add_argument(
+        "--at",
+        metavar="DATE",
+        help="instead, print a user's routes as of DATE (YYYY-MM-DD or "
+             "YYYY-MM-DDTHH:MM:SSZ); needs --user"
+    )
+    parser.add_argument("--user", help="user for --at")
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.at:
+        if not args.user:
+            parser.error("--at needs --user")
+
+        stored = load_manifest("history")["users"].get(args.user, {})
+        routes = state_at(args.user, normalize_time(args.at), stored.get("index"))
+        for region, route in sorted(routes):
+            print(f"{region} {route}")
+        print(f"📅 {args.user}: {len(routes)} routes as of {args.at}")
+    else:
+        instrument.start(args)
+        record_history(incremental=args.incremental)
+        instrument.finish(args.timings)
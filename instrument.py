@@ -0,0 +1,230 @@
+import os
+import json
+import time
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+
+
+# Collected timings and counters; None while instrumentation is off, so
+# every hook below is a single check on a normal run.
+_REPORT = None
+_PROFILER = None
+_PROFILE_PATH = None
+
+
+def new_report():
+    return {
+        "stages": {},
+        "users": {},
+        "files_read": 0,
+        "bytes_read": 0,
+        "files_written": 0,
+        "bytes_written": 0,
+    }
+
+
+def enabled():
+    return _REPORT is not None
+
+
+def enable(profile_path=None, trace_memory=False):
+    """
+    Turns instrumentation on for this process.
+
+    profile_path:
+      also run cProfile and dump its stats here on finish()
+    trace_memory:
+      also run tracemalloc and report the peak and top allocation sites
+    """
+    global _REPORT, _PROFILER, _PROFILE_PATH
+
+    _REPORT = new_report()
+
+    if profile_path:
+        _PROFILE_PATH = profile_path
+        _PROFILER = cProfile.Profile()
+        _PROFILER.enable()
+
+    if trace_memory:
+        tracemalloc.start()
+
+
+@contextmanager
+def stage(name):
+    """
+    Adds the wall time of the block to stage `name` (stages run more than
+    once, e.g. per build, accumulate).
+    """
+    if _REPORT is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = _REPORT["stages"]
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+@contextmanager
+def user(stage_name, user_id):
+    """
+    Same as stage(), recorded per user under report["users"][stage_name].
+    """
+    if _REPORT is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        users = _REPORT["users"].setdefault(stage_name, {})
+        users[user_id] = users.get(user_id, 0.0) + time.perf_counter() - start
+
+
+def record_read(path):
+    if _REPORT is not None:
+        _REPORT["files_read"] += 1
+        _REPORT["bytes_read"] += os.path.getsize(path)
+
+
+def record_write(path):
+    if _REPORT is not None:
+        _REPORT["files_written"] += 1
+        _REPORT["bytes_written"] += os.path.getsize(path)
+
+
+# ---------------- Worker processes ----------------
+
+def reset():
+    """
+    Starts a fresh report in this process (used by pool workers, whose
+    counters are sent back to the parent with the task result).
+    """
+    global _REPORT
+    _REPORT = new_report()
+
+
+def collect():
+    return _REPORT
+
+
+def merge(report):
+    """
+    Adds a worker's report into this process's report.
+    """
+    for key in ("files_read", "bytes_read", "files_written", "bytes_written"):
+        _REPORT[key] += report[key]
+
+    for name, seconds in report["stages"].items():
+        _REPORT["stages"][name] = _REPORT["stages"].get(name, 0.0) + seconds
+
+    for stage_name, users in report["users"].items():
+        merged = _REPORT["users"].setdefault(stage_name, {})
+        for user_id, seconds in users.items():
+            merged[user_id] = merged.get(user_id, 0.0) + seconds
+
+
+# ---------------- Report ----------------
+
+def finish(report_path=None, top=5):
+    """
+    Stops profiling, prints a console summary and, when report_path is
+    given, writes the full report as JSON.
+
+    Returns:
+      the report dict (None when instrumentation was off)
+    """
+    global _REPORT, _PROFILER
+
+    report = _REPORT
+    if report is None:
+        return None
+
+    if _PROFILER is not None:
+        _PROFILER.disable()
+        _PROFILER.dump_stats(_PROFILE_PATH)
+        report["profile"] = _PROFILE_PATH
+        _PROFILER = None
+
+    if tracemalloc.is_tracing():
+        _, peak = tracemalloc.get_traced_memory()
+        report["memory"] = {
+            "peak_bytes": peak,
+            "top": [
+                {"site": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                for stat in tracemalloc.take_snapshot().statistics("lineno")[:top]
+            ],
+        }
+        tracemalloc.stop()
+
+    print_summary(report, top)
+
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📊 {report_path}")
+
+    _REPORT = None
+    return report
+
+
+def print_summary(report, top=5):
+    from tabulate import tabulate
+
+    total = sum(report["stages"].values())
+
+    print("\nTimings:")
+    print(tabulate(
+        [
+            (name, f"{seconds:.3f}s", f"{seconds / total * 100:.1f}%" if total else "-")
+            for name, seconds in sorted(report["stages"].items(), key=lambda s: s[1], reverse=True)
+        ],
+        headers=["Stage", "Time", "Share"],
+        tablefmt="github"
+    ))
+
+    for stage_name, users in report["users"].items():
+        slowest = sorted(users.items(), key=lambda u: u[1], reverse=True)[:top]
+        print(f"Slowest users ({stage_name}): " + ", ".join(f"{u} {s:.3f}s" for u, s in slowest))
+
+    print(
+        f"Read {report['files_read']} files ({report['bytes_read'] / 1024:.0f} KiB), "
+        f"wrote {report['files_written']} files ({report['bytes_written'] / 1024:.0f} KiB)"
+    )
+
+    if "memory" in report:
+        print(f"Peak traced memory: {report['memory']['peak_bytes'] / 1024 / 1024:.1f} MiB")
+    if "profile" in report:
+        print(f"cProfile stats: {report['profile']}")
+
+
+# ---------------- CLI ----------------
+
+def add_arguments(parser):
+    parser.add_argument(
+        "--timings",
+        metavar="PATH",
+        help="collect stage/user timings and file counts, write them here as JSON"
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="also run cProfile (main process only) and dump its stats here"
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="also track allocations with tracemalloc (main process only)"
+    )
+
+
+def start(args):
+    """
+    Enables instrumentation when any of add_arguments' options was given.
+    """
+    if args.timings or args.profile or args.trace_memory:
+        enable(profile_path=args.profile, trace_memory=args.trace_memory)
@@ -0,0 +1,256 @@
+import os
+import json
+import gzip
+
+import render
+
+
+DATA_DIR = os.path.join(render.OUTPUT_DIR, "data")
+USERS_DATA_DIR = os.path.join(DATA_DIR, "users")
+VIEWER_PATH = os.path.join(render.OUTPUT_DIR, "viewer.html")
+
+# --------------------------------------- #
+# Instead of one HTML page per user × system / state, the JSON output
+# mode writes:
+#
+#   data/catalog.json       every system and state, written once per run
+#   data/users/{user}.json  the user's listed routes and proof links
+#   viewer.html             static page rendering the same tables in the
+#                           browser: viewer.html?user=U&system=S / &state=R
+#
+# With compress=True the payloads are gzip'd (".json.gz") and the viewer
+# inflates them with DecompressionStream.
+# --------------------------------------- #
+
+
+def json_path(path, compress):
+    return path + ".json.gz" if compress else path + ".json"
+
+
+def write_json(path, payload, compress=False):
+    """
+    path:
+      output path without extension
+
+    Returns:
+      the written path
+    """
+    data = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    out_path = json_path(path, compress)
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    if compress:
+        # mtime=0 keeps the bytes stable, so unchanged payloads are skipped
+        data = gzip.compress(data, mtime=0)
+
+    return render.write_bytes(out_path, data)
+
+
+def catalog_payload(catalog, system_names, region_names):
+    """
+    catalog:
+      see per_system_pages.load_route_catalog
+    """
+    return {
+        "systems": {
+            system_name: {
+                "name": system_names.get(system_name, system_name),
+                "routes": [[region, route] for region, route in routes],
+            }
+            for system_name, routes in catalog["system_routes"].items()
+        },
+        "regions": {
+            region: {
+                "name": region_names.get(region, region),
+                "routes": [
+                    [route, catalog["route_system"].get((region, route))]
+                    for route in catalog["region_orders"].get(region, [])
+                ],
+                "totals": catalog["region_totals"][region],
+            }
+            for region in sorted(catalog["region_totals"])
+        },
+    }
+
+
+def user_payload(user, listed_routes):
+    """
+    Returns:
+      {"user": user, "routes": {region: {route: url or None}}}
+    """
+    routes = {}
+    for (region, route), url in sorted(listed_routes.items()):
+        routes.setdefault(region, {})[route] = url
+
+    return {"user": user, "routes": routes}
+
+
+def write_catalog(catalog, system_names, region_names, compress=False):
+    """
+    Writes data/catalog.json and viewer.html.
+
+    Returns:
+      list of written paths
+    """
+    catalog_out = write_json(
+        os.path.join(DATA_DIR, "catalog"),
+        catalog_payload(catalog, system_names, region_names),
+        compress
+    )
+
+    viewer = VIEWER_HTML.replace("__DATA_EXT__", ".json.gz" if compress else ".json")
+    viewer_out = render.write_page(VIEWER_PATH, [
+        render.page_head(VIEWER_PATH, "Route Completion", "route-pages"),
+        viewer,
+    ])
+
+    return [catalog_out, viewer_out]
+
+
+def write_user(user, listed_routes, compress=False):
+    return write_json(os.path.join(USERS_DATA_DIR, user), user_payload(user, listed_routes), compress)
+
+
+VIEWER_HTML = """
+<div id="page"><p>Loading…</p></div>
+
+<script>
+const DATA_EXT = "__DATA_EXT__";
+
+async function load(path) {
+  const res = await fetch(path);
+  if (!res.ok) {
+    throw new Error(`${path}: ${res.status}`);
+  }
+  if (!path.endsWith(".gz")) {
+    return res.json();
+  }
+  return new Response(res.body.pipeThrough(new DecompressionStream("gzip"))).json();
+}
+
+function el(tag, attrs, ...children) {
+  const node = document.createElement(tag);
+  for (const [key, value] of Object.entries(attrs || {})) {
+    node.setAttribute(key, value);
+  }
+  for (const child of children) {
+    node.append(child);
+  }
+  return node;
+}
+
+function hsl(pct) {
+  const hue = Math.max(0, Math.min(100, pct)) * 240 / 100;
+  return `hsl(${hue.toFixed(6)}, 80%, 80%)`;
+}
+
+function proofLink(url) {
+  return url && /^https?:/.test(url)
+    ? el("a", {href: url, target: "_blank", rel: "noopener noreferrer"}, "link")
+    : "";
+}
+
+function table(headers, rows) {
+  return el("table", {},
+    el("tr", {}, ...headers.map(h => el("th", {}, h))),
+    ...rows);
+}
+
+function routeRow(label, listed, url) {
+  return el("tr", {class: listed ? "yes" : "no"},
+    el("td", {}, label),
+    el("td", {class: "status"}, listed ? "YES" : "NO"),
+    el("td", {}, listed ? proofLink(url) : ""));
+}
+
+function isListed(user, region, route) {
+  const routes = user.routes[region];
+  return routes !== undefined && route in routes;
+}
+
+function systemPage(catalog, user, systemName) {
+  const system = catalog.systems[systemName];
+  return [
+    el("h1", {}, system.name),
+    el("h3", {}, `User: ${user.user}`),
+    table(["Route", "Status", "Proof"], system.routes.map(([region, route]) =>
+      routeRow(`${region} ${route}`, isListed(user, region, route), (user.routes[region] || {})[route]))),
+  ];
+}
+
+function statePage(catalog, user, state) {
+  const region = catalog.regions[state];
+  const done = {};
+  for (const [route, systemName] of region.routes) {
+    if (systemName !== null && isListed(user, state, route)) {
+      done[systemName] = (done[systemName] || 0) + 1;
+    }
+  }
+
+  const name = s => (catalog.systems[s] || {name: s}).name;
+  const share = s => region.totals[s] ? (done[s] || 0) / region.totals[s] : 0;
+  const systems = Object.keys(region.totals).sort((a, b) =>
+    share(b) - share(a) || (name(a) < name(b) ? -1 : name(a) > name(b) ? 1 : 0));
+
+  return [
+    el("h1", {}, region.name),
+    el("h3", {}, `User: ${user.user}`),
+    table(["System", "Completed", "Total", "Percent"], systems.map(s => {
+      const pct = share(s) * 100;
+      return el("tr", {style: `background-color:${hsl(pct)};`},
+        el("td", {}, name(s)),
+        el("td", {}, String(done[s] || 0)),
+        el("td", {}, String(region.totals[s])),
+        el("td", {}, `${pct.toFixed(2)}%`));
+    })),
+    el("br"),
+    table(["Route", "Status", "Proof"], region.routes.map(([route]) =>
+      routeRow(route, isListed(user, state, route), (user.routes[state] || {})[route]))),
+  ];
+}
+
+function indexPage(catalog, user) {
+  const link = (key, value, text) =>
+    el("li", {}, el("a", {href: `?user=${encodeURIComponent(user.user)}&${key}=${encodeURIComponent(value)}`}, text));
+
+  return [
+    el("h1", {}, user.user),
+    el("h3", {}, "Systems"),
+    el("ul", {}, ...Object.keys(catalog.systems).map(s => link("system", s, catalog.systems[s].name))),
+    el("h3", {}, "States"),
+    el("ul", {}, ...Object.keys(catalog.regions).map(r => link("state", r, catalog.regions[r].name))),
+  ];
+}
+
+async function main() {
+  const params = new URLSearchParams(location.search);
+  const page = document.getElementById("page");
+  const userId = params.get("user");
+
+  if (!userId) {
+    page.replaceChildren(el("p", {}, "Add ?user=NAME to the address."));
+    return;
+  }
+
+  const [catalog, user] = await Promise.all([
+    load(`data/catalog${DATA_EXT}`),
+    load(`data/users/${encodeURIComponent(userId)}${DATA_EXT}`),
+  ]);
+
+  if (params.has("system")) {
+    page.replaceChildren(...systemPage(catalog, user, params.get("system")));
+  } else if (params.has("state")) {
+    page.replaceChildren(...statePage(catalog, user, params.get("state")));
+  } else {
+    page.replaceChildren(...indexPage(catalog, user));
+  }
+}
+
+main().catch(err => {
+  document.getElementById("page").replaceChildren(el("p", {}, String(err)));
+});
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,499 @@
+import os
+import ssl
+import json
+import time
+import glob
+import socket
+import asyncio
+import argparse
+from urllib.parse import urlsplit, urlunsplit, urljoin, quote
+
+from build_manifest import CACHE_DIR
+from list_parser import parse_list
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LIST_DIR = os.path.join(BASE_DIR, "list_files")
+
+LINK_CACHE_PATH = os.path.join(CACHE_DIR, "link_cache.json")
+DEAD_LINKS_PATH = os.path.join(CACHE_DIR, "dead_links.json")
+
+CACHE_VERSION = 2
+DEFAULT_TTL = 7 * 24 * 3600
+
+MAX_REDIRECTS = 5
+MAX_REUSED_BODY = 64 * 1024
+USER_AGENT = "PhotoUserData-link-check/1"
+
+# Worth another try next run instead of being cached (or marked dead)
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+# Hosts that refuse HEAD answer these; retry with GET
+HEAD_REFUSED_STATUS = {403, 405, 501}
+# The only answers that prove the photo is gone
+DEAD_STATUS = {404, 410}
+
+# Resolver answers that prove the host is gone (NXDOMAIN; some resolvers
+# report a name without addresses as EAI_NODATA). Anything else from
+# getaddrinfo, EAI_AGAIN first of all, is a resolver having a bad moment.
+DEAD_DNS_ERRORS = {socket.EAI_NONAME, getattr(socket, "EAI_NODATA", socket.EAI_NONAME)}
+
+# Characters that go on the request line as they are: RFC 3986 reserved
+# and unreserved ones, plus "%" so existing escapes aren't quoted twice
+URL_SAFE = "/?#[]@!$&'()*+,;=:~-._%"
+
+
+# --------------------------------------- #
+# Minimal HTTP/1.1 client on asyncio streams (no third-party client is
+# required). The client dict keeps idle keep-alive connections per
+# (scheme, host, port) and one semaphore per host, so thousands of links
+# are checked concurrently without hammering a single host.
+# --------------------------------------- #
+
+
+def new_client(concurrency=64, per_host=6, timeout=10.0):
+    return {
+        "idle": {},
+        "hosts": {},
+        "per_host": per_host,
+        "slots": asyncio.Semaphore(concurrency),
+        "timeout": timeout,
+        "ssl": ssl.create_default_context(),
+    }
+
+
+def close_client(client):
+    for connections in client["idle"].values():
+        for _, writer in connections:
+            writer.close()
+    client["idle"].clear()
+
+
+async def open_connection(client, key):
+    scheme, host, port = key
+    if scheme == "https":
+        return await asyncio.open_connection(host, port, ssl=client["ssl"], server_hostname=host)
+    return await asyncio.open_connection(host, port)
+
+
+async def read_head(reader):
+    """
+    Returns:
+      (status, headers with lower-cased names)
+    """
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+
+    fields = status_line.split()
+    if len(fields) < 2 or not fields[1].isdigit():
+        raise ValueError(f"malformed status line {status_line[:40]!r}")
+
+    status = int(fields[1])
+    headers = {}
+
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    return status, headers
+
+
+async def skip_body(reader, method, status, headers):
+    """
+    Reads a small response body so the connection can be reused.
+
+    Returns:
+      whether the connection is clean for the next request
+    """
+    if headers.get("connection", "").lower() == "close":
+        return False
+
+    if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+        return True
+
+    length = headers.get("content-length")
+    if length is None or "chunked" in headers.get("transfer-encoding", ""):
+        return False
+    if not length.isdigit():
+        raise ValueError(f"malformed content-length {length[:40]!r}")
+
+    if int(length) > MAX_REUSED_BODY:
+        # e.g. the photo itself on a GET fallback: cheaper to drop the socket
+        return False
+
+    await reader.readexactly(int(length))
+    return True
+
+
+def supported_url(url):
+    parts = urlsplit(url)
+
+    try:
+        parts.port
+    except ValueError:
+        return False
+
+    return parts.scheme.lower() in ("http", "https") and bool(parts.hostname)
+
+
+def wire_url(url):
+    """
+    Returns:
+      a supported_url as it goes on the wire: the host IDNA-encoded, the
+      path and query percent-quoted (UTF-8), the user info dropped
+
+    Raises UnicodeError when the host has no IDNA form.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname.encode("idna").decode("ascii")
+
+    if ":" in host:
+        host = f"[{host}]"  # IPv6 literal
+    if parts.port:
+        host = f"{host}:{parts.port}"
+
+    return urlunsplit((
+        parts.scheme.lower(),
+        host,
+        quote(parts.path, safe=URL_SAFE),
+        quote(parts.query, safe=URL_SAFE),
+        "",
+    ))
+
+
+async def request(client, method, url):
+    """
+    Sends one request (no redirects followed) to a wire_url. The
+    client's timeout starts once a global and a per-host slot are held,
+    so time spent queueing behind other requests to a busy host doesn't
+    count against it.
+
+    Returns:
+      (status, headers)
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    key = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+    payload = (
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        f"User-Agent: {USER_AGENT}\r\n"
+        "Accept: */*\r\n"
+        "Connection: keep-alive\r\n"
+        "\r\n"
+    ).encode("ascii")
+
+    host_slots = client["hosts"].setdefault(key, asyncio.Semaphore(client["per_host"]))
+
+    async with client["slots"], host_slots:
+        return await asyncio.wait_for(exchange(client, key, method, payload), client["timeout"])
+
+
+async def exchange(client, key, method, payload):
+    idle = client["idle"].setdefault(key, [])
+
+    # An idle keep-alive socket may have been closed by the server in the
+    # meantime: one retry on a fresh connection.
+    for attempt in range(2):
+        reused = bool(idle) and attempt == 0
+        reader, writer = idle.pop() if reused else await open_connection(client, key)
+
+        try:
+            writer.write(payload)
+            await writer.drain()
+            status, headers = await read_head(reader)
+            reusable = await skip_body(reader, method, status, headers)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            if reused:
+                continue
+            raise
+        except BaseException:
+            writer.close()
+            raise
+
+        if reusable:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+
+        return status, headers
+
+
+async def check_url(client, url):
+    """
+    HEAD (falling back to GET where HEAD is refused), following redirects.
+
+    Returns:
+      {"status": final status or None, "error": message or None,
+       "dead": bool, "transient": bool}
+    """
+    method = "HEAD"
+    target = url
+
+    try:
+        for _ in range(MAX_REDIRECTS + 1):
+            try:
+                if not supported_url(target):
+                    raise UnicodeError
+                wire = wire_url(target)
+            except UnicodeError:
+                return {"status": None, "error": f"unsupported URL: {target}", "dead": True, "transient": False}
+
+            status, headers = await request(client, method, wire)
+
+            if method == "HEAD" and status in HEAD_REFUSED_STATUS:
+                method = "GET"
+                continue
+
+            if status in (301, 302, 303, 307, 308) and "location" in headers:
+                target = urljoin(target, headers["location"])
+                continue
+
+            break
+        else:
+            return {"status": status, "error": "too many redirects", "dead": False, "transient": True}
+
+    except asyncio.TimeoutError:
+        return {"status": None, "error": "timeout", "dead": False, "transient": True}
+    except OSError as e:
+        gone = host_gone(e)
+        return {"status": None, "error": str(e) or type(e).__name__, "dead": gone, "transient": not gone}
+    except (EOFError, ValueError) as e:
+        # Truncated bodies (asyncio.IncompleteReadError) and malformed
+        # responses: a misbehaving server, not a verdict on the link
+        return {"status": None, "error": f"bad response: {e}", "dead": False, "transient": True}
+
+    if status in TRANSIENT_STATUS:
+        return {"status": status, "error": None, "dead": False, "transient": True}
+
+    return {"status": status, "error": None, "dead": status in DEAD_STATUS, "transient": False}
+
+
+def host_gone(error):
+    """
+    Returns:
+      whether a connection error proves the host is gone: a refused
+      connection or a name that doesn't resolve. Resets, closed
+      connections, TLS failures, timeouts and resolver hiccups (EAI_AGAIN)
+      are retried on the next run instead.
+    """
+    if isinstance(error, socket.gaierror):
+        return error.errno in DEAD_DNS_ERRORS
+
+    return isinstance(error, ConnectionRefusedError)
+
+
+async def check_urls(urls, concurrency=64, per_host=6, timeout=10.0):
+    """
+    Returns:
+      url -> check_url result, checking every URL concurrently
+    """
+    client = new_client(concurrency, per_host, timeout)
+
+    try:
+        results = await asyncio.gather(*(check_url(client, url) for url in urls))
+    finally:
+        close_client(client)
+
+    return dict(zip(urls, results))
+
+
+# ---------------- Cache ----------------
+
+def load_link_cache():
+    try:
+        with open(LINK_CACHE_PATH, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if cache.get("version") != CACHE_VERSION:
+        return {}
+
+    return cache["links"]
+
+
+def write_json_atomic(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=1, sort_keys=True)
+
+    os.replace(tmp_path, path)
+
+
+def save_link_cache(links):
+    write_json_atomic(LINK_CACHE_PATH, {"version": CACHE_VERSION, "links": links})
+
+
+def load_dead_links():
+    """
+    Returns:
+      set of proof URLs the last link check found dead (empty when no
+      check has run)
+    """
+    try:
+        with open(DEAD_LINKS_PATH, encoding="utf-8") as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+
+def save_dead_links(dead):
+    """
+    Writes dead_links.json only when the set changed: the page generators
+    fingerprint it, so an unchanged set doesn't trigger a rebuild.
+    """
+    if dead != load_dead_links() or not os.path.exists(DEAD_LINKS_PATH):
+        write_json_atomic(DEAD_LINKS_PATH, sorted(dead))
+
+
+# ---------------- Audit ----------------
+
+def all_list_paths():
+    return sorted(glob.glob(os.path.join(LIST_DIR, "*.list")))
+
+
+def collect_links(list_paths):
+    """
+    Returns:
+      url -> list of (user, line number) it appears on
+    """
+    links = {}
+
+    for list_path in list_paths:
+        user = os.path.splitext(os.path.basename(list_path))[0]
+        entries, _ = parse_list(list_path)
+
+        for entry in entries:
+            if entry.url:
+                links.setdefault(entry.url, []).append((user, entry.line))
+
+    return links
+
+
+def audit_links(
+    list_paths=None,
+    ttl=DEFAULT_TTL,
+    concurrency=64,
+    per_host=6,
+    timeout=10.0,
+    now=None
+):
+    """
+    Checks every proof URL in the given .list files (default: all of
+    them), reusing cached results younger than ttl seconds, and records
+    the dead ones for the page generators (see load_dead_links).
+
+    The dead link set is always rebuilt from the cache over every list, so
+    checking a few lists keeps the other users' dead marks, and URLs no
+    list uses any more drop out.
+
+    Returns:
+      (links from collect_links, url -> cached/checked result)
+    """
+    partial = list_paths is not None
+    if not partial:
+        list_paths = all_list_paths()
+
+    now = time.time() if now is None else now
+    links = collect_links(list_paths)
+    cache = load_link_cache()
+
+    stale = [
+        url for url in links
+        if url not in cache or now - cache[url]["checked"] > ttl
+    ]
+
+    print(f"🔗 {len(links)} links, {len(links) - len(stale)} cached, checking {len(stale)}")
+
+    checked = asyncio.run(check_urls(stale, concurrency, per_host, timeout)) if stale else {}
+
+    for url, result in checked.items():
+        if result["transient"]:
+            # Not cached: retried on the next run
+            continue
+        cache[url] = {
+            "status": result["status"],
+            "error": result["error"],
+            "dead": result["dead"],
+            "checked": now,
+        }
+
+    save_link_cache(cache)
+
+    results = {url: checked.get(url) or cache[url] for url in links}
+
+    every_link = collect_links(all_list_paths()) if partial else links
+    save_dead_links({url for url in every_link if url in cache and cache[url]["dead"]})
+
+    return links, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the proof links in every .list file.")
+    parser.add_argument(
+        "lists",
+        nargs="*",
+        help="only check these .list files (default: all of list_files/)"
+    )
+    parser.add_argument(
+        "--ttl-hours",
+        type=float,
+        default=DEFAULT_TTL / 3600,
+        help="recheck links whose cached result is older than this (default: 168)"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=64,
+        help="requests in flight overall"
+    )
+    parser.add_argument(
+        "--per-host",
+        type=int,
+        default=6,
+        help="requests in flight per host"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=10.0,
+        metavar="SECONDS",
+        help="per-request timeout"
+    )
+    args = parser.parse_args()
+
+    links, results = audit_links(
+        list_paths=args.lists or None,
+        ttl=args.ttl_hours * 3600,
+        concurrency=args.concurrency,
+        per_host=args.per_host,
+        timeout=args.timeout
+    )
+
+    dead = 0
+    unknown = 0
+
+    for url in sorted(links):
+        result = results[url]
+
+        if result.get("transient"):
+            unknown += 1
+            continue
+        if not result["dead"]:
+            continue
+
+        dead += 1
+        reason = result["error"] or result["status"]
+        for user, line in links[url]:
+            print(f"❌ {user}:{line} {url} ({reason})")
+
+    print(f"✅ {len(links) - dead - unknown} ok, ❌ {dead} dead, ⚠️  {unknown} unreachable for now")
@@ -0,0 +1,59 @@
+def pack_entries(listed_routes):
+    """
+    Turns (region, route) -> url into a sorted JSON-friendly list
+    of [region, route, url] for the build manifest.
+    """
+    return sorted(
+        [region, route, url]
+        for (region, route), url in listed_routes.items()
+    )
+
+
+def unpack_entries(packed):
+    """
+    Returns:
+      (region, route) -> url
+    """
+    return {(region, route): url for region, route, url in packed}
+
+
+def diff_entries(old, new):
+    """
+    Compares two (region, route) -> url mappings.
+
+    Returns:
+      added:    pairs only in new
+      removed:  pairs only in old
+      relinked: pairs in both whose proof url changed
+    """
+    added = new.keys() - old.keys()
+    removed = old.keys() - new.keys()
+    relinked = {
+        key for key in new.keys() & old.keys()
+        if new[key] != old[key]
+    }
+
+    return added, removed, relinked
+
+
+def changed_pairs(old, new):
+    added, removed, relinked = diff_entries(old, new)
+    return added | removed | relinked
+
+
+def affected_regions(pairs):
+    return {region for region, _ in pairs}
+
+
+def affected_systems(pairs, system_routes):
+    """
+    system_routes:
+      system -> iterable of (region, route)
+
+    Returns:
+      set of systems containing at least one of the pairs
+    """
+    return {
+        system for system, routes in system_routes.items()
+        if not pairs.isdisjoint(routes)
+    }
@@ -0,0 +1,97 @@
+from collections import namedtuple
+
+import instrument
+
+
+# One route line of a .list file
+ListEntry = namedtuple("ListEntry", ["line", "region", "route", "url"])
+
+# kind is "duplicate" (same region + route as an earlier line), "unknown"
+# (not in the known routes given to the parser) or "malformed" (fewer than
+# two fields). first_line is the earlier line for duplicates, else None.
+ListDiagnostic = namedtuple("ListDiagnostic", ["line", "kind", "region", "route", "first_line"])
+
+
+def iter_list_entries(path, known=None, diagnostics=None):
+    """
+    Streams a .list file: "REGION ROUTE [URL]" per line, blank lines and
+    "#" comments skipped.
+
+    known:
+      container of (region, route) pairs; entries not in it are reported
+      as "unknown" (no check when None)
+    diagnostics:
+      list that ListDiagnostic records are appended to, in line order
+
+    Yields:
+      ListEntry for every route line, duplicates included
+    """
+    first_seen = {}
+
+    instrument.record_read(path)
+
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            parts = line.split(maxsplit=2)
+            if len(parts) < 2:
+                if diagnostics is not None:
+                    diagnostics.append(ListDiagnostic(number, "malformed", parts[0], None, None))
+                continue
+
+            region = parts[0]
+            route = parts[1]
+            url = parts[2] if len(parts) > 2 else None
+
+            if diagnostics is not None:
+                key = (region, route)
+
+                if key in first_seen:
+                    diagnostics.append(ListDiagnostic(number, "duplicate", region, route, first_seen[key]))
+                else:
+                    first_seen[key] = number
+
+                    if known is not None and key not in known:
+                        diagnostics.append(ListDiagnostic(number, "unknown", region, route, None))
+
+            yield ListEntry(number, region, route, url)
+
+
+def parse_list(path, known=None):
+    """
+    Returns:
+      (list of ListEntry, list of ListDiagnostic); see iter_list_entries
+    """
+    diagnostics = []
+    entries = list(iter_list_entries(path, known, diagnostics))
+    return entries, diagnostics
+
+
+def listed_routes(entries):
+    """
+    Returns:
+      (region, route) -> url | None, the last line winning for duplicates
+    """
+    return {(entry.region, entry.route): entry.url for entry in entries}
+
+
+def completed_pairs(entries):
+    """
+    Returns:
+      set of upper-cased (region, route), as the county pages match them
+    """
+    return {(entry.region.upper(), entry.route.upper()) for entry in entries}
+
+
+def diagnostic_counts(diagnostics):
+    """
+    Returns:
+      kind -> number of diagnostics of that kind
+    """
+    counts = {}
+    for diagnostic in diagnostics:
+        counts[diagnostic.kind] = counts.get(diagnostic.kind, 0) + 1
+    return counts
@@ -0,0 +1,467 @@
+import os
+import time
+import fnmatch
+import argparse
+from collections import OrderedDict
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, unquote
+
+import render
+import validate
+import per_system_pages
+import validate_counties
+from list_parser import parse_list, listed_routes, completed_pairs
+from completion_matrix import build_county_tables
+from link_check import DEAD_LINKS_PATH, load_dead_links
+from photodata_snapshot import photodata_sources, invalidate_snapshot
+from watch import stat_files
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LIST_DIR = os.path.join(BASE_DIR, "list_files")
+OUTPUT_DIR = render.OUTPUT_DIR
+
+CACHE_SIZE = 256
+CHECK_INTERVAL = 0.5
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "text/javascript; charset=utf-8",
+    ".json": "application/json",
+    ".svg": "image/svg+xml",
+    ".gz": "application/gzip",
+}
+
+# --------------------------------------- #
+# Local preview server: renders any user's system, state, county or report
+# page on request with the same *_parts functions the generators use, from
+# catalogs loaded once. The URLs mirror the layout of outputs/, so relative
+# links between pages keep working:
+#
+#   {user}/systems/{system}.html       per_system_pages.py
+#   {user}/states/{state}.html         per_system_pages.py
+#   counties/{user}/{ST}_counties.html validate_counties.py
+#   users/{user}/{systems,regions,unmatched}.html   validate.py
+#
+# Rendered pages sit in a bounded LRU keyed by URL. Each entry is stamped
+# with the PhotoData generation and the (mtime, size) of the user's .list
+# file, so saving a list invalidates exactly that user's pages and a
+# PhotoData change invalidates everything. Any other URL is served from
+# outputs/ as it is.
+# --------------------------------------- #
+
+
+def new_site(cache_size=CACHE_SIZE):
+    return {
+        "cache": OrderedDict(),
+        "cache_size": cache_size,
+        "hits": 0,
+        "misses": 0,
+        "catalogs": {},
+        "lists": {},
+        "sources": None,
+        "generation": 0,
+        "checked": 0.0,
+    }
+
+
+def load_pages_catalog():
+    return {**per_system_pages.load_route_catalog(), "dead_links": load_dead_links()}
+
+
+CATALOG_LOADERS = {
+    "pages": load_pages_catalog,
+    "counties": validate_counties.load_county_tables,
+    "summary": validate.load_validation_data,
+}
+
+
+def refresh(site, force=False):
+    """
+    Drops the catalogs and every cached page when PhotoData (or the dead
+    link list) changed. Checked at most every CHECK_INTERVAL seconds.
+    """
+    now = time.monotonic()
+    if not force and now - site["checked"] < CHECK_INTERVAL:
+        return
+    site["checked"] = now
+
+    sources = stat_files(photodata_sources() + [DEAD_LINKS_PATH])
+    if sources == site["sources"]:
+        return
+
+    if site["sources"] is not None:
+        print("🔄 PhotoData changed, render cache cleared")
+        invalidate_snapshot()
+        per_system_pages.reload_fullnames()
+
+    site["sources"] = sources
+    site["generation"] += 1
+    site["catalogs"].clear()
+    site["cache"].clear()
+
+
+def catalog(site, name):
+    if name not in site["catalogs"]:
+        site["catalogs"][name] = CATALOG_LOADERS[name]()
+    return site["catalogs"][name]
+
+
+def list_path(user):
+    return os.path.join(LIST_DIR, f"{user}.list")
+
+
+def list_stamp(user):
+    try:
+        stat = os.stat(list_path(user))
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def user_entries(site, user, stamp):
+    cached = site["lists"].get(user)
+
+    if cached is None or cached[0] != stamp:
+        entries, _ = parse_list(list_path(user))
+        cached = site["lists"][user] = (stamp, entries)
+
+    return cached[1]
+
+
+def list_users():
+    return sorted(
+        os.path.splitext(name)[0]
+        for name in os.listdir(LIST_DIR)
+        if name.endswith(".list")
+    )
+
+
+# ---------------- Routing ----------------
+
+def resolve(rel_path):
+    """
+    Returns:
+      (kind, user, name) for a rendered page, or None for any other path
+    """
+    parts = rel_path.split("/")
+
+    if rel_path in ("", "index.html"):
+        return ("index", None, None)
+
+    if len(parts) == 2 and parts[1] in ("", "index.html"):
+        return ("user", parts[0], None)
+
+    if len(parts) == 3 and parts[2].endswith(".html"):
+        name = parts[2][:-len(".html")]
+
+        if parts[0] == "counties" and name.endswith("_counties"):
+            return ("counties", parts[1], name[:-len("_counties")])
+        if parts[0] == "users" and name in ("systems", "regions", "unmatched"):
+            return ("report", parts[1], name)
+        if parts[1] == "systems":
+            return ("system", parts[0], name)
+        if parts[1] == "states":
+            return ("state", parts[0], name)
+
+    return None
+
+
+def output_path(rel_path):
+    return os.path.join(OUTPUT_DIR, *rel_path.split("/"))
+
+
+def render_index(site, rel_path):
+    out_path = output_path(rel_path)
+    parts = [render.page_head(out_path, "User Pages", "user-index"), "\n<h1>User Pages</h1>\n<ul>\n"]
+
+    parts.extend(
+        f"<li><a href='{user}/'>{user}</a> "
+        f"(<a href='users/{user}/systems.html'>report</a>)</li>\n"
+        for user in list_users()
+    )
+
+    parts.append("</ul>\n</body>\n</html>\n")
+    return {rel_path: parts}
+
+
+def render_user_index(site, rel_path, user):
+    pages = catalog(site, "pages")
+    counties = catalog(site, "counties")
+    out_path = output_path(rel_path)
+
+    def links(title, items):
+        return [
+            f"<h3>{title}</h3>\n<ul>\n",
+            *(f"<li><a href='{href}'>{text}</a></li>\n" for href, text in items),
+            "</ul>\n",
+        ]
+
+    parts = [render.page_head(out_path, user, "user-index"), f"\n<h1>{user}</h1>\n"]
+    parts += links("Reports", [
+        (f"../users/{user}/{name}.html", name.title()) for name in ("systems", "regions", "unmatched")
+    ])
+    parts += links("Systems", [
+        (f"systems/{name}.html", per_system_pages.SYSTEM_FULLNAMES.get(name, name))
+        for name in pages["system_routes"]
+    ])
+    parts += links("States", [
+        (f"states/{state}.html", per_system_pages.REGION_FULLNAMES.get(state, state))
+        for state in sorted(pages["region_totals"])
+    ])
+    parts += links("Counties", [
+        (f"../counties/{user}/{state}_counties.html", state) for state in counties["states"]
+    ])
+    parts.append("</body>\n</html>\n")
+
+    return {rel_path: parts}
+
+
+def render_pages(site, rel_path, kind, user, name, stamp):
+    """
+    Returns:
+      rel_path -> list of string parts for the requested page (and for
+      pages rendered along with it), or None when there's no such page
+    """
+    if kind == "index":
+        return render_index(site, rel_path)
+
+    if stamp is None:
+        return None
+
+    if kind == "user":
+        return render_user_index(site, rel_path, user)
+
+    entries = user_entries(site, user, stamp)
+    out_path = output_path(rel_path)
+
+    if kind in ("system", "state"):
+        pages = catalog(site, "pages")
+
+        if kind == "system" and name in pages["system_routes"]:
+            return {rel_path: per_system_pages.system_page_parts(
+                user, name, listed_routes(entries), out_path, pages
+            )}
+        if kind == "state" and name in pages["region_totals"]:
+            return {rel_path: per_system_pages.state_page_parts(
+                user, name, listed_routes(entries), out_path, pages
+            )}
+        return None
+
+    if kind == "counties":
+        county_tables = catalog(site, "counties")
+        if name not in county_tables["states"]:
+            return None
+
+        scores = build_county_tables(county_tables, [(user, completed_pairs(entries))], regions={name})
+        caught, flags = scores["states"][name][0]
+        county_routes, _ = county_tables["states"][name]
+
+        rows = validate_counties.county_rows(county_routes, caught, flags)
+        return {rel_path: validate_counties.state_html_parts(out_path, user, name, rows)}
+
+    if kind == "report":
+        data = catalog(site, "summary")
+        result, = validate.score_users(data, [(user, list_path(user), None)])
+
+        pages = validate.user_report_pages(
+            (user, result["system_summary"], result["region_summary"], result["unmatched"]),
+            data
+        )
+        # All three reports come from one scoring pass: cache them together
+        return {
+            os.path.relpath(path, OUTPUT_DIR).replace(os.sep, "/"): parts
+            for path, parts in pages.items()
+        }
+
+    return None
+
+
+# ---------------- Render cache ----------------
+
+def get_page(site, rel_path):
+    """
+    Returns:
+      (bytes, "hit" / "miss" / "static") or None when nothing is at rel_path
+    """
+    refresh(site)
+
+    if rel_path == "css/site.css":
+        return render.SITE_CSS.encode("utf-8"), "static"
+
+    route = resolve(rel_path)
+    if route is None:
+        return read_static(rel_path)
+
+    kind, user, name = route
+    stamp = (site["generation"], list_stamp(user) if user else None)
+
+    cache = site["cache"]
+    cached = cache.get(rel_path)
+
+    if cached is not None and cached[0] == stamp:
+        cache.move_to_end(rel_path)
+        site["hits"] += 1
+        return cached[1], "hit"
+
+    pages = render_pages(site, rel_path, kind, user, name, stamp[1])
+    if pages is None:
+        return None
+
+    site["misses"] += 1
+
+    for path, parts in pages.items():
+        cache[path] = (stamp, "".join(parts).encode("utf-8"))
+        cache.move_to_end(path)
+
+    # The requested page is the most recently used one, and its bytes are
+    # returned even when the cache is too small to keep it
+    cache.move_to_end(rel_path)
+    body = cache[rel_path][1]
+
+    while len(cache) > site["cache_size"]:
+        cache.popitem(last=False)
+
+    return body, "miss"
+
+
+def read_static(rel_path):
+    path = os.path.normpath(output_path(rel_path))
+
+    if not path.startswith(OUTPUT_DIR + os.sep) or not os.path.isfile(path):
+        return None
+
+    with open(path, "rb") as f:
+        return f.read(), "static"
+
+
+# ---------------- Static output ----------------
+
+def page_paths(site):
+    """
+    Returns:
+      every page the generators would write, as URL paths
+    """
+    pages = catalog(site, "pages")
+    counties = catalog(site, "counties")
+    paths = []
+
+    for user in list_users():
+        paths.extend(f"{user}/systems/{name}.html" for name in pages["system_routes"])
+        paths.extend(f"{user}/states/{state}.html" for state in sorted(pages["region_totals"]))
+        paths.extend(f"counties/{user}/{state}_counties.html" for state in counties["states"])
+        paths.extend(f"users/{user}/{name}.html" for name in ("systems", "regions", "unmatched"))
+
+    return paths
+
+
+def materialize(site, patterns):
+    """
+    Writes the pages matching any of the glob patterns (e.g. "TBKS1/*",
+    "*/states/TX.html") to outputs/, skipping identical files like the
+    generators do.
+
+    Returns:
+      list of written paths
+    """
+    refresh(site, force=True)
+    render.reset_stats()
+    render.write_stylesheet()
+
+    written = []
+
+    for rel_path in page_paths(site):
+        if not any(fnmatch.fnmatchcase(rel_path, pattern) for pattern in patterns):
+            continue
+
+        data, _ = get_page(site, rel_path)
+        out_path = output_path(rel_path)
+
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        written.append(render.write_bytes(out_path, data))
+
+    for out_path in written:
+        print(f"📄 {out_path}")
+    print(render.stats_line())
+
+    return written
+
+
+# ---------------- Server ----------------
+
+class PageHandler(BaseHTTPRequestHandler):
+    def send_page(self, with_body):
+        rel_path = unquote(urlsplit(self.path).path).lstrip("/")
+        page = get_page(self.server.site, rel_path)
+
+        if page is None:
+            self.send_error(404)
+            return
+
+        data, source = page
+        ext = os.path.splitext(rel_path)[1] or ".html"
+
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES.get(ext, "application/octet-stream"))
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Render-Cache", source)
+        self.end_headers()
+
+        if with_body:
+            self.wfile.write(data)
+
+    def do_GET(self):
+        self.send_page(True)
+
+    def do_HEAD(self):
+        self.send_page(False)
+
+
+def serve(host="127.0.0.1", port=8000, cache_size=CACHE_SIZE):
+    site = new_site(cache_size)
+    refresh(site, force=True)
+
+    httpd = HTTPServer((host, port), PageHandler)
+    httpd.site = site
+
+    print(f"🌐 Serving on http://{host}:{port}/ (Ctrl+C to stop)")
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n👋 Stopped ({site['hits']} cache hits, {site['misses']} renders)")
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve pages rendered on request, or write selected pages.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_cmd = commands.add_parser("serve", help="run the local preview server")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8000)
+    serve_cmd.add_argument(
+        "--cache-size",
+        type=int,
+        default=CACHE_SIZE,
+        metavar="N",
+        help=f"keep up to N rendered pages in memory (default: {CACHE_SIZE})"
+    )
+
+    materialize_cmd = commands.add_parser("materialize", help="write the matching pages to outputs/")
+    materialize_cmd.add_argument(
+        "patterns",
+        nargs="+",
+        metavar="PATTERN",
+        help="URL path globs, e.g. 'TBKS1/*' or '*/states/TX.html'"
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve(args.host, args.port, args.cache_size)
+    else:
+        materialize(new_site(), args.patterns)
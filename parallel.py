@@ -0,0 +1,75 @@
+import multiprocessing
+
+import instrument
+import render
+
+
+# Read-only data (PhotoData catalogs) shared with the per-user workers.
+SHARED = None
+
+
+def _install_shared(shared):
+    global SHARED
+    SHARED = shared
+
+
+def _run_task(worker, task):
+    # Every task starts with the user it builds
+    with instrument.user(worker.__name__, task[0]):
+        return worker(task)
+
+
+def _run_in_worker(item):
+    """
+    Runs one task in a pool worker and sends back, with its result, the
+    page write counts and (when enabled) the instrumentation report, so
+    the parent's totals include work done in workers.
+    """
+    worker, task, instrumented = item
+
+    render.reset_stats()
+    if instrumented:
+        instrument.reset()
+
+    result = _run_task(worker, task)
+
+    return result, dict(render.WRITE_STATS), instrument.collect() if instrumented else None
+
+
+def map_users(worker, tasks, jobs=1, shared=None):
+    """
+    Runs worker(task) for every task and returns the results in task order,
+    so a parallel run prints and records exactly what a serial run would.
+
+    shared is exposed to the worker as parallel.SHARED. With the "fork"
+    start method the pool inherits it from this process for free; otherwise
+    it is pickled once per worker process through the pool initializer.
+    """
+    global SHARED
+
+    jobs = min(jobs or 1, len(tasks))
+
+    if jobs <= 1:
+        SHARED = shared
+        return [_run_task(worker, task) for task in tasks]
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        SHARED = shared
+        pool = multiprocessing.get_context("fork").Pool(jobs)
+    else:
+        pool = multiprocessing.Pool(jobs, initializer=_install_shared, initargs=(shared,))
+
+    instrumented = instrument.enabled()
+    items = [(worker, task, instrumented) for task in tasks]
+
+    with pool:
+        outputs = pool.map(_run_in_worker, items, chunksize=1)
+
+    results = []
+    for result, stats, report in outputs:
+        render.merge_stats(stats)
+        if report is not None:
+            instrument.merge(report)
+        results.append(result)
+
+    return results
@@ -1,5 +1,31 @@
 import os
-import csv
+import argparse
+
+from build_manifest import (
+    load_manifest,
+    save_manifest,
+    file_fingerprint,
+    same_content,
+    source_files,
+    fingerprint_sources,
+    sources_changed,
+    script_files,
+)
+from list_diff import (
+    pack_entries,
+    unpack_entries,
+    changed_pairs,
+    affected_regions,
+    affected_systems,
+)
+from entry_store import load_entries, save_entries
+from list_parser import parse_list, listed_routes
+import parallel
+import instrument
+import render
+import json_export
+from link_check import DEAD_LINKS_PATH, load_dead_links
+from photodata_snapshot import read_csv_rows, read_csv_dicts, cached_catalog
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -9,62 +35,38 @@ OUTPUT_DIR = os.path.join(BASE_DIR, "outputs")
 
 SYSTEMS_DIR = os.path.join(BASE_DIR, "..", "PhotoData", "_systems")
 REGIONS_DIR = os.path.join(BASE_DIR, "..", "PhotoData", "_regions")
+SYSTEMS_INDEX = os.path.join(BASE_DIR, "..", "PhotoData", "systems.csv")
+REGIONS_INDEX = os.path.join(BASE_DIR, "..", "PhotoData", "regions.csv")
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-
-def parse_list_file(path):
-    """
-    Returns:
-      (region, route) -> url | None
-    """
-    entries = {}
-
-    with open(path, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-
-            parts = line.split(maxsplit=2)
-            if len(parts) < 2:
-                continue
+# Shared modules whose code shapes these pages: the incremental manifest
+# treats a change to any of them like a change to this script
+SHARED_MODULES = ("render", "list_parser", "list_diff", "json_export")
 
-            region = parts[0]
-            route = parts[1]
-            url = parts[2] if len(parts) > 2 else None
-
-            entries[(region, route)] = url
-
-    return entries
+os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 
-def load_region_route_order(region):
+def load_region_route_order(region, path=None):
     """
-    Reads _regions/{region}.csv and preserves exact order.
+    Reads _regions/{region}.csv (or the given path) and preserves exact
+    order.
 
     Returns:
       list of route names in canonical order
     """
-    path = os.path.join(REGIONS_DIR, f"{region}.csv")
-    order = []
+    path = path or os.path.join(REGIONS_DIR, f"{region}.csv")
+    order = {}
 
     if not os.path.exists(path):
-        return order
+        return []
 
-    with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.reader(f, delimiter=";")
-        next(reader, None)
-
-        for row in reader:
-            if len(row) < 3:
-                continue
+    for row in read_csv_rows(path)[1:]:
+        if len(row) < 3:
+            continue
 
-            route = row[2].strip()
-            if route not in order:
-                order.append(route)
+        route = row[2].strip()
+        order.setdefault(route, None)
 
-    return order
+    return list(order)
 
 
 def load_system_routes(system_csv):
@@ -74,226 +76,251 @@ def load_system_routes(system_csv):
     """
     routes = []
 
-    with open(system_csv, newline="", encoding="utf-8") as f:
-        reader = csv.reader(f, delimiter=";")
-        next(reader, None)
-
-        for row in reader:
-            if len(row) < 3:
-                continue
+    for row in read_csv_rows(system_csv)[1:]:
+        if len(row) < 3:
+            continue
 
-            region = row[1].strip()
-            route = row[2].strip()
-            routes.append((region, route))
+        region = row[1].strip()
+        route = row[2].strip()
+        routes.append((region, route))
 
     return routes
 
 def load_system_fullnames():
-    path = os.path.join(BASE_DIR, "..", "PhotoData", "systems.csv")
+    path = SYSTEMS_INDEX
     names = {}
 
     if not os.path.exists(path):
         return names
 
-    with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f, delimiter=";")
-        for row in reader:
-            names[row["System"]] = row["Name"]
+    for row in read_csv_dicts(path):
+        names[row["System"]] = row["Name"]
 
     return names
 
 
 def load_region_fullnames():
-    path = os.path.join(BASE_DIR, "..", "PhotoData", "regions.csv")
+    path = REGIONS_INDEX
     names = {}
 
     if not os.path.exists(path):
         return names
 
-    with open(path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f, delimiter=";")
-        for row in reader:
-            names[row["code"]] = row["name"]
+    for row in read_csv_dicts(path):
+        names[row["code"]] = row["name"]
 
     return names
     
 
+def load_route_catalog():
+    """
+    Returns:
+      read_route_catalog()'s catalog, from the PhotoData snapshot when
+      nothing changed since it was built
+    """
+    return cached_catalog("route_catalog", read_route_catalog)
+
+
+def read_route_catalog():
+    """
+    Reads every _systems CSV (and the matching _regions CSVs) once per run,
+    so the page writers don't have to re-parse PhotoData for each user.
+
+    Returns:
+      dict with:
+        route_system:  (region, route) -> system_name
+        system_routes: system_name -> list of (region, route),
+                       pre-sorted by region, then canonical route order
+        region_totals: region -> {system_name: route count}
+        region_orders: region -> list of route names in canonical order
+        region_ranks:  region -> {route: position in region_orders}
+    """
+    route_system = {}
+    system_routes = {}
+    region_totals = {}
+
+    for system_csv in sorted(os.listdir(SYSTEMS_DIR)):
+        if not system_csv.endswith(".csv"):
+            continue
+
+        system_name = system_csv.replace(".csv", "")
+        system_path = os.path.join(SYSTEMS_DIR, system_csv)
+
+        routes = load_system_routes(system_path)
+        system_routes[system_name] = routes
+
+        for region, route in routes:
+            route_system[(region, route)] = system_name
+
+            totals = region_totals.setdefault(region, {})
+            totals[system_name] = totals.get(system_name, 0) + 1
+
+    region_orders = {
+        region: load_region_route_order(region)
+        for region in sorted(region_totals)
+    }
+
+    region_ranks = {
+        region: {route: idx for idx, route in enumerate(order)}
+        for region, order in region_orders.items()
+    }
+
+    def sort_key(item):
+        region, route = item
+        return (region, region_ranks[region].get(route, 999999))
+
+    for routes in system_routes.values():
+        routes.sort(key=sort_key)
+
+    return {
+        "route_system": route_system,
+        "system_routes": system_routes,
+        "region_totals": region_totals,
+        "region_orders": region_orders,
+        "region_ranks": region_ranks,
+    }
+
+
 def completion_to_hsl(percent):
     percent = max(0.0, min(100.0, percent))
     hue = percent * 240.0 / 100.0
     return f"hsl({hue:.6f}, 80%, 80%)"
 
 
-BASE_STYLE = """
-<style>
-@font-face {
-  font-family: "ModeNine";
-  src: url("../fonts/ModeNine-Regular.woff2") format("woff2"),
-       url("../fonts/ModeNine-Regular.woff") format("woff");
-}
-
-body {
-  font-family: "ModeNine", Arial, sans-serif;
-  text-align: center;
-}
-
-table {
-  border-collapse: collapse;
-  width: 35%;
-  table-layout: fixed;
-  margin: 20px auto;
-}
-
-th, td {
-  border: 1px solid #ccc;
-  padding: 6px 8px;
-}
-
-th {
-  background: #eee;
-}
-
-tr.yes {
-  background-color: #97ff79;
-}
-
-tr.no {
-  background-color: #ff5555;
-}
-
-td.status {
-  text-align: center;
-  font-weight: bold;
-}
-</style>
-"""
-
 SYSTEM_FULLNAMES = load_system_fullnames()
 REGION_FULLNAMES = load_region_fullnames()
 
-def write_system_page(user, system_name, routes, listed_routes, out_path):
-    region_orders = {}
-    for region, _ in routes:
-        if region not in region_orders:
-            region_orders[region] = load_region_route_order(region)
 
-    def sort_key(item):
-        region, route = item
-        order = region_orders.get(region, [])
-        try:
-            idx = order.index(route)
-        except ValueError:
-            idx = 999999
-        return (region, idx)
-
-    with open(out_path, "w", encoding="utf-8") as f:
-
-        f.write(f"""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>{user} – {system_name}</title>
-{BASE_STYLE}
-</head>
-<body>
-
-<h1>{SYSTEM_FULLNAMES.get(system_name, system_name)}</h1>
-<h3>User: {user}</h3>
-""")
+def reload_fullnames():
+    """
+    Re-reads systems.csv / regions.csv after PhotoData changed (watch.py).
+    """
+    global SYSTEM_FULLNAMES, REGION_FULLNAMES
 
-        f.write(f"<p><a href='/users/{user}/systems'>← Back</a></p>\n")
+    SYSTEM_FULLNAMES = load_system_fullnames()
+    REGION_FULLNAMES = load_region_fullnames()
 
-        f.write("""
+ROUTE_TABLE_HEAD = """
 <table>
 <tr>
   <th>Route</th>
   <th>Status</th>
   <th>Proof</th>
 </tr>
+"""
+
+SYSTEM_PAGE_HEAD = render.compile_template("""
+<h1>{name}</h1>
+<h3>User: {user}</h3>
+<p><a href='/users/{user}/systems'>← Back</a></p>
 """)
 
-        for region, route in sorted(routes, key=sort_key):
-            key = (region, route)
-            url = listed_routes.get(key)
+STATE_PAGE_HEAD = render.compile_template("""
+<h1>{name}</h1>
+<h3>User: {user}</h3>
 
-            if key in listed_routes:
-                row_class = "yes"
-                status = "YES"
-                proof = f"<a href='{url}' target='_blank' rel='noopener noreferrer'>link</a>" if url else ""
-            else:
-                row_class = "no"
-                status = "NO"
-                proof = ""
-
-            f.write(
-                f"<tr class='{row_class}'>"
-                f"<td>{region} {route}</td>"
-                f"<td class='status'>{status}</td>"
-                f"<td>{proof}</td>"
-                "</tr>\n"
-            )
-
-        f.write("""
-</table>
-</body>
-</html>
+<p><a href='/users/{user}/regions'>← Back</a></p>
 """)
 
 
-def write_state_page(user, state, listed_routes, out_path):
-    routes = load_region_route_order(state)
+def proof_link(url, dead_links):
+    if not url:
+        return ""
 
-    # Build route -> system lookup from all system CSVs
-    route_to_system = {}
-    system_totals = {}
+    if url in dead_links:
+        return f"<a class='dead' href='{url}' target='_blank' rel='noopener noreferrer' title='Dead link'>dead link</a>"
 
-    for system_csv in sorted(os.listdir(SYSTEMS_DIR)):
-        if not system_csv.endswith(".csv"):
-            continue
+    return f"<a href='{url}' target='_blank' rel='noopener noreferrer'>link</a>"
 
-        system_name = system_csv.replace(".csv", "")
-        system_path = os.path.join(SYSTEMS_DIR, system_csv)
 
-        for region, route in load_system_routes(system_path):
-            if region != state:
-                continue
+def route_row(label, key, listed_routes, dead_links=()):
+    if key in listed_routes:
+        proof = proof_link(listed_routes[key], dead_links)
+        return (
+            "<tr class='yes'>"
+            f"<td>{label}</td>"
+            "<td class='status'>YES</td>"
+            f"<td>{proof}</td>"
+            "</tr>\n"
+        )
+
+    return (
+        "<tr class='no'>"
+        f"<td>{label}</td>"
+        "<td class='status'>NO</td>"
+        "<td></td>"
+        "</tr>\n"
+    )
+
+
+def system_page_parts(user, system_name, listed_routes, out_path, catalog):
+    """
+    Returns:
+      the page's list of string parts (see render.write_page)
+    """
+    routes = catalog["system_routes"][system_name]
+
+    parts = [
+        render.page_head(out_path, f"{user} – {system_name}", "route-pages"),
+        render.fill(SYSTEM_PAGE_HEAD, name=SYSTEM_FULLNAMES.get(system_name, system_name), user=user),
+        ROUTE_TABLE_HEAD,
+    ]
 
-            route_to_system[route] = system_name
+    dead_links = catalog.get("dead_links", ())
+    parts.extend(
+        route_row(f"{region} {route}", (region, route), listed_routes, dead_links)
+        for region, route in routes
+    )
 
-            if system_name not in system_totals:
-                system_totals[system_name] = {"done": 0, "total": 0}
+    parts.append(render.PAGE_FOOT)
 
-            system_totals[system_name]["total"] += 1
+    return parts
 
-    # Count completed routes
-    for route in routes:
+
+def write_system_page(user, system_name, listed_routes, out_path, catalog):
+    render.write_page(out_path, system_page_parts(user, system_name, listed_routes, out_path, catalog))
+
+
+def state_system_counts(state, listed_routes, catalog):
+    """
+    Returns:
+      system_name -> {"done": listed routes of the state's canonical order
+      that belong to the system, "total": the system's rows in the state}
+    """
+    route_to_system = catalog["route_system"]
+
+    system_totals = {
+        system_name: {"done": 0, "total": total}
+        for system_name, total in catalog["region_totals"].get(state, {}).items()
+    }
+
+    for route in catalog["region_orders"].get(state, []):
         key = (state, route)
 
         if key in listed_routes:
-            system_name = route_to_system.get(route)
+            system_name = route_to_system.get(key)
 
             if system_name in system_totals:
                 system_totals[system_name]["done"] += 1
 
-    with open(out_path, "w", encoding="utf-8") as f:
+    return system_totals
 
-        f.write(f"""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>{user} – {state}</title>
-{BASE_STYLE}
-</head>
-<body>
 
-<h1>{REGION_FULLNAMES.get(state, state)}</h1>
-<h3>User: {user}</h3>
+def state_page_parts(user, state, listed_routes, out_path, catalog):
+    """
+    Returns:
+      the page's list of string parts (see render.write_page)
+    """
+    routes = catalog["region_orders"].get(state, [])
+    system_totals = state_system_counts(state, listed_routes, catalog)
 
-<p><a href='/users/{user}/regions'>← Back</a></p>
-""")
+    parts = [
+        render.page_head(out_path, f"{user} – {state}", "route-pages"),
+        render.fill(STATE_PAGE_HEAD, name=REGION_FULLNAMES.get(state, state), user=user),
+    ]
 
-        # ---------- Summary Table ----------
-        f.write("""
+    # ---------- Summary Table ----------
+    parts.append("""
 <table>
 <tr>
   <th>System</th>
@@ -303,125 +330,304 @@ def write_state_page(user, state, listed_routes, out_path):
 </tr>
 """)
 
-        for system_name in sorted(
-            system_totals,
-            key=lambda s: (
-                -(system_totals[s]["done"] / system_totals[s]["total"]
-                  if system_totals[s]["total"] else 0),
-            SYSTEM_FULLNAMES.get(s, s)
-            )
-        ):
-        
-            done = system_totals[system_name]["done"]
-            total = system_totals[system_name]["total"]
-            pct = (done / total * 100) if total else 0
-
-            row_color = completion_to_hsl(pct)
-
-            f.write(
-                f"<tr style=\"background-color:{row_color};\">"
-                f"<td>{SYSTEM_FULLNAMES.get(system_name, system_name)}</td>"
-                f"<td>{done}</td>"
-                f"<td>{total}</td>"
-                f"<td>{pct:.2f}%</td>"
-                f"</tr>\n"
-            )
-
-        f.write("</table>\n<br>\n")
-
-        # ---------- Main Route Table ----------
-
-        f.write("""
-<table>
-<tr>
-  <th>Route</th>
-  <th>Status</th>
-  <th>Proof</th>
-</tr>
-""")
+    for system_name in sorted(
+        system_totals,
+        key=lambda s: (
+            -(system_totals[s]["done"] / system_totals[s]["total"]
+              if system_totals[s]["total"] else 0),
+        SYSTEM_FULLNAMES.get(s, s)
+        )
+    ):
 
-        for route in routes:
-            key = (state, route)
-            url = listed_routes.get(key)
+        done = system_totals[system_name]["done"]
+        total = system_totals[system_name]["total"]
+        pct = (done / total * 100) if total else 0
 
-            if key in listed_routes:
-                row_class = "yes"
-                status = "YES"
-                proof = f"<a href='{url}' target='_blank' rel='noopener noreferrer'>link</a>" if url else ""
-            else:
-                row_class = "no"
-                status = "NO"
-                proof = ""
-
-            f.write(
-                f"<tr class='{row_class}'>"
-                f"<td>{route}</td>"
-                f"<td class='status'>{status}</td>"
-                f"<td>{proof}</td>"
-                "</tr>\n"
-            )
-
-        f.write("""
-</table>
-</body>
-</html>
-""")
+        row_color = completion_to_hsl(pct)
+
+        parts.append(
+            f"<tr style=\"background-color:{row_color};\">"
+            f"<td>{SYSTEM_FULLNAMES.get(system_name, system_name)}</td>"
+            f"<td>{done}</td>"
+            f"<td>{total}</td>"
+            f"<td>{pct:.2f}%</td>"
+            f"</tr>\n"
+        )
+
+    parts.append("</table>\n<br>\n")
+
+    # ---------- Main Route Table ----------
+
+    parts.append(ROUTE_TABLE_HEAD)
+    dead_links = catalog.get("dead_links", ())
+    parts.extend(route_row(route, (state, route), listed_routes, dead_links) for route in routes)
+    parts.append(render.PAGE_FOOT)
+
+    return parts
+
+
+def write_state_page(user, state, listed_routes, out_path, catalog):
+    render.write_page(out_path, state_page_parts(user, state, listed_routes, out_path, catalog))
+
+
+def build_user_pages(task):
+    """
+    Writes one user's system and state pages. Runs in a worker process when
+    generate_pages is given jobs > 1; the catalog comes from parallel.SHARED.
+
+    task:
+      (user, listed_routes, packed entries of the previous run or None)
+
+    Returns:
+      dict with the number of changed routes (None for a full rebuild) and
+      the written paths
+    """
+    user, listed_routes, previous_entries = task
+    catalog = parallel.SHARED
 
-def generate_pages():
-    for list_file in sorted(os.listdir(LIST_DIR)):
-        if not list_file.endswith(".list"):
+    user_out = os.path.join(OUTPUT_DIR, user)
+    systems_out = os.path.join(user_out, "systems")
+    states_out = os.path.join(user_out, "states")
+
+    if previous_entries is not None:
+        changed = changed_pairs(unpack_entries(previous_entries), listed_routes)
+        systems_to_write = affected_systems(changed, catalog["system_routes"])
+        states_to_write = affected_regions(changed)
+    else:
+        changed = None
+        systems_to_write = catalog["system_routes"].keys()
+        states_to_write = catalog["region_totals"].keys()
+
+    os.makedirs(systems_out, exist_ok=True)
+    os.makedirs(states_out, exist_ok=True)
+
+    written = []
+
+    # ---------------- Systems ----------------
+
+    for system_name in catalog["system_routes"]:
+        if system_name not in systems_to_write:
             continue
 
-        user = os.path.splitext(list_file)[0]
-        list_path = os.path.join(LIST_DIR, list_file)
-        listed_routes = parse_list_file(list_path)
+        out_html = os.path.join(systems_out, f"{system_name}.html")
+
+        write_system_page(
+            user=user,
+            system_name=system_name,
+            listed_routes=listed_routes,
+            out_path=out_html,
+            catalog=catalog
+        )
+
+        written.append(out_html)
+
+
+    for state in sorted(catalog["region_totals"]):
+        if state not in states_to_write:
+            continue
 
-        user_out = os.path.join(OUTPUT_DIR, user)
-        systems_out = os.path.join(user_out, "systems")
-        states_out = os.path.join(user_out, "states")
+        out_html = os.path.join(states_out, f"{state}.html")
+        write_state_page(
+            user=user,
+            state=state,
+            listed_routes=listed_routes,
+            out_path=out_html,
+            catalog=catalog
+        )
+
+        written.append(out_html)
+
+    return {
+        "changed": None if changed is None else len(changed),
+        "written": written,
+    }
+
+
+def build_user_json(task):
+    """
+    Writes one user's data/users/{user}.json payload (JSON output mode).
+
+    task:
+      (user, listed_routes, packed entries of the previous run or None, compress)
+
+    Returns:
+      same shape as build_user_pages
+    """
+    user, listed_routes, previous_entries, compress = task
 
-        os.makedirs(systems_out, exist_ok=True)
-        os.makedirs(states_out, exist_ok=True)
+    if previous_entries is not None:
+        changed = len(changed_pairs(unpack_entries(previous_entries), listed_routes))
+    else:
+        changed = None
 
-        # ---------------- Systems ----------------
+    return {
+        "changed": changed,
+        "written": [json_export.write_user(user, listed_routes, compress)],
+    }
 
-        states_seen = set()
 
-        for system_csv in sorted(os.listdir(SYSTEMS_DIR)):
-            if not system_csv.endswith(".csv"):
+def user_output_path(user, output_format, compress):
+    if output_format == "json":
+        return json_export.json_path(os.path.join(json_export.USERS_DATA_DIR, user), compress)
+
+    return os.path.join(OUTPUT_DIR, user)
+
+
+def generate_pages(
+    incremental=False,
+    jobs=1,
+    read_list=parse_list,
+    catalog=None,
+    output_format="html",
+    compress=False
+):
+    """
+    Writes systems/*.html and states/*.html for every user, spread over
+    `jobs` processes (see build_user_pages).
+
+    With output_format="json", writes one data/users/{user}.json per user
+    plus the shared catalog and viewer.html instead (see json_export);
+    compress=True gzips the JSON.
+
+    With incremental=True, users whose .list file is unchanged since the
+    last run are skipped, unless PhotoData (or this script) changed too.
+    For a changed list, only the system and state pages containing an
+    added, removed or relinked (region, route) are rewritten.
+
+    read_list and catalog let a caller (build.py) share already parsed
+    lists and an already loaded load_route_catalog() with other stages.
+    """
+    manifest_name = "per_system_pages"
+    if output_format == "json":
+        manifest_name += "_json.gz" if compress else "_json"
+
+    manifest = load_manifest(manifest_name)
+
+    render.reset_stats()
+    render.write_stylesheet()
+
+    data_sources = fingerprint_sources(
+        source_files(
+            dirs=[SYSTEMS_DIR, REGIONS_DIR],
+            files=[
+                SYSTEMS_INDEX,
+                REGIONS_INDEX,
+                DEAD_LINKS_PATH,
+                os.path.abspath(__file__),
+                *script_files(*SHARED_MODULES),
+            ]
+        ),
+        manifest["data"]
+    )
+    rebuild_all = not incremental or sources_changed(manifest["data"], data_sources)
+
+    users = {}
+    plan = []
+    tasks = []
+
+    with instrument.stage("pages.plan"):
+        for list_file in sorted(os.listdir(LIST_DIR)):
+            if not list_file.endswith(".list"):
+                continue
+
+            user = os.path.splitext(list_file)[0]
+            list_path = os.path.join(LIST_DIR, list_file)
+            user_out = user_output_path(user, output_format, compress)
+
+            previous = manifest["users"].get(user, {})
+            list_fp = file_fingerprint(list_path, previous.get("list"))
+            can_diff = not rebuild_all and "list" in previous and os.path.exists(user_out)
+
+            if can_diff and same_content(previous.get("list"), list_fp):
+                plan.append((user, list_fp, previous, None))
                 continue
 
-            system_name = system_csv.replace(".csv", "")
-            system_path = os.path.join(SYSTEMS_DIR, system_csv)
+            with instrument.user("pages.parse", user):
+                entries, _ = read_list(list_path)
+                routes = listed_routes(entries)
 
-            routes = load_system_routes(system_path)
-            out_html = os.path.join(systems_out, f"{system_name}.html")
+            save_entries(user, list_fp, pack_entries(routes))
 
-            write_system_page(
-                user=user,
-                system_name=system_name,
-                routes=routes,
-                listed_routes=listed_routes,
-                out_path=out_html
-            )
+            plan.append((user, list_fp, previous, len(tasks)))
+            tasks.append((user, routes, load_entries(user, previous.get("list")) if can_diff else None))
 
-            print(f"📄 {out_html}")
+    results = []
+    if tasks:
+        if catalog is None:
+            with instrument.stage("pages.load"):
+                catalog = load_route_catalog()
 
-            for region, _ in routes:
-                states_seen.add(region)
+        with instrument.stage("pages.write"):
+            if output_format == "json":
+                for out_path in json_export.write_catalog(catalog, SYSTEM_FULLNAMES, REGION_FULLNAMES, compress):
+                    print(f"📦 {out_path}")
 
+                results = parallel.map_users(
+                    build_user_json,
+                    [(*task, compress) for task in tasks],
+                    jobs=jobs
+                )
+            else:
+                # Proof links link_check.py found dead are marked on the pages
+                shared = {**catalog, "dead_links": load_dead_links()}
+                results = parallel.map_users(build_user_pages, tasks, jobs=jobs, shared=shared)
+
+    for user, list_fp, previous, task_index in plan:
+        if task_index is None:
+            users[user] = {**previous, "list": list_fp}
+            print(f"⏭  {user} unchanged")
+            continue
+
+        result = results[task_index]
+        users[user] = {"list": list_fp}
 
-        for state in sorted(states_seen):
-            out_html = os.path.join(states_out, f"{state}.html")
-            write_state_page(
-                user=user,
-                state=state,
-                listed_routes=listed_routes,
-                out_path=out_html
-            )
+        if result["changed"] is not None:
+            print(f"🔁 {user}: {result['changed']} changed routes")
 
+        for out_html in result["written"]:
             print(f"📄 {out_html}")
 
+    manifest["data"] = data_sources
+    manifest["users"] = users
+    save_manifest(manifest_name, manifest)
+
+    print(render.stats_line())
+
 
 if __name__ == "__main__":
-    generate_pages()
+    parser = argparse.ArgumentParser(description="Generate per-system and per-state pages.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild users whose .list file changed since the last run"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="build users in N worker processes"
+    )
+    parser.add_argument(
+        "--format",
+        choices=["html", "json"],
+        default="html",
+        help="html: one page per user × system / state; "
+             "json: one payload per user plus viewer.html"
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="gzip the JSON payloads (with --format json)"
+    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    instrument.start(args)
+    generate_pages(
+        incremental=args.incremental,
+        jobs=args.jobs,
+        output_format=args.format,
+        compress=args.gzip
+    )
+    instrument.finish(args.timings)
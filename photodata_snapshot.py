@@ -0,0 +1,200 @@
+import gc
+import os
+import csv
+import glob
+import pickle
+import argparse
+
+import instrument
+from build_manifest import (
+    CACHE_DIR,
+    source_files,
+    fingerprint_sources,
+    sources_changed,
+)
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PHOTODATA_DIR = os.path.join(BASE_DIR, "..", "PhotoData")
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "photodata")
+
+# Source fingerprints, computed once per process by current_sources()
+_SOURCES = None
+
+# --------------------------------------- #
+# Every catalog the scripts build from PhotoData (route catalog,
+# validation data, county index) is pickled to
+# .build_cache/photodata/{name}.pickle as two consecutive pickles:
+#
+#   fingerprints of every PhotoData CSV and script | the built catalog
+#
+# A run whose sources match loads the catalog in one unpickle instead of
+# re-reading and re-indexing the CSVs; anything else rebuilds it. The
+# scripts are part of the fingerprint, so a change to any loader
+# invalidates the snapshot too.
+# --------------------------------------- #
+
+
+def photodata_sources():
+    return source_files(
+        dirs=[
+            os.path.join(PHOTODATA_DIR, "_systems"),
+            os.path.join(PHOTODATA_DIR, "_regions"),
+            os.path.join(PHOTODATA_DIR, "_counties"),
+        ],
+        files=[
+            os.path.join(PHOTODATA_DIR, "systems.csv"),
+            os.path.join(PHOTODATA_DIR, "regions.csv"),
+        ]
+    )
+
+
+def snapshot_path(name):
+    return os.path.join(SNAPSHOT_DIR, f"{name}.pickle")
+
+
+def current_sources():
+    """
+    Returns:
+      fingerprints of every PhotoData CSV and script; only files whose
+      mtime or size differ from the snapshots' stored fingerprints are
+      hashed again
+    """
+    global _SOURCES
+
+    if _SOURCES is None:
+        paths = photodata_sources() + sorted(glob.glob(os.path.join(BASE_DIR, "*.py")))
+        _SOURCES = fingerprint_sources(paths, stored_sources())
+
+    return _SOURCES
+
+
+def stored_sources():
+    """
+    Returns:
+      the fingerprints pickled at the head of every snapshot, merged;
+      empty when there is none. file_fingerprint only reuses one whose
+      mtime and size still match the file.
+    """
+    sources = {}
+
+    for path in sorted(glob.glob(os.path.join(SNAPSHOT_DIR, "*.pickle"))):
+        try:
+            with open(path, "rb") as f:
+                sources.update(pickle.load(f))
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            continue
+
+    return sources
+
+
+def invalidate_snapshot():
+    """
+    Makes the next cached_catalog() re-check PhotoData (and rebuild when it
+    changed); for long-running processes such as watch.py.
+    """
+    global _SOURCES
+    _SOURCES = None
+
+
+def load_snapshot(name, sources):
+    """
+    Returns:
+      the pickled catalog, or None when it is missing, unreadable or was
+      built from other sources
+    """
+    path = snapshot_path(name)
+
+    if not os.path.exists(path):
+        return None
+
+    instrument.record_read(path)
+
+    # The catalogs are hundreds of thousands of small tuples and dicts;
+    # collecting while unpickling them roughly doubles the load time
+    gc.disable()
+
+    try:
+        with open(path, "rb") as f:
+            if sources_changed(pickle.load(f), sources):
+                return None
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        return None
+    finally:
+        gc.enable()
+
+
+def save_snapshot(name, sources, catalog):
+    path = snapshot_path(name)
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    tmp_path = path + ".tmp"
+
+    with open(tmp_path, "wb") as f:
+        pickle.dump(sources, f, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(catalog, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    os.replace(tmp_path, path)
+    instrument.record_write(path)
+
+
+def cached_catalog(name, build):
+    """
+    Returns build()'s catalog, loaded from the snapshot when no PhotoData
+    CSV or script changed since it was pickled, else rebuilt and pickled.
+    """
+    sources = current_sources()
+    catalog = load_snapshot(name, sources)
+
+    if catalog is None:
+        catalog = build()
+        save_snapshot(name, sources, catalog)
+
+    return catalog
+
+
+def read_csv_rows(path):
+    """
+    Returns:
+      the rows of a PhotoData CSV (csv.reader, delimiter=";"), header
+      included
+    """
+    instrument.record_read(path)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f, delimiter=";"))
+
+
+def read_csv_dicts(path):
+    """
+    Returns:
+      the records of a PhotoData CSV (csv.DictReader, delimiter=";")
+    """
+    instrument.record_read(path)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f, delimiter=";"))
+
+
+if __name__ == "__main__":
+    import validate
+    import per_system_pages
+    import validate_counties
+
+    parser = argparse.ArgumentParser(description="Rebuild the PhotoData catalog snapshots.")
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    instrument.start(args)
+
+    for name, build in (
+        ("validation_data", validate.read_validation_data),
+        ("route_catalog", per_system_pages.read_route_catalog),
+        ("county_tables", validate_counties.read_county_tables),
+    ):
+        with instrument.stage(f"snapshot.{name}"):
+            save_snapshot(name, current_sources(), build())
+        print(f"📦 {snapshot_path(name)}")
+
+    instrument.finish(args.timings)
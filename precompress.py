@@ -0,0 +1,126 @@
+import os
+import gzip
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz siblings without it
+    brotli = None
+
+import instrument
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(BASE_DIR, "outputs")
+
+COMPRESSIBLE = (".html", ".css", ".json", ".js", ".svg")
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+
+def compressed_formats():
+    """
+    Returns:
+      list of (suffix, compress(bytes) -> bytes) for the available encoders
+    """
+    formats = [(".gz", lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0))]
+
+    if brotli is not None:
+        formats.append((".br", lambda data: brotli.compress(data, quality=BROTLI_QUALITY)))
+
+    return formats
+
+
+def find_sources(root):
+    sources = []
+
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(COMPRESSIBLE):
+                sources.append(os.path.join(dirpath, filename))
+
+    return sources
+
+
+def compress_file(path, formats):
+    """
+    Writes path + suffix for every format whose sibling is missing or was
+    made from an older version of the file. Siblings are stamped with the
+    source's mtime, so a page render.write_page left untouched is never
+    recompressed.
+
+    Returns:
+      number of siblings written
+    """
+    stat = os.stat(path)
+    stale = []
+
+    for suffix, compress in formats:
+        try:
+            up_to_date = os.stat(path + suffix).st_mtime_ns == stat.st_mtime_ns
+        except OSError:
+            up_to_date = False
+
+        if not up_to_date:
+            stale.append((suffix, compress))
+
+    if not stale:
+        return 0
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    for suffix, compress in stale:
+        out_path = path + suffix
+        tmp_path = out_path + ".tmp"
+
+        with open(tmp_path, "wb") as f:
+            f.write(compress(data))
+
+        os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_path, out_path)
+
+    return len(stale)
+
+
+def precompress(root=OUTPUT_DIR, threads=None):
+    """
+    Emits compressed siblings for every generated page under root.
+    zlib and brotli release the GIL, so a thread pool compresses files in
+    parallel without pickling anything.
+
+    Returns:
+      (siblings written, siblings already up to date)
+    """
+    formats = compressed_formats()
+    sources = find_sources(root)
+
+    with instrument.stage("precompress"):
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            written = sum(pool.map(lambda path: compress_file(path, formats), sources))
+
+    up_to_date = len(sources) * len(formats) - written
+
+    encodings = "+".join(suffix.lstrip(".") for suffix, _ in formats)
+    print(f"🗜  {written} {encodings} files written, {up_to_date} up to date")
+
+    return written, up_to_date
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write .gz (and .br) siblings for generated pages.")
+    parser.add_argument(
+        "--threads",
+        type=int,
+        metavar="N",
+        help="compress in N threads (default: one per CPU, up to 32)"
+    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    instrument.start(args)
+    precompress(threads=args.threads)
+    instrument.finish(args.timings)
@@ -0,0 +1,302 @@
+import os
+from string import Formatter
+
+import instrument
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+OUTPUT_DIR = os.path.join(BASE_DIR, "outputs")
+STYLESHEET_PATH = os.path.join(OUTPUT_DIR, "css", "site.css")
+
+# Files written / left untouched by write_page since the last reset_stats()
+WRITE_STATS = {"written": 0, "unchanged": 0}
+
+# --------------------------------------- #
+# Pages are assembled as a list of strings and written with one
+# write() call. Page skeletons are templates compiled once at import:
+# "{name}" / "{name:spec}" placeholders are parsed a single time, so
+# filling one is a join over the pre-split parts.
+# --------------------------------------- #
+
+
+def compile_template(text):
+    """
+    Returns:
+      list of (literal, field name or None, format spec) parts for fill()
+    """
+    return [
+        (literal, field, spec)
+        for literal, field, spec, _ in Formatter().parse(text)
+    ]
+
+
+def fill(template, **values):
+    parts = []
+
+    for literal, field, spec in template:
+        parts.append(literal)
+        if field is not None:
+            parts.append(format(values[field], spec))
+
+    return "".join(parts)
+
+
+def stylesheet_href(out_path):
+    """
+    Returns:
+      link to the shared stylesheet relative to the page at out_path
+    """
+    href = os.path.relpath(STYLESHEET_PATH, os.path.dirname(os.path.abspath(out_path)))
+    return href.replace(os.sep, "/")
+
+
+def same_bytes(path, data):
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+
+        with open(path, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def write_page(out_path, parts):
+    """
+    Writes a page from its list of string parts in one call, unless the
+    file already holds exactly those bytes: unchanged pages keep their
+    mtime, so rsync / neocities uploads only pick up real changes.
+    Changed pages are written to a temp file and renamed into place.
+    """
+    return write_bytes(out_path, "".join(parts).encode("utf-8"))
+
+
+def write_bytes(out_path, data):
+    """
+    Same as write_page, for already encoded (e.g. compressed) content.
+    """
+    if same_bytes(out_path, data):
+        WRITE_STATS["unchanged"] += 1
+        return out_path
+
+    tmp_path = out_path + ".tmp"
+
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+
+    os.replace(tmp_path, out_path)
+
+    WRITE_STATS["written"] += 1
+    instrument.record_write(out_path)
+    return out_path
+
+
+# ---------------- Write counts ----------------
+
+def reset_stats():
+    WRITE_STATS["written"] = 0
+    WRITE_STATS["unchanged"] = 0
+
+
+def merge_stats(stats):
+    for key, count in stats.items():
+        WRITE_STATS[key] += count
+
+
+def stats_line():
+    return f"✍️  {WRITE_STATS['written']} files written, {WRITE_STATS['unchanged']} unchanged"
+
+
+def write_stylesheet():
+    """
+    Writes outputs/css/site.css (every page links it instead of inlining
+    its own <style> block).
+    """
+    os.makedirs(os.path.dirname(STYLESHEET_PATH), exist_ok=True)
+    return write_page(STYLESHEET_PATH, [SITE_CSS])
+
+
+PAGE_HEAD = compile_template("""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<link rel="stylesheet" href="{css}">
+</head>
+<body class="{kind}">
+""")
+
+PAGE_FOOT = """
+</table>
+</body>
+</html>
+"""
+
+
+def page_head(out_path, title, kind):
+    """
+    kind:
+      body class selecting the page's rules in site.css (report,
+      user-index, leaderboard, route-pages, counties)
+    """
+    return fill(PAGE_HEAD, title=title, css=stylesheet_href(out_path), kind=kind)
+
+
+# ---------------- Stylesheet ----------------
+
+SITE_CSS = """@font-face {
+  font-family: "ModeNine";
+  src: url("../fonts/ModeNine-Regular.woff2") format("woff2"),
+       url("../fonts/ModeNine-Regular.woff") format("woff"),
+       url("../ModeNine.ttf") format("truetype");
+}
+
+table {
+  border-collapse: collapse;
+}
+
+th, td {
+  border: 1px solid #ccc;
+  padding: 6px 8px;
+}
+
+th {
+  background: #eee;
+}
+
+td.num {
+  text-align: right;
+}
+
+/* ---- User system / region reports ---- */
+
+body.report {
+  font-family: "ModeNine", Arial, sans-serif;
+}
+
+.report h1 {
+  text-align: center;
+}
+
+.nav {
+  text-align: center;
+  margin-bottom: 12px;
+}
+
+.nav a {
+  margin: 0 10px;
+  text-decoration: underline;
+}
+
+.report table {
+  width: 50%;
+  margin: 0 auto;
+}
+
+.report table, .report tr, .report td {
+  position: relative;
+}
+
+.report td.num {
+  font-variant-numeric: tabular-nums;
+}
+
+.report td a {
+  display: block;
+  width: 100%;
+  height: 100%;
+  color: inherit;
+  text-decoration: underline;
+  pointer-events: auto;
+  cursor: pointer;
+}
+
+/* ---- User index ---- */
+
+body.user-index {
+  font-family: Arial, sans-serif;
+}
+
+.user-index ul {
+  list-style: none;
+  padding: 0;
+}
+
+.user-index li {
+  margin: 6px 0;
+}
+
+.user-index a {
+  text-decoration: underline;
+}
+
+/* ---- Leaderboard ---- */
+
+.leaderboard table {
+  margin: 0 auto;
+  width: 60%;
+}
+
+/* ---- Per-system / per-state route pages ---- */
+
+body.route-pages {
+  font-family: "ModeNine", Arial, sans-serif;
+  text-align: center;
+}
+
+.route-pages table {
+  width: 35%;
+  table-layout: fixed;
+  margin: 20px auto;
+}
+
+tr.yes {
+  background-color: #97ff79;
+}
+
+tr.no {
+  background-color: #ff5555;
+}
+
+td.status {
+  text-align: center;
+  font-weight: bold;
+}
+
+a.dead {
+  color: #7a0000;
+  text-decoration: line-through;
+}
+
+/* ---- County pages ---- */
+
+body.counties {
+  font-family: ModeNine, sans-serif;
+}
+
+.counties table {
+  width: 75%;
+  margin: 0 auto;
+}
+
+.counties th, .counties td {
+  border: 2px solid #222;
+  padding: 6px 10px;
+  vertical-align: top;
+}
+
+.counties th {
+  background-color: #ddd;
+}
+
+td.right {
+  text-align: right;
+}
+
+td.routes {
+  max-width: 300px;
+  white-space: normal;
+  word-wrap: break-word;
+}
+"""
@@ -0,0 +1,111 @@
+# Dense integer IDs + bitsets for scoring users against PhotoData groupings.
+#
+# Every grouping (system, region, county) owns a contiguous range of IDs,
+# so "caught in group" is one shift/mask of the user's bitset plus a
+# popcount instead of building sets of (region, route) tuples.
+
+
+def build_route_table(systems, system_routes, region_routes):
+    """
+    systems:
+      (region, route) -> system_file
+    system_routes:
+      system_file -> set(route_name)
+    region_routes:
+      region -> set(route_name)
+
+    Returns dict:
+      route_ids:     (region, route) -> (region id or -1, system slot id or -1)
+      region_ranges: region -> (start, stop) in the region ID space
+      system_ranges: system_file -> (start, stop) in the system slot space
+      region_count / system_count: size of each ID space
+
+    Systems are scored by route *name* (the same name in two regions of one
+    system counts once), so they get their own "slot" per (system, name).
+    """
+    region_ranges = {}
+    region_ids = {}
+
+    for region, routes in region_routes.items():
+        start = len(region_ids)
+        for route in sorted(routes):
+            region_ids[(region, route)] = len(region_ids)
+        region_ranges[region] = (start, len(region_ids))
+
+    system_ranges = {}
+    system_slots = {}
+
+    for system_file, routes in system_routes.items():
+        start = len(system_slots)
+        for route in sorted(routes):
+            system_slots[(system_file, route)] = len(system_slots)
+        system_ranges[system_file] = (start, len(system_slots))
+
+    route_ids = {}
+
+    for key in region_ids.keys() | systems.keys():
+        system_file = systems.get(key)
+        route_ids[key] = (
+            region_ids.get(key, -1),
+            system_slots[(system_file, key[1])] if system_file else -1,
+        )
+
+    return {
+        "route_ids": route_ids,
+        "region_ranges": region_ranges,
+        "system_ranges": system_ranges,
+        "region_count": len(region_ids),
+        "system_count": len(system_slots),
+    }
+
+
+def new_bitset(size):
+    return bytearray((size + 7) // 8)
+
+
+def set_bit(bits, idx):
+    bits[idx >> 3] |= 1 << (idx & 7)
+
+
+def has_bit(bits, idx):
+    return bits[idx >> 3] >> (idx & 7) & 1
+
+
+def bitset_to_int(bits):
+    return int.from_bytes(bits, "little")
+
+
+def count_range(bits, id_range):
+    """
+    bits:
+      bitset as an int (see bitset_to_int)
+
+    Returns:
+      number of set bits in [start, stop)
+    """
+    start, stop = id_range
+    return ((bits >> start) & ((1 << (stop - start)) - 1)).bit_count()
+
+
+def user_route_bitsets(route_table, pairs):
+    """
+    Returns:
+      (region bitset, system slot bitset) as ints for the user's
+      (region, route) pairs; unknown pairs are ignored
+    """
+    route_ids = route_table["route_ids"]
+    region_bits = new_bitset(route_table["region_count"])
+    system_bits = new_bitset(route_table["system_count"])
+
+    for key in pairs:
+        ids = route_ids.get(key)
+        if ids is None:
+            continue
+
+        region_id, system_id = ids
+        if region_id >= 0:
+            set_bit(region_bits, region_id)
+        if system_id >= 0:
+            set_bit(system_bits, system_id)
+
+    return bitset_to_int(region_bits), bitset_to_int(system_bits)
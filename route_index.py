@@ -0,0 +1,484 @@
+import os
+import json
+import argparse
+
+from build_manifest import (
+    CACHE_DIR,
+    load_manifest,
+    save_manifest,
+    file_fingerprint,
+    same_content,
+    source_files,
+    fingerprint_sources,
+    sources_changed,
+    script_files,
+)
+from list_diff import pack_entries, unpack_entries, diff_entries, affected_systems
+from list_parser import parse_list, listed_routes
+from entry_store import load_entries, save_entries
+from link_check import DEAD_LINKS_PATH, load_dead_links
+import instrument
+import render
+import per_system_pages
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LIST_DIR = os.path.join(BASE_DIR, "list_files")
+
+ROUTES_DIR = os.path.join(render.OUTPUT_DIR, "routes")
+SYSTEM_RANKINGS_DIR = os.path.join(ROUTES_DIR, "systems")
+ROUTES_INDEX = os.path.join(ROUTES_DIR, "index.html")
+
+INDEX_PATH = os.path.join(CACHE_DIR, "route_index.json")
+
+# Shared modules whose code shapes these pages: the incremental manifest
+# treats a change to any of them like a change to this script
+SHARED_MODULES = ("render", "list_parser", "list_diff", "per_system_pages")
+
+# --------------------------------------- #
+# Inverted index over every .list file:
+#
+#   region -> route -> user -> proof url
+#
+# kept in .build_cache/route_index.json, which is only read when a list
+# changed (or every page is rewritten) and only rewritten when the index
+# did. The manifest records the list fingerprints; a changed list is
+# diffed against the entries of its previous version (see entry_store).
+# It only moves that user's added / removed / relinked (region, route)
+# pairs in the index, and only the pages of those routes (plus the
+# rankings of the systems containing them) are rewritten:
+#
+#   routes/{region}/{route}.html   who caught this route
+#   routes/systems/{system}.html   the system's routes, rarest first
+#   routes/index.html              every system, with its uncaught routes
+# --------------------------------------- #
+
+
+ROUTE_PAGE_HEAD = render.compile_template("""
+<div class='nav'>
+<a href='../index.html'>All systems</a>
+{system_link}
+</div>
+
+<h1>{region} {route}</h1>
+<p>{count} of {total_users} users have photographed this route.</p>
+
+<table>
+<tr>
+  <th>User</th>
+  <th>Proof</th>
+</tr>
+""")
+
+RANKING_PAGE_HEAD = render.compile_template("""
+<div class='nav'>
+<a href='../index.html'>All systems</a>
+</div>
+
+<h1>{name}: Rarest Routes</h1>
+<p>{caught} of {total} routes photographed by at least one of {total_users} users.</p>
+
+<table>
+<tr>
+  <th>Rank</th>
+  <th>Route</th>
+  <th>Users</th>
+  <th>Share</th>
+</tr>
+""")
+
+INDEX_PAGE_HEAD = """
+<h1>Route Popularity</h1>
+
+<table>
+<tr>
+  <th>System</th>
+  <th>Routes</th>
+  <th>Photographed</th>
+  <th>Never photographed</th>
+</tr>
+"""
+
+
+def route_users(index, region, route):
+    return index.get(region, {}).get(route, {})
+
+
+def apply_entries(index, user, old, new):
+    """
+    Moves one user's entries in the index from old to new, both
+    (region, route) -> url mappings.
+
+    Returns:
+      set of the (region, route) pairs whose users changed
+    """
+    added, removed, relinked = diff_entries(old, new)
+
+    for region, route in removed:
+        routes = index.get(region, {})
+        users = routes.get(route, {})
+        users.pop(user, None)
+
+        if not users:
+            routes.pop(route, None)
+        if not routes:
+            index.pop(region, None)
+
+    for key in added | relinked:
+        region, route = key
+        index.setdefault(region, {}).setdefault(route, {})[user] = new[key]
+
+    return added | removed | relinked
+
+
+def user_entries(index, user):
+    """
+    Returns:
+      (region, route) -> url of one user, as the index holds them
+    """
+    return {
+        (region, route): users[user]
+        for region, routes in index.items()
+        for route, users in routes.items()
+        if user in users
+    }
+
+
+def load_route_index():
+    """
+    Returns:
+      the index saved by the last run, or None when there is none
+    """
+    try:
+        with open(INDEX_PATH, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    instrument.record_read(INDEX_PATH)
+    return index
+
+
+def save_route_index(index):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = INDEX_PATH + ".tmp"
+
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+
+    os.replace(tmp_path, INDEX_PATH)
+    instrument.record_write(INDEX_PATH)
+
+
+def previous_entries(index, user, previous_users):
+    """
+    Returns:
+      (region, route) -> url the index holds for the user: their entries
+      from the last run, out of the entry store or, when it no longer has
+      them, the index itself
+    """
+    previous = previous_users.get(user)
+    if previous is None:
+        return {}
+
+    packed = load_entries(user, previous.get("list"))
+    if packed is None:
+        return user_entries(index, user)
+
+    return unpack_entries(packed)
+
+
+def route_page_path(region, route):
+    return os.path.join(ROUTES_DIR, region, f"{route}.html")
+
+
+def system_ranking_path(system_name):
+    return os.path.join(SYSTEM_RANKINGS_DIR, f"{system_name}.html")
+
+
+# ---------------- Pages ----------------
+
+def write_route_page(region, route, users, catalog, total_users):
+    """
+    users:
+      user -> proof url, from the index
+    """
+    out_path = route_page_path(region, route)
+    system_name = catalog["route_system"][(region, route)]
+
+    parts = [
+        render.page_head(out_path, f"{region} {route}", "report"),
+        render.fill(
+            ROUTE_PAGE_HEAD,
+            system_link=(
+                f"<a href='../systems/{system_name}.html'>"
+                f"{per_system_pages.SYSTEM_FULLNAMES.get(system_name, system_name)}</a>"
+            ),
+            region=region,
+            route=route,
+            count=len(users),
+            total_users=total_users
+        ),
+    ]
+
+    dead_links = catalog.get("dead_links", ())
+
+    for user in sorted(users):
+        parts.append(
+            "<tr>"
+            f"<td><a href='../../{user}/states/{region}.html'>{user}</a></td>"
+            f"<td>{per_system_pages.proof_link(users[user], dead_links)}</td>"
+            "</tr>\n"
+        )
+
+    parts.append(render.PAGE_FOOT)
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    return render.write_page(out_path, parts)
+
+
+def rarity_rows(routes, index):
+    """
+    routes:
+      the system's (region, route) pairs in canonical order
+
+    Returns:
+      list of (rank, region, route, user count), rarest first; routes
+      caught by equally many users share a rank
+    """
+    counts = [(len(route_users(index, region, route)), region, route) for region, route in routes]
+    # sorted() is stable: ties keep the canonical route order
+    counts = sorted(counts, key=lambda c: c[0])
+
+    rows = []
+    for position, (count, region, route) in enumerate(counts):
+        rank = rows[-1][0] if rows and rows[-1][3] == count else position + 1
+        rows.append((rank, region, route, count))
+
+    return rows
+
+
+def write_system_ranking(system_name, index, catalog, total_users):
+    out_path = system_ranking_path(system_name)
+    routes = catalog["system_routes"][system_name]
+    rows = rarity_rows(routes, index)
+
+    parts = [
+        render.page_head(out_path, f"{system_name} – Rarest Routes", "report"),
+        render.fill(
+            RANKING_PAGE_HEAD,
+            name=per_system_pages.SYSTEM_FULLNAMES.get(system_name, system_name),
+            caught=sum(1 for row in rows if row[3]),
+            total=len(rows),
+            total_users=total_users
+        ),
+    ]
+
+    for rank, region, route, count in rows:
+        pct = (count / total_users * 100) if total_users else 0.0
+        label = f"{region} {route}"
+
+        if count:
+            label = f"<a href='../{region}/{route}.html'>{label}</a>"
+
+        parts.append(
+            "<tr>"
+            f"<td class='num'>{rank}</td>"
+            f"<td>{label}</td>"
+            f"<td class='num'>{count}</td>"
+            f"<td class='num' style='background-color: {per_system_pages.completion_to_hsl(pct)};'>{pct:.2f}%</td>"
+            "</tr>\n"
+        )
+
+    parts.append(render.PAGE_FOOT)
+
+    os.makedirs(SYSTEM_RANKINGS_DIR, exist_ok=True)
+    return render.write_page(out_path, parts)
+
+
+def write_routes_index(index, catalog):
+    parts = [render.page_head(ROUTES_INDEX, "Route Popularity", "report"), INDEX_PAGE_HEAD]
+
+    for system_name, routes in catalog["system_routes"].items():
+        caught = sum(1 for region, route in routes if route_users(index, region, route))
+        name = per_system_pages.SYSTEM_FULLNAMES.get(system_name, system_name)
+
+        parts.append(
+            "<tr>"
+            f"<td><a href='systems/{system_name}.html'>{name}</a></td>"
+            f"<td class='num'>{len(routes)}</td>"
+            f"<td class='num'>{caught}</td>"
+            f"<td class='num'>{len(routes) - caught}</td>"
+            "</tr>\n"
+        )
+
+    parts.append(render.PAGE_FOOT)
+
+    os.makedirs(ROUTES_DIR, exist_ok=True)
+    return render.write_page(ROUTES_INDEX, parts)
+
+
+# ---------------- Build ----------------
+
+def build_route_index(incremental=False, read_list=parse_list, catalog=None):
+    """
+    Updates the inverted index from the .list files and writes the route
+    popularity pages.
+
+    With incremental=True, only changed lists are parsed and only the
+    pages of routes they touch are rewritten; everything is rewritten when
+    PhotoData, the dead link list or this script changed. Without it the
+    index itself is rebuilt from scratch.
+
+    read_list and catalog let a caller (build.py) share already parsed
+    lists and an already loaded per_system_pages.load_route_catalog().
+    """
+    manifest = load_manifest("route_index")
+
+    render.reset_stats()
+    render.write_stylesheet()
+
+    data_sources = fingerprint_sources(
+        source_files(
+            dirs=[per_system_pages.SYSTEMS_DIR, per_system_pages.REGIONS_DIR],
+            files=[
+                per_system_pages.SYSTEMS_INDEX,
+                per_system_pages.REGIONS_INDEX,
+                DEAD_LINKS_PATH,
+                os.path.abspath(__file__),
+                *script_files(*SHARED_MODULES),
+            ]
+        ),
+        manifest["data"]
+    )
+    rebuild_pages = not incremental or sources_changed(manifest["data"], data_sources)
+    previous_users = manifest["users"] if incremental else {}
+
+    users = {}
+    plan = []
+
+    with instrument.stage("routes.plan"):
+        for list_file in sorted(os.listdir(LIST_DIR)):
+            if not list_file.endswith(".list"):
+                continue
+
+            user = os.path.splitext(list_file)[0]
+            list_path = os.path.join(LIST_DIR, list_file)
+
+            previous = previous_users.get(user, {})
+            list_fp = file_fingerprint(list_path, previous.get("list"))
+            users[user] = {"list": list_fp}
+
+            if same_content(previous.get("list"), list_fp):
+                print(f"⏭  {user} unchanged")
+            else:
+                plan.append((user, list_path, list_fp))
+
+        # Lists that were deleted since the last run
+        deleted = sorted(previous_users.keys() - users.keys())
+
+    # The user count appears on every page: a new or deleted list means
+    # a full rewrite
+    if users.keys() != previous_users.keys():
+        rebuild_pages = True
+
+    index = {}
+    changed = set()
+
+    if rebuild_pages or plan or deleted:
+        with instrument.stage("routes.index"):
+            saved = load_route_index()
+
+            # Routes with a page from the last run, so a route nobody has
+            # caught any more gets its page rewritten too
+            paged = {(region, route) for region, routes in (saved or {}).items() for route in routes}
+
+            if not previous_users:
+                saved = {}
+            elif saved is None:
+                # Index lost: every list is indexed again from scratch, and
+                # any route may have a page left from before
+                saved = {}
+                paged = None
+                plan = [(user, os.path.join(LIST_DIR, f"{user}.list"), users[user]["list"]) for user in users]
+                previous_users = {}
+                deleted = []
+                rebuild_pages = True
+
+            index = saved
+
+            for user, list_path, list_fp in plan:
+                with instrument.user("routes.index", user):
+                    entries, _ = read_list(list_path)
+                    routes = listed_routes(entries)
+
+                save_entries(user, list_fp, pack_entries(routes))
+
+                user_changed = apply_entries(index, user, previous_entries(index, user, previous_users), routes)
+                changed |= user_changed
+                print(f"🔁 {user}: {len(user_changed)} changed routes")
+
+            for user in deleted:
+                changed |= apply_entries(index, user, previous_entries(index, user, previous_users), {})
+                print(f"🗑  {user} removed")
+
+        if changed or not os.path.exists(INDEX_PATH):
+            save_route_index(index)
+
+    if rebuild_pages or changed:
+        if catalog is None:
+            with instrument.stage("routes.load"):
+                catalog = per_system_pages.load_route_catalog()
+
+        catalog = {**catalog, "dead_links": load_dead_links()}
+        route_system = catalog["route_system"]
+        total_users = len(users)
+
+        with instrument.stage("routes.write"):
+            if rebuild_pages:
+                if paged is None:
+                    pages = route_system.keys()
+                else:
+                    pages = paged | {(region, route) for region, routes in index.items() for route in routes}
+                systems = catalog["system_routes"].keys()
+            else:
+                pages = changed
+                systems = affected_systems(changed, catalog["system_routes"])
+
+            for region, route in sorted(pages):
+                if (region, route) not in route_system:
+                    continue  # not a PhotoData route: no page
+
+                caught_by = route_users(index, region, route)
+                if not caught_by and not os.path.exists(route_page_path(region, route)):
+                    continue
+
+                print(f"📄 {write_route_page(region, route, caught_by, catalog, total_users)}")
+
+            for system_name in catalog["system_routes"]:
+                if system_name in systems:
+                    print(f"📄 {write_system_ranking(system_name, index, catalog, total_users)}")
+
+            print(f"📄 {write_routes_index(index, catalog)}")
+
+    manifest["data"] = data_sources
+    manifest["users"] = users
+    save_manifest("route_index", manifest)
+
+    print(f"🧭 {sum(len(routes) for routes in index.values())} routes indexed, {len(changed)} changed")
+    print(render.stats_line())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the route → users index and route popularity pages.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only re-index lists that changed since the last run"
+    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    instrument.start(args)
+    build_route_index(incremental=args.incremental)
+    instrument.finish(args.timings)
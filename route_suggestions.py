@@ -0,0 +1,77 @@
+import string
+
+
+# --------------------------------------- #
+# Near-miss lookup for .list entries that match no PhotoData route.
+#
+# Every known route is indexed once under two normalized keys, so a
+# suggestion is a handful of dict lookups instead of an edit-distance
+# scan over every route:
+#
+#   name: case-folded, punctuation removed   ("I-5"   -> "i5")
+#   core: name without its letter prefix     ("I-5"   -> "5",
+#                                             "US101" -> "101")
+# --------------------------------------- #
+
+
+def normalize_route(route):
+    return "".join(ch for ch in route.casefold() if ch.isalnum())
+
+
+def route_core(name):
+    return name.lstrip(string.ascii_lowercase)
+
+
+def build_suggestion_index(known_pairs):
+    """
+    known_pairs:
+      iterable of (region, route)
+
+    Returns dict:
+      regions: region.casefold() -> {"name": {name: [(region, route)]},
+                                     "core": {core: [(region, route)]}}
+      names:   name -> [(region, route)] across every region
+    """
+    regions = {}
+    names = {}
+
+    for region, route in sorted(known_pairs):
+        pair = (region, route)
+        name = normalize_route(route)
+        core = route_core(name)
+
+        region_index = regions.setdefault(region.casefold(), {"name": {}, "core": {}})
+        region_index["name"].setdefault(name, []).append(pair)
+        if core:
+            region_index["core"].setdefault(core, []).append(pair)
+
+        names.setdefault(name, []).append(pair)
+
+    return {"regions": regions, "names": names}
+
+
+def suggest_routes(index, region, route, limit=3):
+    """
+    Returns:
+      up to `limit` known (region, route) pairs close to an unmatched entry,
+      best first: same normalized name in the same region, then same number
+      in the same region, then same normalized name in another region
+    """
+    name = normalize_route(route)
+    core = route_core(name)
+    region_index = index["regions"].get(region.casefold(), {"name": {}, "core": {}})
+
+    candidates = [
+        *region_index["name"].get(name, ()),
+        *(region_index["core"].get(core, ()) if core else ()),
+        *index["names"].get(name, ()),
+    ]
+
+    suggestions = []
+    for pair in candidates:
+        if pair not in suggestions and pair != (region, route):
+            suggestions.append(pair)
+            if len(suggestions) == limit:
+                break
+
+    return suggestions
@@ -0,0 +1,114 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import completion_store
+import per_system_pages
+import photodata_snapshot
+import validate
+from list_parser import parse_list, listed_routes
+
+
+# TX I-10 is in both systems (b.csv, last in name order, owns it) and
+# a.csv repeats its TX I-20 row
+SYSTEM_CSVS = {
+    "a": [("TX", "I-10"), ("TX", "I-20"), ("TX", "I-20"), ("OK", "I-35")],
+    "b": [("TX", "I-10"), ("TX", "US-1")],
+}
+REGION_CSVS = {
+    "TX": ["I-10", "I-20", "US-1"],
+    "OK": ["I-35"],
+}
+LIST_LINES = ["TX I-10", "TX I-20", "TX US-1", "OK I-35"]
+
+
+class CompletionStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+
+        photodata = os.path.join(tmp.name, "PhotoData")
+        systems_dir = os.path.join(photodata, "_systems")
+        regions_dir = os.path.join(photodata, "_regions")
+        list_dir = os.path.join(tmp.name, "list_files")
+
+        for directory in (systems_dir, regions_dir, list_dir):
+            os.makedirs(directory)
+
+        write_lines(os.path.join(photodata, "systems.csv"), ["System;CountryCode;Name", "a;USA;System A", "b;USA;System B"])
+        write_lines(os.path.join(photodata, "regions.csv"), ["code;name", "TX;Texas", "OK;Oklahoma"])
+
+        for system_name, rows in SYSTEM_CSVS.items():
+            write_lines(
+                os.path.join(systems_dir, f"{system_name}.csv"),
+                ["System;Region;Route"] + [f"{system_name};{region};{route}" for region, route in rows]
+            )
+        for region, routes in REGION_CSVS.items():
+            write_lines(
+                os.path.join(regions_dir, f"{region}.csv"),
+                ["System;Region;Route"] + [f"x;{region};{route}" for route in routes]
+            )
+
+        self.list_path = os.path.join(list_dir, "alice.list")
+        write_lines(self.list_path, LIST_LINES)
+
+        for patcher in (
+            mock.patch.object(photodata_snapshot, "PHOTODATA_DIR", photodata),
+            mock.patch.object(completion_store, "LIST_DIR", list_dir),
+            mock.patch.multiple(
+                validate,
+                SYSTEMS_DIR=systems_dir,
+                REGIONS_DIR=regions_dir,
+                SYSTEMS_INDEX=os.path.join(photodata, "systems.csv"),
+                REGIONS_INDEX=os.path.join(photodata, "regions.csv"),
+            ),
+            mock.patch.multiple(per_system_pages, SYSTEMS_DIR=systems_dir, REGIONS_DIR=regions_dir),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.conn = completion_store.open_store(os.path.join(tmp.name, "store.sqlite3"))
+        self.addCleanup(self.conn.close)
+        completion_store.sync_store(self.conn)
+
+    def test_summaries_match_validate(self):
+        data = validate.read_validation_data()
+        result, = validate.score_users(data, [("alice", self.list_path, None)])
+
+        for kind in ("system", "region"):
+            with self.subTest(kind=kind):
+                self.assertEqual(
+                    sorted(completion_store.completion_summary(self.conn, "alice", kind)),
+                    sorted(result[f"{kind}_summary"])
+                )
+
+        self.assertEqual(completion_store.leaderboard(self.conn)[0][1:3], tuple(result["leaderboard"][:2]))
+
+    def test_state_summary_matches_the_state_pages(self):
+        catalog = per_system_pages.read_route_catalog()
+        routes = listed_routes(parse_list(self.list_path)[0])
+
+        for region in catalog["region_totals"]:
+            with self.subTest(region=region):
+                counts = per_system_pages.state_system_counts(region, routes, catalog)
+                self.assertEqual(
+                    completion_store.state_summary(self.conn, "alice", region),
+                    [(system_name, c["done"], c["total"]) for system_name, c in sorted(counts.items())]
+                )
+
+        # The repeated row counts towards a's total, the shared route only for b
+        self.assertEqual(completion_store.state_summary(self.conn, "alice", "TX"), [("a", 1, 3), ("b", 2, 2)])
+
+
+def write_lines(path, lines):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
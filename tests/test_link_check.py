@@ -0,0 +1,222 @@
+import os
+import ssl
+import sys
+import json
+import time
+import socket
+import asyncio
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import link_check
+
+
+SLOW_SECONDS = 0.05
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Local stand-in for the image hosts, one behaviour per path prefix.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def respond(self, status, body=b"", headers=()):
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def handle_any(self):
+        path = self.path
+
+        if path.startswith("/ok"):
+            self.respond(200, b"x" * 100)
+        elif path.startswith("/nohead"):
+            self.respond(405 if self.command == "HEAD" else 200, b"x" * 100)
+        elif path.startswith("/redirect"):
+            self.respond(302, headers=[("Location", "/ok/target")])
+        elif path.startswith("/busy"):
+            self.respond(503)
+        elif path.startswith("/gone"):
+            self.respond(410)
+        elif path.startswith("/forbidden"):
+            self.respond(403)
+        elif path.startswith("/reset"):
+            # Hangs up without answering
+            self.close_connection = True
+        elif path.startswith("/unicode/"):
+            self.respond(200 if path == "/unicode/%E6%9D%B1%E4%BA%AC%201.jpg" else 400)
+        elif path.startswith("/slow"):
+            time.sleep(SLOW_SECONDS)
+            self.respond(200)
+        elif path.startswith("/truncated"):
+            if self.command == "HEAD":
+                self.respond(405)
+                return
+            # Promises 100 bytes, sends 5 and hangs up
+            self.send_response(200)
+            self.send_header("Content-Length", "100")
+            self.end_headers()
+            self.wfile.write(b"short")
+            self.close_connection = True
+        elif path.startswith("/garbage"):
+            self.wfile.write(b"NONSENSE\r\n\r\n")
+            self.close_connection = True
+        else:
+            self.respond(404)
+
+    do_HEAD = handle_any
+    do_GET = handle_any
+
+    def log_message(self, *args):
+        pass
+
+
+class LinkCheckTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+        cls.server.daemon_threads = True
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def check(self, paths, **options):
+        urls = [self.base + path for path in paths]
+        results = asyncio.run(link_check.check_urls(urls, **options))
+        return [results[url] for url in urls]
+
+    def test_classification(self):
+        ok, nohead, redirect, missing, gone, forbidden, busy = self.check(
+            ["/ok/1", "/nohead/1", "/redirect/1", "/missing/1", "/gone/1", "/forbidden/1", "/busy/1"]
+        )
+        unsupported = asyncio.run(link_check.check_urls(["ftp://example.com/x.jpg"]))["ftp://example.com/x.jpg"]
+
+        self.assertEqual((ok["status"], ok["dead"]), (200, False))
+        self.assertEqual((nohead["status"], nohead["dead"]), (200, False))
+        self.assertEqual((redirect["status"], redirect["dead"]), (200, False))
+        self.assertEqual((missing["status"], missing["dead"]), (404, True))
+        self.assertEqual((gone["status"], gone["dead"]), (410, True))
+        self.assertEqual((forbidden["status"], forbidden["dead"], forbidden["transient"]), (403, False, False))
+        self.assertTrue(busy["transient"])
+        self.assertTrue(unsupported["dead"])
+
+    def test_refused_connection_is_dead(self):
+        url = f"http://127.0.0.1:{unused_port()}/x.jpg"
+        result = asyncio.run(link_check.check_urls([url], timeout=2.0))[url]
+
+        self.assertTrue(result["dead"])
+
+    def test_dropped_connection_is_transient(self):
+        reset, = self.check(["/reset/1"])
+
+        self.assertEqual((reset["dead"], reset["transient"]), (False, True))
+
+    def test_only_refusals_and_unknown_hosts_are_dead(self):
+        url = "http://photos.example/x.jpg"
+        errors = [
+            (socket.gaierror(socket.EAI_NONAME, "Name or service not known"), True),
+            (socket.gaierror(socket.EAI_AGAIN, "Temporary failure in name resolution"), False),
+            (ConnectionRefusedError(111, "Connection refused"), True),
+            (ConnectionResetError(104, "Connection reset by peer"), False),
+            (ssl.SSLError(1, "record layer failure"), False),
+            (OSError(113, "No route to host"), False),
+        ]
+
+        for error, dead in errors:
+            with self.subTest(error=error), mock.patch.object(
+                link_check.asyncio, "open_connection", side_effect=error
+            ):
+                result = asyncio.run(link_check.check_urls([url]))[url]
+
+                self.assertEqual((result["dead"], result["transient"]), (dead, not dead))
+
+    def test_non_latin1_urls_are_quoted(self):
+        result, = self.check(["/unicode/東京 1.jpg"])
+
+        self.assertEqual(result["status"], 200)
+        self.assertEqual(
+            link_check.wire_url("https://bücher.example/東京.jpg?q=é"),
+            "https://xn--bcher-kva.example/%E6%9D%B1%E4%BA%AC.jpg?q=%C3%A9"
+        )
+
+    def test_waiting_for_a_host_slot_does_not_count_against_the_timeout(self):
+        # 40 requests through 2 slots queue for ~1s, each takes 0.05s
+        results = self.check([f"/slow/{i}" for i in range(40)], per_host=2, timeout=0.5)
+
+        self.assertEqual([result["status"] for result in results], [200] * 40)
+
+    def test_protocol_errors_stay_per_url(self):
+        truncated, garbage, ok = self.check(["/truncated/1", "/garbage/1", "/ok/2"])
+
+        self.assertTrue(truncated["transient"])
+        self.assertIn("bad response", truncated["error"])
+        self.assertTrue(garbage["transient"])
+        self.assertEqual(ok["status"], 200)
+
+    def test_checking_some_lists_keeps_the_other_dead_links(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            list_dir = os.path.join(tmp, "list_files")
+            os.makedirs(list_dir)
+
+            def write_list(user, *urls):
+                with open(os.path.join(list_dir, f"{user}.list"), "w", encoding="utf-8") as f:
+                    for i, url in enumerate(urls):
+                        f.write(f"TX I-{i + 10} {url}\n")
+
+            write_list("alice", f"{self.base}/missing/alice", f"{self.base}/ok/alice")
+            write_list("bob", f"{self.base}/missing/bob")
+
+            with mock.patch.multiple(
+                link_check,
+                LIST_DIR=list_dir,
+                LINK_CACHE_PATH=os.path.join(tmp, "link_cache.json"),
+                DEAD_LINKS_PATH=os.path.join(tmp, "dead_links.json"),
+            ), mock.patch("builtins.print"):
+                link_check.audit_links()
+                self.assertEqual(
+                    link_check.load_dead_links(),
+                    {f"{self.base}/missing/alice", f"{self.base}/missing/bob"}
+                )
+
+                # Only alice's list, everything rechecked
+                link_check.audit_links([os.path.join(list_dir, "alice.list")], ttl=-1)
+                self.assertEqual(
+                    link_check.load_dead_links(),
+                    {f"{self.base}/missing/alice", f"{self.base}/missing/bob"}
+                )
+
+                # bob's list is fixed: the link drops out even on a partial run
+                write_list("bob", f"{self.base}/ok/bob")
+                link_check.audit_links([os.path.join(list_dir, "alice.list")])
+                self.assertEqual(link_check.load_dead_links(), {f"{self.base}/missing/alice"})
+
+                with open(os.path.join(tmp, "link_cache.json"), encoding="utf-8") as f:
+                    self.assertIn(f"{self.base}/ok/alice", json.load(f)["links"])
+
+
+def unused_port():
+    """
+    Returns:
+      a local port with nothing listening on it
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,29 @@
 import os
-import csv
+import heapq
+import argparse
 from tabulate import tabulate
 
+from build_manifest import (
+    load_manifest,
+    save_manifest,
+    file_fingerprint,
+    same_content,
+    source_files,
+    fingerprint_sources,
+    sources_changed,
+    script_files,
+)
+from list_diff import pack_entries, unpack_entries, diff_entries
+from entry_store import load_entries, save_entries
+from list_parser import parse_list, listed_routes, diagnostic_counts
+import parallel
+import instrument
+import render
+from photodata_snapshot import read_csv_rows, cached_catalog
+from route_bitsets import build_route_table
+from route_suggestions import build_suggestion_index, suggest_routes
+from completion_matrix import build_completion_tables, completion_summary, leaderboard_rows
+
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -14,6 +36,10 @@ REGIONS_DIR = os.path.join(BASE_DIR, "..", "PhotoData", "_regions")
 SYSTEMS_INDEX = os.path.join(BASE_DIR, "..", "PhotoData", "systems.csv")
 REGIONS_INDEX = os.path.join(BASE_DIR, "..", "PhotoData", "regions.csv")
 
+# Shared modules whose code shapes these pages: the incremental manifest
+# treats a change to any of them like a change to this script
+SHARED_MODULES = ("render", "list_parser", "list_diff", "route_bitsets", "route_suggestions", "completion_matrix")
+
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -22,33 +48,31 @@ def load_systems():
     """
     Returns:
       systems:
-        (region, route_name) -> system_file
+        (region, route_name) -> system_file; a route listed by several
+        systems belongs to the last file in name order, as on the state
+        pages (see per_system_pages.read_route_catalog)
       system_routes:
         system_file -> set(route_name)
     """
     systems = {}
     system_routes = {}
 
-    for filename in os.listdir(SYSTEMS_DIR):
+    for filename in sorted(os.listdir(SYSTEMS_DIR)):
         if not filename.endswith(".csv"):
             continue
 
         path = os.path.join(SYSTEMS_DIR, filename)
         system_routes[filename] = set()
 
-        with open(path, newline="", encoding="utf-8") as f:
-            reader = csv.reader(f, delimiter=";")
-            next(reader, None)
-
-            for row in reader:
-                if len(row) < 3:
-                    continue
+        for row in read_csv_rows(path)[1:]:
+            if len(row) < 3:
+                continue
 
-                region = row[1].strip()
-                route_name = row[2].strip()
+            region = row[1].strip()
+            route_name = row[2].strip()
 
-                systems[(region, route_name)] = filename
-                system_routes[filename].add(route_name)
+            systems[(region, route_name)] = filename
+            system_routes[filename].add(route_name)
 
     return systems, system_routes
 
@@ -70,89 +94,67 @@ def load_regions():
 
         region_routes[region] = set()
 
-        with open(path, newline="", encoding="utf-8") as f:
-            reader = csv.reader(f, delimiter=";")
-            next(reader, None)  # header
-
-            for row in reader:
-                # Expecting at least: system / region / route
-                if len(row) < 3:
-                    continue
+        for row in read_csv_rows(path)[1:]:  # skip header
+            # Expecting at least: system / region / route
+            if len(row) < 3:
+                continue
 
-                route_name = row[2].strip()
+            route_name = row[2].strip()
 
-                # Deduplicate by route designation ONLY
-                region_routes[region].add(route_name)
+            # Deduplicate by route designation ONLY
+            region_routes[region].add(route_name)
 
     return region_routes
 
-def load_region_name_map():
+def load_region_name_map(path=None):
     """
-    Loads region abbreviation -> full name mapping from regions.csv
-    Header names are auto-detected to avoid KeyError.
+    Loads region abbreviation -> full name mapping from regions.csv (or
+    the given path). Header names are auto-detected to avoid KeyError.
     """
     name_map = {}
 
-    with open(REGIONS_INDEX, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f, delimiter=";")
-
-        # Normalize header names
-        fieldnames = {h.lower(): h for h in reader.fieldnames}
-
-        # Detect columns safely
-        code_col = fieldnames.get("region") or fieldnames.get("code") or fieldnames.get("abbrev")
-        name_col = fieldnames.get("name") or fieldnames.get("state")
+    rows = read_csv_rows(path or REGIONS_INDEX)
+    header = rows[0] if rows else []
 
-        if not code_col or not name_col:
-            raise RuntimeError(
-                f"regions.csv must contain columns for region code and name. "
-                f"Found headers: {reader.fieldnames}"
-            )
-
-        for row in reader:
-            region_code = row[code_col].strip()
-            full_name = row[name_col].strip()
-            name_map[region_code] = full_name
-
-    return name_map
-    
-
-def parse_list_file(path):
-    entries = []
+    # Normalize header names
+    fieldnames = {h.lower(): i for i, h in enumerate(header)}
 
-    with open(path, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
+    # Detect columns safely
+    code_col = fieldnames.get("region")
+    if code_col is None:
+        code_col = fieldnames.get("code", fieldnames.get("abbrev"))
 
-            parts = line.split(maxsplit=2)
-            if len(parts) < 2:
-                continue
+    name_col = fieldnames.get("name")
+    if name_col is None:
+        name_col = fieldnames.get("state")
 
-            region = parts[0]
-            route = parts[1]
-            url = parts[2] if len(parts) > 2 else None
+    if code_col is None or name_col is None:
+        raise RuntimeError(
+            f"regions.csv must contain columns for region code and name. "
+            f"Found headers: {header}"
+        )
 
-            entries.append((region, route, url))
+    for row in rows[1:]:
+        if not row:
+            continue
 
-    return entries
+        region_code = row[code_col].strip()
+        full_name = row[name_col].strip()
+        name_map[region_code] = full_name
 
+    return name_map
+    
 
-def load_system_name_map():
+def load_system_name_map(path=None):
     name_map = {}
 
-    with open(SYSTEMS_INDEX, newline="", encoding="utf-8") as f:
-        reader = csv.reader(f, delimiter=";")
-        next(reader, None)
-
-        for row in reader:
-            if len(row) < 3:
-                continue
+    for row in read_csv_rows(path or SYSTEMS_INDEX)[1:]:
+        if len(row) < 3:
+            continue
 
-            system_code = row[0].strip()
-            full_name = row[2].strip()
-            name_map[system_code] = full_name
+        system_code = row[0].strip()
+        full_name = row[2].strip()
+        name_map[system_code] = full_name
 
     return name_map
 
@@ -163,84 +165,7 @@ def completion_to_hsl(percent):
     return f"hsl({hue:.6f}, 80%, 80%)"
 
 
-def write_html_report(title, label, summary, html_out, link_map=None, nav_links=None):
-    with open(html_out, "w", encoding="utf-8") as f:
-        f.write(f"""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>{title}</title>
-
-<style>
-@font-face {{
-  font-family: "ModeNine";
-  src: url("../fonts/ModeNine-Regular.woff2") format("woff2"),
-       url("../fonts/ModeNine-Regular.woff") format("woff");
-}}
-
-body {{
-  font-family: "ModeNine", Arial, sans-serif;
-}}
-
-h1 {{
-  text-align: center;
-}}
-
-.nav {{
-  text-align: center;
-  margin-bottom: 12px;
-}}
-
-.nav a {{
-  margin: 0 10px;
-  text-decoration: underline;
-}}
-
-table {{
-  border-collapse: collapse;
-  width: 50%;
-  margin: 0 auto;
-}}
-
-table, tr, td {{
-  position: relative;
-}}
-
-th, td {{
-  border: 1px solid #ccc;
-  padding: 6px 8px;
-}}
-
-th {{
-  background: #eee;
-}}
-
-td.num {{
-  text-align: right;
-  font-variant-numeric: tabular-nums;
-}}
-
-td a {{
-  display: block;
-  width: 100%;
-  height: 100%;
-  color: inherit;
-  text-decoration: underline;
-  pointer-events: auto;
-  cursor: pointer;
-}}
-</style>
-</head>
-<body>
-""")
-
-        if nav_links:
-            f.write("<div class='nav'>\n")
-            for text, href in nav_links:
-                f.write(f"<a href='{href}'>{text}</a>\n")
-            f.write("</div>\n")
-
-        f.write(f"""
+REPORT_TABLE_HEAD = render.compile_template("""
 <h1>{title}</h1>
 
 <table>
@@ -252,33 +177,7 @@ td a {{
 </tr>
 """)
 
-        # ---- Table rows ----
-        for name, matched, total, pct in summary:
-            color = completion_to_hsl(pct)
-
-            if link_map and name in link_map:
-                name_cell = f"<a href='{link_map[name]}'>{name}</a>"
-            else:
-                name_cell = name
-
-            f.write(
-                "<tr>"
-                f"<td>{name_cell}</td>"
-                f"<td class='num'>{matched}</td>"
-                f"<td class='num'>{total}</td>"
-                f"<td class='num' style='background-color: {color};'>{pct:.2f}%</td>"
-                "</tr>\n"
-            )
-
-        # ---- Footer ----
-        f.write("""
-</table>
-</body>
-</html>
-""")
-
-def write_summary_table(f, label, summary, link_map):
-    f.write(f"""
+SUMMARY_TABLE_HEAD = render.compile_template("""
 <h2>{label}</h2>
 <table>
 <tr>
@@ -289,6 +188,10 @@ def write_summary_table(f, label, summary, link_map):
 </tr>
 """)
 
+
+def summary_rows(summary, link_map):
+    rows = []
+
     for name, matched, total, pct in summary:
         color = completion_to_hsl(pct)
 
@@ -297,7 +200,7 @@ def write_summary_table(f, label, summary, link_map):
         else:
             name_cell = name
 
-        f.write(
+        rows.append(
             "<tr>"
             f"<td>{name_cell}</td>"
             f"<td class='num'>{matched}</td>"
@@ -306,83 +209,169 @@ def write_summary_table(f, label, summary, link_map):
             "</tr>\n"
         )
 
-    f.write("</table>\n")
+    return rows
+
+
+def html_report_parts(title, label, summary, html_out, link_map=None, nav_links=None):
+    parts = [render.page_head(html_out, title, "report")]
+
+    if nav_links:
+        parts.append("<div class='nav'>\n")
+        parts.extend(f"<a href='{href}'>{text}</a>\n" for text, href in nav_links)
+        parts.append("</div>\n")
+
+    parts.append(render.fill(REPORT_TABLE_HEAD, title=title, label=label))
+
+    # ---- Table rows ----
+    parts.extend(summary_rows(summary, link_map))
+
+    # ---- Footer ----
+    parts.append(render.PAGE_FOOT)
+
+    return parts
+
+
+def write_html_report(title, label, summary, html_out, link_map=None, nav_links=None):
+    render.write_page(html_out, html_report_parts(title, label, summary, html_out, link_map, nav_links))
+
+
+UNMATCHED_TABLE_HEAD = render.compile_template("""
+<h1>{title}</h1>
+
+<p>{count} entries match no route in PhotoData.</p>
+
+<table>
+<tr>
+  <th>Line</th>
+  <th>Entry</th>
+  <th>Did you mean</th>
+</tr>
+""")
+
+
+def unmatched_report_parts(title, unmatched, index, html_out, nav_links=None):
+    """
+    unmatched:
+      list of (line, region, route) entries that match no scored route
+    index:
+      route_suggestions.build_suggestion_index over the scored routes
+    """
+    parts = [render.page_head(html_out, title, "report")]
+
+    if nav_links:
+        parts.append("<div class='nav'>\n")
+        parts.extend(f"<a href='{href}'>{text}</a>\n" for text, href in nav_links)
+        parts.append("</div>\n")
+
+    parts.append(render.fill(UNMATCHED_TABLE_HEAD, title=title, count=len(unmatched)))
+
+    for line, region, route in unmatched:
+        suggestions = ", ".join(
+            f"{s_region} {s_route}" for s_region, s_route in suggest_routes(index, region, route)
+        )
+
+        parts.append(
+            "<tr>"
+            f"<td class='num'>{line}</td>"
+            f"<td>{region} {route}</td>"
+            f"<td>{suggestions or '—'}</td>"
+            "</tr>\n"
+        )
+
+    parts.append(render.PAGE_FOOT)
+
+    return parts
+
+
+def write_unmatched_report(title, unmatched, index, html_out, nav_links=None):
+    render.write_page(html_out, unmatched_report_parts(title, unmatched, index, html_out, nav_links))
+
+
+def write_summary_table(f, label, summary, link_map):
+    f.write("".join([
+        render.fill(SUMMARY_TABLE_HEAD, label=label),
+        *summary_rows(summary, link_map),
+        "</table>\n",
+    ]))
 
 
 def write_user_index(users, html_out):
-    with open(html_out, "w", encoding="utf-8") as f:
-        f.write("""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>User Pages</title>
-<style>
-body {
-  font-family: Arial, sans-serif;
-}
-ul {
-  list-style: none;
-  padding: 0;
-}
-li {
-  margin: 6px 0;
-}
-a {
-  text-decoration: underline;
-}
-</style>
-</head>
-<body>
+    parts = [render.page_head(html_out, "User Pages", "user-index")]
 
+    parts.append("""
 <h1>User Pages</h1>
 <ul>
 """)
 
-        for user in sorted(users):
-            f.write(
-                f"<li>"
-                f"<a href='./{user}/systems.html'>{user}</a>"
-                f"</li>\n"
-            )
+    parts.extend(
+        f"<li>"
+        f"<a href='./{user}/systems.html'>{user}</a>"
+        f"</li>\n"
+        for user in sorted(users)
+    )
 
-        f.write("""
+    parts.append("""
 </ul>
 </body>
 </html>
 """)
 
+    render.write_page(html_out, parts)
+
+
+def leaderboard_page_path(html_out, page):
+    if page == 1:
+        return html_out
+
+    base, ext = os.path.splitext(html_out)
+    return f"{base}_{page}{ext}"
+
+
+def write_leaderboard(leaderboard, html_out, top=None, page_size=None):
+    """
+    Writes the leaderboard once all users are scored.
+
+    top:
+      only keep the best N rows (selected with a heap instead of a full sort)
+    page_size:
+      split the board over leaderboard.html, leaderboard_2.html, ...
+
+    Returns:
+      list of written paths
+    """
+    if top:
+        ranked = heapq.nlargest(top, leaderboard, key=lambda r: r[3])
+    else:
+        ranked = sorted(leaderboard, key=lambda r: r[3], reverse=True)
+
+    if page_size:
+        pages = [ranked[i:i + page_size] for i in range(0, len(ranked), page_size)] or [[]]
+    else:
+        pages = [ranked]
+
+    written = []
+    rank = 1
 
-def write_leaderboard(leaderboard, html_out):
-    leaderboard.sort(key=lambda r: r[3], reverse=True)
-
-    with open(html_out, "w", encoding="utf-8") as f:
-        f.write("""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>Leaderboard</title>
-<style>
-table {
-  margin: 0 auto;
-  border-collapse: collapse;
-  width: 60%;
-}
-th, td {
-  border: 1px solid #ccc;
-  padding: 6px 8px;
-}
-th {
-  background: #eee;
-}
-td.num {
-  text-align: right;
-}
-</style>
-</head>
-<body>
+    for page, rows in enumerate(pages, start=1):
+        out_path = leaderboard_page_path(html_out, page)
 
+        parts = [render.page_head(out_path, "Leaderboard", "leaderboard")]
+        parts.append("""
 <h1>Leaderboard</h1>
-<table>
+""")
+
+        if len(pages) > 1:
+            parts.append("<p>")
+            if page > 1:
+                prev_href = os.path.basename(leaderboard_page_path(html_out, page - 1))
+                parts.append(f"<a href='./{prev_href}'>← Previous</a> ")
+            parts.append(f"Page {page} of {len(pages)}")
+            if page < len(pages):
+                next_href = os.path.basename(leaderboard_page_path(html_out, page + 1))
+                parts.append(f" <a href='./{next_href}'>Next →</a>")
+            parts.append("</p>\n")
+
+        parts.append("""<table>
 <tr>
   <th>Rank</th>
   <th>User</th>
@@ -392,168 +381,373 @@ td.num {
 </tr>
 """)
 
-        for i, (user, m, t, pct) in enumerate(leaderboard, start=1):
+        for user, m, t, pct in rows:
             color = completion_to_hsl(pct)
 
-            f.write(
+            parts.append(
                 "<tr>"
-                f"<td class='num'>{i}</td>"
+                f"<td class='num'>{rank}</td>"
                 f"<td><a href='./users/{user}/systems.html'>{user}</a></td>"
                 f"<td class='num'>{m}</td>"
                 f"<td class='num'>{t}</td>"
                 f"<td class='num' style='background-color: {color};'>{pct:.2f}%</td>"
                 "</tr>\n"
             )
+            rank += 1
 
-        f.write("""
-</table>
-</body>
-</html>
-""")
+        parts.append(render.PAGE_FOOT)
 
+        render.write_page(out_path, parts)
+        written.append(out_path)
 
+    return written
 
-def validate_all():
-    leaderboard = []
+
+
+def load_validation_data():
+    """
+    Returns:
+      read_validation_data()'s tables, from the PhotoData snapshot when
+      nothing changed since they were built
+    """
+    return cached_catalog("validation_data", read_validation_data)
+
+
+def read_validation_data():
+    """
+    Loads everything score_users and write_user_reports need from
+    PhotoData, once per run.
+    """
     systems, system_routes = load_systems()
     region_routes = load_regions()
-    TOTAL_PROJECT_ROUTES = sum(len(routes) for routes in region_routes.values())
-    system_names = load_system_name_map()
-    region_names = load_region_name_map()
+    route_table = build_route_table(systems, system_routes, region_routes)
+
+    return {
+        "systems": systems,
+        "system_routes": system_routes,
+        "region_routes": region_routes,
+        "route_table": route_table,
+        "suggestions": build_suggestion_index(route_table["route_ids"]),
+        "total_routes": sum(len(routes) for routes in region_routes.values()),
+        "system_names": load_system_name_map(),
+        "region_names": load_region_name_map(),
+    }
+
+
+def touches_scored_routes(data, pairs):
+    systems = data["systems"]
+    region_routes = data["region_routes"]
+
+    return any(
+        key in systems or key[1] in region_routes.get(key[0], ())
+        for key in pairs
+    )
 
-    for filename in sorted(os.listdir(LIST_DIR)):
-        if not filename.endswith(".list"):
-            continue
 
-        user_id = os.path.splitext(filename)[0]
-        list_path = os.path.join(LIST_DIR, filename)
+def score_users(data, tasks, read_list=parse_list):
+    """
+    Parses every task's list and scores all of them together with
+    build_completion_tables (see load_validation_data for data).
 
-        
-        state_base_url = f"https://tbks1.neocities.org/{user_id}/states"
-        system_base_url = f"https://tbks1.neocities.org/{user_id}/systems"
+    tasks:
+      list of (user_id, list_path, packed entries of the previous run or None)
+    read_list:
+      (list_path, known routes) -> (entries, diagnostics), as returned by
+      list_parser.parse_list
 
-        
-        region_link_map = {
-            full_name: f"{state_base_url}/{code}"
-            for code, full_name in region_names.items()
-        }
+    Returns:
+      one dict per task, in order, with the user's packed entries, the
+      counts of their list diagnostics, their unmatched entries and either
+      skipped=True (no scored route changed since the previous entries) or
+      the leaderboard row and both summaries
+    """
+    system_routes = data["system_routes"]
+    region_routes = data["region_routes"]
+    system_names = data["system_names"]
+    region_names = data["region_names"]
+
+    results = []
+    scored = []
+
+    with instrument.stage("validate.parse"):
+        for user_id, list_path, previous_entries in tasks:
+            with instrument.user("validate.parse", user_id):
+                entries, diagnostics = read_list(list_path, data["route_table"]["route_ids"])
+                routes = listed_routes(entries)
+
+            result = {
+                "entries": pack_entries(routes),
+                "diagnostics": diagnostic_counts(diagnostics),
+                "unmatched": [
+                    (d.line, d.region, d.route) for d in diagnostics if d.kind == "unknown"
+                ],
+                "skipped": False,
+            }
+            results.append(result)
+
+            if previous_entries is not None:
+                added, removed, _ = diff_entries(unpack_entries(previous_entries), routes)
+
+                if not touches_scored_routes(data, added | removed):
+                    result["skipped"] = True
+                    continue
+
+            scored.append((user_id, routes, result))
 
-        system_link_map = {}
+    with instrument.stage("validate.score"):
+        tables = build_completion_tables(
+            data["route_table"],
+            [(user_id, routes) for user_id, routes, _ in scored]
+        )
+
+        system_totals = {system_file: len(routes) for system_file, routes in system_routes.items()}
+        region_totals = {region: len(routes) for region, routes in region_routes.items()}
 
-        for system_file in system_routes.keys():
+        system_display = {}
+        for system_file in system_routes:
             system_code = system_file.replace(".csv", "")
-            display_name = system_names.get(system_code, system_code)
-            system_link_map[display_name] = f"{system_base_url}/{system_code}"
+            system_display[system_file] = system_names.get(system_code, system_code)
 
-        entries = parse_list_file(list_path)
+        region_display = {region: region_names.get(region, region) for region in region_routes}
 
-        # ---- Systems ----
-        matched_by_system = {}
+        leaderboard = leaderboard_rows(tables, data["total_routes"])
 
-        for region, route, _ in entries:
-            key = (region, route)
-            if key not in systems:
-                continue
+        for row, (_, _, result) in enumerate(scored):
+            result.update(
+                leaderboard=list(leaderboard[row][1:]),
+                system_summary=completion_summary(tables, "system", row, system_totals, system_display),
+                region_summary=completion_summary(tables, "region", row, region_totals, region_display),
+            )
 
-            system_file = systems[key]
-            matched_by_system.setdefault(system_file, set()).add(route)
+    return results
 
-        system_summary = []
 
-        for system_file, routes in system_routes.items():
-            total = len(routes)
-            matched = len(matched_by_system.get(system_file, set()))
-            pct = (matched / total * 100) if total else 0.0
+def user_report_pages(task, data):
+    """
+    Renders one user's systems.html / regions.html / unmatched.html (only
+    the latter when the summaries are None, i.e. the user's scores didn't
+    change but their unmatched entries may have).
 
-            system_code = system_file.replace(".csv", "")
-            system_name = system_names.get(system_code, system_code)
+    task:
+      (user_id, system_summary, region_summary, unmatched)
+    data:
+      see load_validation_data
 
-            if matched > 0:
-                system_summary.append((system_name, matched, total, pct))
+    Returns:
+      output path -> list of string parts (see render.write_page)
+    """
+    user_id, system_summary, region_summary, unmatched = task
 
-        system_summary.sort(key=lambda r: r[3], reverse=True)
+    system_routes = data["system_routes"]
+    system_names = data["system_names"]
+    region_names = data["region_names"]
 
-        # ---- Regions ----
-        matched_by_region = {}
+    state_base_url = f"https://tbks1.neocities.org/{user_id}/states"
+    system_base_url = f"https://tbks1.neocities.org/{user_id}/systems"
 
-        for region, route, _ in entries:
-            if region not in region_routes:
-                continue
+    
+    region_link_map = {
+        full_name: f"{state_base_url}/{code}"
+        for code, full_name in region_names.items()
+    }
+
+    system_link_map = {}
+
+    for system_file in system_routes.keys():
+        system_code = system_file.replace(".csv", "")
+        display_name = system_names.get(system_code, system_code)
+        system_link_map[display_name] = f"{system_base_url}/{system_code}"
+
+    # ---- Output ----
+    user_dir = os.path.join(USERS_OUTPUT_DIR, user_id)
+
+    systems_html = os.path.join(user_dir, "systems.html")
+    regions_html = os.path.join(user_dir, "regions.html")
+    unmatched_html = os.path.join(user_dir, "unmatched.html")
+
+    unmatched_parts = unmatched_report_parts(
+        title=f"{user_id} – Unmatched Entries",
+        unmatched=unmatched,
+        index=data["suggestions"],
+        html_out=unmatched_html,
+        nav_links=[
+            ("Systems", "systems.html"),
+            ("Regions", "regions.html"),
+        ]
+    )
 
-            if route in region_routes[region]:
-                matched_by_region.setdefault(region, set()).add(route)
+    if system_summary is None:
+        return {unmatched_html: unmatched_parts}
+
+    systems_nav = [
+        ("Regions", "regions.html"),
+        ("Leaderboard", "../../leaderboard.html"),
+    ]
+
+    regions_nav = [
+        ("Systems", "systems.html"),
+        ("Leaderboard", "../../leaderboard.html"),
+    ]    
+
+    systems_parts = html_report_parts(
+        title=f"{user_id} – Highway System Completion",
+        label="System",
+        summary=system_summary,
+        html_out=systems_html,
+        link_map=system_link_map,
+        nav_links=systems_nav
+    )
 
-        region_summary = []
+    regions_parts = html_report_parts(
+        title=f"{user_id} – State Completion",
+        label="State",
+        summary=region_summary,
+        html_out=regions_html,
+        link_map=region_link_map,
+        nav_links=regions_nav
+    )
 
-        for region, routes in region_routes.items():
-            total = len(routes)
-            matched = len(matched_by_region.get(region, set()))
-            pct = (matched / total * 100) if total else 0.0
+    return {
+        systems_html: systems_parts,
+        regions_html: regions_parts,
+        unmatched_html: unmatched_parts,
+    }
 
-            display_name = region_names.get(region, region)
 
-            if matched > 0:
-                region_summary.append((display_name, matched, total, pct))
+def write_user_reports(task):
+    """
+    Writes the pages of user_report_pages. Runs in a worker process when
+    validate_all is given jobs > 1; names come from parallel.SHARED (see
+    load_validation_data).
 
-        region_summary.sort(key=lambda r: r[3], reverse=True)
+    Returns:
+      list of written paths: systems.html, regions.html, unmatched.html
+    """
+    pages = user_report_pages(task, parallel.SHARED)
 
-        # ---- Leaderboard totals ---
-        matched_routes = sum(
-             len(routes) for routes in matched_by_region.values()
-        )
+    os.makedirs(os.path.join(USERS_OUTPUT_DIR, task[0]), exist_ok=True)
 
-        leaderboard_pct = (
-            matched_routes / TOTAL_PROJECT_ROUTES * 100
-            if TOTAL_PROJECT_ROUTES else 0.0
-        )
-        
-        leaderboard.append(
-            (user_id, matched_routes, TOTAL_PROJECT_ROUTES, leaderboard_pct)
-        )
+    for html_out, parts in pages.items():
+        render.write_page(html_out, parts)
+
+    return list(pages)
+
+
+def validate_all(
+    incremental=False,
+    leaderboard_top=None,
+    leaderboard_page_size=None,
+    jobs=1,
+    read_list=parse_list,
+    data=None
+):
+    """
+    Scores every user and writes systems.html / regions.html plus the leaderboard.
+
+    With incremental=True, users whose .list file is unchanged since the
+    last run reuse their cached leaderboard row instead of being rebuilt,
+    unless PhotoData (or this script) changed too. A changed list whose
+    added/removed routes don't match any system or region is skipped the
+    same way.
 
-        write_leaderboard(
-        leaderboard,
-        os.path.join(OUTPUT_DIR, "leaderboard.html")
+    All users are scored together by score_users; their pages are written
+    by write_user_reports, spread over `jobs` processes.
+    The leaderboard is written once, after every user is scored; see
+    write_leaderboard for leaderboard_top / leaderboard_page_size.
+
+    read_list and data let a caller (build.py) share already parsed lists
+    and an already loaded load_validation_data() with other stages.
+    """
+    manifest = load_manifest("validate")
+
+    render.reset_stats()
+    render.write_stylesheet()
+
+    data_sources = fingerprint_sources(
+        source_files(
+            dirs=[SYSTEMS_DIR, REGIONS_DIR],
+            files=[SYSTEMS_INDEX, REGIONS_INDEX, os.path.abspath(__file__), *script_files(*SHARED_MODULES)]
+        ),
+        manifest["data"]
     )
-        # ---- Output ----
-        user_dir = os.path.join(USERS_OUTPUT_DIR, user_id)
-        os.makedirs(user_dir, exist_ok=True)
+    rebuild_all = not incremental or sources_changed(manifest["data"], data_sources)
+    users = {}
 
-        systems_html = os.path.join(user_dir, "systems.html")
-        regions_html = os.path.join(user_dir, "regions.html")
+    leaderboard = []
+    plan = []
+    tasks = []
 
-        write_leaderboard(
-            leaderboard,
-            os.path.join(OUTPUT_DIR, "leaderboard.html")
-         )
+    with instrument.stage("validate.plan"):
+        for filename in sorted(os.listdir(LIST_DIR)):
+            if not filename.endswith(".list"):
+                continue
 
-        systems_nav = [
-            ("Regions", "regions.html"),
-            ("Leaderboard", "../../leaderboard.html"),
+            user_id = os.path.splitext(filename)[0]
+            list_path = os.path.join(LIST_DIR, filename)
+            user_dir = os.path.join(USERS_OUTPUT_DIR, user_id)
+
+            previous = manifest["users"].get(user_id, {})
+            list_fp = file_fingerprint(list_path, previous.get("list"))
+            can_reuse = (
+                not rebuild_all
+                and "leaderboard" in previous
+                and os.path.isdir(user_dir)
+            )
+
+            if can_reuse and same_content(previous.get("list"), list_fp):
+                plan.append((user_id, list_fp, previous, None))
+                continue
+
+            plan.append((user_id, list_fp, previous, len(tasks)))
+            tasks.append((user_id, list_path, load_entries(user_id, previous.get("list")) if can_reuse else None))
+
+    results = []
+    if tasks:
+        if data is None:
+            with instrument.stage("validate.load"):
+                data = load_validation_data()
+
+        results = score_users(data, tasks, read_list)
+
+        report_tasks = [
+            (
+                task[0],
+                result.get("system_summary"),
+                result.get("region_summary"),
+                result["unmatched"],
+            )
+            for task, result in zip(tasks, results)
         ]
+        with instrument.stage("validate.write"):
+            written = parallel.map_users(write_user_reports, report_tasks, jobs=jobs, shared=data)
 
-        regions_nav = [
-            ("Systems", "systems.html"),
-            ("Leaderboard", "../../leaderboard.html"),
-        ]    
-
-        write_html_report(
-            title=f"{user_id} – Highway System Completion",
-            label="System",
-            summary=system_summary,
-            html_out=systems_html,
-            link_map=system_link_map,
-            nav_links=systems_nav
-        )
+        for result, paths in zip(results, written):
+            result["written"] = paths
 
-        write_html_report(
-            title=f"{user_id} – State Completion",
-            label="State",
-            summary=region_summary,
-            html_out=regions_html,
-            link_map=region_link_map,
-            nav_links=regions_nav
-        )
+    for user_id, list_fp, previous, task_index in plan:
+        if task_index is None:
+            leaderboard.append((user_id, *previous["leaderboard"]))
+            users[user_id] = {**previous, "list": list_fp}
+            print(f"\nUser: {user_id} (unchanged, skipped)")
+            continue
+
+        result = results[task_index]
+        save_entries(user_id, list_fp, result["entries"])
+
+        if result["skipped"]:
+            leaderboard.append((user_id, *previous["leaderboard"]))
+            users[user_id] = {**previous, "list": list_fp}
+            print(f"\nUser: {user_id} (no scored routes changed, skipped)")
+            continue
+
+        leaderboard.append((user_id, *result["leaderboard"]))
+        users[user_id] = {
+            "list": list_fp,
+            "leaderboard": result["leaderboard"],
+        }
+
+        system_summary = result["system_summary"]
+        region_summary = result["region_summary"]
 
         # ---- Console output ----
         print(f"\nUser: {user_id}")
@@ -570,9 +764,69 @@ def validate_all():
             tablefmt="github"
         ))
 
-        print(f" {systems_html}")
-        print(f" {regions_html}")
+        if result["diagnostics"]:
+            print("List issues: " + ", ".join(
+                f"{count} {kind}" for kind, count in sorted(result["diagnostics"].items())
+            ))
+
+        for path in result["written"]:
+            print(f" {path}")
+
+    # ---- Leaderboard (single final stage) ----
+    with instrument.stage("validate.leaderboard"):
+        leaderboard_paths = write_leaderboard(
+            leaderboard,
+            os.path.join(OUTPUT_DIR, "leaderboard.html"),
+            top=leaderboard_top,
+            page_size=leaderboard_page_size
+        )
+
+    for path in leaderboard_paths:
+        print(f" {path}")
+
+    manifest["data"] = data_sources
+    manifest["users"] = users
+    save_manifest("validate", manifest)
+
+    print(render.stats_line())
 
 
 if __name__ == "__main__":
-    validate_all()
+    parser = argparse.ArgumentParser(description="Score every user and write summary pages.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild users whose .list file changed since the last run"
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        metavar="N",
+        help="only list the N highest-ranked users on the leaderboard"
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        metavar="N",
+        help="split the leaderboard into pages of N users"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="score users in N worker processes"
+    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    instrument.start(args)
+
+    validate_all(
+        incremental=args.incremental,
+        leaderboard_top=args.top,
+        leaderboard_page_size=args.page_size,
+        jobs=args.jobs
+    )
+
+    instrument.finish(args.timings)
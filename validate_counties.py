@@ -1,14 +1,36 @@
-import csv
 import os
 import glob
+import argparse
 from collections import defaultdict
 
+from build_manifest import (
+    load_manifest,
+    save_manifest,
+    file_fingerprint,
+    same_content,
+    source_files,
+    fingerprint_sources,
+    sources_changed,
+    script_files,
+)
+from list_diff import pack_entries, affected_regions
+from list_parser import parse_list, listed_routes, completed_pairs
+from entry_store import load_entries, save_entries
+import parallel
+import instrument
+import render
+from photodata_snapshot import read_csv_rows, cached_catalog
+from completion_matrix import build_county_tables
+
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
 LISTS_DIR = os.path.join(SCRIPT_DIR, "..", "PhotoUserData", "list_files")
 COUNTY_DATA_DIR = os.path.join(SCRIPT_DIR, "..", "PhotoData", "_counties")
 OUTPUT_ROOT = os.path.join(SCRIPT_DIR, "outputs", "counties")
-FONT_PATH = "ModeNine.ttf"
+
+# Shared modules whose code shapes these pages: the incremental manifest
+# treats a change to any of them like a change to this script
+SHARED_MODULES = ("render", "list_parser", "list_diff", "route_bitsets", "completion_matrix")
 
 os.makedirs(OUTPUT_ROOT, exist_ok=True)
 
@@ -19,105 +41,36 @@ def hsl_for_percentage(pct):
     return f"hsl({hue:.2f}, 80%, 80%)"
 
 
-def load_user_completed_pairs(list_path):
-    completed = set()
-
-    with open(list_path, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-
-            if not line or line.startswith("#"):
-                continue
-
-            parts = line.split()
-            if len(parts) < 2:
-                continue
-
-            region = parts[0].upper()
-            route = parts[1].upper()
-
-            completed.add((region, route))
-
-    return completed
-
-
 def load_state_counties(csv_path):
-    county_routes = defaultdict(list)  # 🔥 list instead of set (preserves order)
+    """
+    Returns:
+      region_code, county -> list of routes (file order, deduplicated)
+    """
+    county_routes = defaultdict(dict)  # 🔥 dict keys: ordered + O(1) dedup
     region_code = None
 
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.reader(f, delimiter=";")
+    for row in read_csv_rows(csv_path):
+        if not row or len(row) < 3:
+            continue
 
-        for row in reader:
-            if not row or len(row) < 3:
-                continue
-
-            if row[0].lower() in ("region", "state"):
-                continue
+        if row[0].lower() in ("region", "state"):
+            continue
 
-            region = row[0].strip().upper()
-            route = row[1].strip().upper()
-            county = row[2].strip()
+        region = row[0].strip().upper()
+        route = row[1].strip().upper()
+        county = row[2].strip()
 
-            region_code = region
+        region_code = region
 
-            # avoid duplicates but preserve order
-            if route not in county_routes[county]:
-                county_routes[county].append(route)
+        # avoid duplicates but preserve order
+        county_routes[county].setdefault(route, None)
 
-    return region_code, county_routes
-
-
-def write_state_html(user_dir, user_name, state, rows):
-    out_path = os.path.join(user_dir, f"{state}_counties.html")
+    return region_code, {
+        county: list(routes) for county, routes in county_routes.items()
+    }
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.write(f"""<!DOCTYPE html>
-<html>
-<head>
-<meta charset="utf-8">
-<title>{user_name} – {state} County Completion</title>
-
-<style>
-@font-face {{
-  font-family: "ModeNine";
-  src: url("../{FONT_PATH}") format("truetype");
-}}
-
-body {{
-  font-family: ModeNine, sans-serif;
-}}
-
-table {{
-  border-collapse: collapse;
-  width: 75%;
-  margin: 0 auto;
-}}
-
-th, td {{
-  border: 2px solid #222;
-  padding: 6px 10px;
-  vertical-align: top;
-}}
-
-th {{
-  background-color: #ddd;
-}}
-
-td.right {{
-  text-align: right;
-}}
-
-td.routes {{
-  max-width: 300px;
-  white-space: normal;
-  word-wrap: break-word;
-}}
-</style>
-</head>
-
-<body>
 
+COUNTY_PAGE_HEAD = render.compile_template("""
 <h2>{user_name} – {state} County Completion</h2>
 
 <table>
@@ -131,15 +84,7 @@ td.routes {{
 </tr>
 """)
 
-        for county, total, matched, pct, completed, missing in rows:
-            color = hsl_for_percentage(pct)
-
-            display_missing = missing[:12]
-            completed_str = ", ".join(completed) if completed else "—"
-            missing_str = ", ".join(missing) if missing else "—"
-            
-
-            f.write(f"""
+COUNTY_ROW = render.compile_template("""
 <tr>
   <td>{county}</td>
   <td class="right">{total}</td>
@@ -147,57 +92,288 @@ td.routes {{
   <td class="right" style="background-color: {color};">
     {pct:.2f}%
   </td>
-  <td class="routes">{completed_str}</td>
-  <td class="routes">{missing_str}</td>
+  <td class="routes">{completed}</td>
+  <td class="routes">{missing}</td>
 </tr>
 """)
 
-        f.write("""
-</table>
-</body>
-</html>
-""")
 
+def state_html_parts(out_path, user_name, state, rows):
+    """
+    rows:
+      see county_rows
 
-def validate_counties():
-    list_files = glob.glob(os.path.join(LISTS_DIR, "*.list"))
+    Returns:
+      the page's list of string parts (see render.write_page)
+    """
+    parts = [
+        render.page_head(out_path, f"{user_name} – {state} County Completion", "counties"),
+        render.fill(COUNTY_PAGE_HEAD, user_name=user_name, state=state),
+    ]
 
-    for list_path in list_files:
-        user_name = os.path.splitext(os.path.basename(list_path))[0]
-        print(f"Processing user: {user_name}")
+    for county, total, matched, pct, completed, missing in rows:
+        parts.append(render.fill(
+            COUNTY_ROW,
+            county=county,
+            total=total,
+            matched=matched,
+            color=hsl_for_percentage(pct),
+            pct=pct,
+            completed=", ".join(completed) if completed else "—",
+            missing=", ".join(missing) if missing else "—"
+        ))
+
+    parts.append(render.PAGE_FOOT)
+
+    return parts
+
+
+def write_state_html(user_dir, user_name, state, rows):
+    out_path = os.path.join(user_dir, f"{state}_counties.html")
+    return render.write_page(out_path, state_html_parts(out_path, user_name, state, rows))
+
+
+def load_county_tables():
+    """
+    Returns:
+      read_county_tables()'s index, from the PhotoData snapshot when
+      nothing changed since it was built
+    """
+    return cached_catalog("county_tables", read_county_tables)
+
+
+def read_county_tables():
+    """
+    Builds the per-run county index: every *_counties.csv is read once and
+    each (region, route) gets a dense integer ID for build_county_tables.
 
-        user_dir = os.path.join(OUTPUT_ROOT, user_name)
-        os.makedirs(user_dir, exist_ok=True)
+    Returns dict:
+      states:    region -> (county_routes, county_ids), where county_routes
+                 is county -> ordered, deduplicated routes and
+                 county_ids[county] lines up with county_routes[county]
+      route_ids: (region, route) -> id
+    """
+    states = {}
+    route_ids = {}
 
-        completed_pairs = load_user_completed_pairs(list_path)
+    for csv_path in sorted(glob.glob(os.path.join(COUNTY_DATA_DIR, "*_counties.csv"))):
+        region, county_routes = load_state_counties(csv_path)
+
+        county_ids = {}
+        for county, routes in county_routes.items():
+            county_ids[county] = [
+                route_ids.setdefault((region, route), len(route_ids))
+                for route in routes
+            ]
+
+        states[region] = (county_routes, county_ids)
+
+    return {"states": states, "route_ids": route_ids}
 
-        for csv_path in glob.glob(os.path.join(COUNTY_DATA_DIR, "*_counties.csv")):
-            region, county_routes = load_state_counties(csv_path)
 
-            rows = []
+def county_rows(county_routes, caught, flags):
+    """
+    county_routes:
+      county -> routes, from load_county_tables
+    caught, flags:
+      one user's state scores from build_county_tables
+
+    Returns:
+      list of (county, total, matched, pct, completed routes, missing routes),
+      highest completion first
+    """
+    rows = []
+    offset = 0
+
+    for (county, routes), matched in zip(county_routes.items(), caught):
+        total = len(routes)
+        county_flags = flags[offset:offset + total]
+        offset += total
+
+        completed = [route for route, flag in zip(routes, county_flags) if flag]
+        missing = [route for route, flag in zip(routes, county_flags) if not flag]
+
+        pct = (matched / total * 100) if total else 0
+
+        rows.append((county, total, matched, pct, completed, missing))
+
+    rows.sort(key=lambda r: r[3], reverse=True)
+    return rows
+
+
+def build_user_counties(task):
+    """
+    Writes one user's {state}_counties.html pages from their precomputed
+    county scores. Runs in a worker process when validate_counties is given
+    jobs > 1; the county index comes from parallel.SHARED (see
+    load_county_tables).
+
+    task:
+      (user_name, region -> (caught, flags) from build_county_tables)
+
+    Returns:
+      list of written paths
+    """
+    user_name, state_scores = task
+    states = parallel.SHARED["states"]
+
+    user_dir = os.path.join(OUTPUT_ROOT, user_name)
+    os.makedirs(user_dir, exist_ok=True)
+
+    written = []
+
+    for region, (caught, flags) in state_scores.items():
+        county_routes, _ = states[region]
+        rows = county_rows(county_routes, caught, flags)
+
+        written.append(write_state_html(user_dir, user_name, region, rows))
+
+    return written
+
+
+def validate_counties(
+    incremental=False,
+    jobs=1,
+    read_list=parse_list,
+    county_tables=None
+):
+    """
+    Writes {state}_counties.html for every user. All users are scored
+    together by build_county_tables; their pages are written by
+    build_user_counties, spread over `jobs` processes.
+
+    With incremental=True, users whose .list file is unchanged since the
+    last run are skipped, unless the county data (or this script) changed.
+    For a changed list, only the states with an added or removed route
+    are rewritten.
+
+    read_list and county_tables let a caller (build.py) share already
+    parsed lists and an already loaded load_county_tables() with other
+    stages.
+    """
+    manifest = load_manifest("validate_counties")
 
-            for county, routes in county_routes.items():
-                total = len(routes)
+    render.reset_stats()
+    render.write_stylesheet()
 
-                completed = [
-                    route for route in routes
-                    if (region, route) in completed_pairs
-                ]
+    data_sources = fingerprint_sources(
+        source_files(
+            dirs=[COUNTY_DATA_DIR],
+            files=[os.path.abspath(__file__), *script_files(*SHARED_MODULES)]
+        ),
+        manifest["data"]
+    )
+    rebuild_all = not incremental or sources_changed(manifest["data"], data_sources)
 
-                missing = [
-                    route for route in routes
-                    if route not in completed
-                ]
+    users = {}
+    plan = []
+    tasks = []
 
-                matched = len(completed)
-                pct = (matched / total * 100) if total else 0
+    list_files = sorted(glob.glob(os.path.join(LISTS_DIR, "*.list")))
+
+    with instrument.stage("counties.plan"):
+        for list_path in list_files:
+            user_name = os.path.splitext(os.path.basename(list_path))[0]
+            user_dir = os.path.join(OUTPUT_ROOT, user_name)
 
-                rows.append((county, total, matched, pct, completed, missing))
+            previous = manifest["users"].get(user_name, {})
+            list_fp = file_fingerprint(list_path, previous.get("list"))
+            can_diff = not rebuild_all and "list" in previous and os.path.isdir(user_dir)
+
+            if can_diff and same_content(previous.get("list"), list_fp):
+                plan.append((user_name, list_fp, previous, None))
+                continue
+
+            plan.append((user_name, list_fp, previous, len(tasks)))
+            tasks.append((user_name, list_path, load_entries(user_name, previous.get("list")) if can_diff else None))
+
+    results = []
+    if tasks:
+        if county_tables is None:
+            with instrument.stage("counties.load"):
+                county_tables = load_county_tables()
+
+        with instrument.stage("counties.parse"):
+            for user_name, list_path, previous_entries in tasks:
+                with instrument.user("counties.parse", user_name):
+                    entries, _ = read_list(list_path)
+                    pairs = completed_pairs(entries)
+
+                if previous_entries is not None:
+                    previous_pairs = {(region.upper(), route.upper()) for region, route, _ in previous_entries}
+                    regions_to_write = affected_regions(previous_pairs ^ pairs)
+                else:
+                    regions_to_write = None
+
+                results.append({
+                    "entries": pack_entries(listed_routes(entries)),
+                    "pairs": pairs,
+                    "regions_to_write": regions_to_write,
+                })
+
+        with instrument.stage("counties.score"):
+            # Only score the states some user actually needs rewritten
+            if any(result["regions_to_write"] is None for result in results):
+                regions = None
+            else:
+                regions = set().union(*(result["regions_to_write"] for result in results))
+
+            scores = build_county_tables(
+                county_tables,
+                [(task[0], result["pairs"]) for task, result in zip(tasks, results)],
+                regions=regions
+            )
+
+            user_tasks = []
+            for row, (task, result) in enumerate(zip(tasks, results)):
+                regions_to_write = result["regions_to_write"]
+                user_tasks.append((task[0], {
+                    region: per_user[row]
+                    for region, per_user in scores["states"].items()
+                    if regions_to_write is None or region in regions_to_write
+                }))
+
+        with instrument.stage("counties.write"):
+            written = parallel.map_users(build_user_counties, user_tasks, jobs=jobs, shared=county_tables)
+
+        for result, paths in zip(results, written):
+            result["written"] = paths
+
+    for user_name, list_fp, previous, task_index in plan:
+        if task_index is None:
+            users[user_name] = {**previous, "list": list_fp}
+            print(f"Skipping user: {user_name} (unchanged)")
+            continue
+
+        result = results[task_index]
+        save_entries(user_name, list_fp, result["entries"])
+        users[user_name] = {"list": list_fp}
+        print(f"Processing user: {user_name}")
 
-            rows.sort(key=lambda r: r[3], reverse=True)
+    manifest["data"] = data_sources
+    manifest["users"] = users
+    save_manifest("validate_counties", manifest)
 
-            write_state_html(user_dir, user_name, region, rows)
+    print(render.stats_line())
 
 
 if __name__ == "__main__":
-    validate_counties()
+    parser = argparse.ArgumentParser(description="Write per-state county completion pages.")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only rebuild users whose .list file changed since the last run"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="build users in N worker processes"
+    )
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    instrument.start(args)
+    validate_counties(incremental=args.incremental, jobs=args.jobs)
+    instrument.finish(args.timings)
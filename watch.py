@@ -0,0 +1,181 @@
+import io
+import os
+import re
+import glob
+import time
+import argparse
+import traceback
+from contextlib import redirect_stdout
+
+import build
+import per_system_pages
+from photodata_snapshot import photodata_sources, invalidate_snapshot
+
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LIST_DIR = os.path.join(BASE_DIR, "list_files")
+
+POLL_INTERVAL = 0.5
+
+# The "nothing to do" lines the scripts print for every unchanged user
+SKIP_LINE = re.compile(
+    r"^User: .* \(unchanged, skipped\)$"
+    r"|^⏭ "
+    r"|^Skipping user: .* \(unchanged\)$"
+    r"|^==== .* ====$"
+)
+
+
+def stat_files(paths):
+    """
+    Returns:
+      path -> (mtime_ns, size) for every path that exists
+    """
+    stats = {}
+
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stats[path] = (stat.st_mtime_ns, stat.st_size)
+
+    return stats
+
+
+def changed_paths(old, new):
+    return sorted(
+        (old.keys() ^ new.keys())
+        | {path for path in old.keys() & new.keys() if old[path] != new[path]}
+    )
+
+
+def list_stats():
+    return stat_files(glob.glob(os.path.join(LIST_DIR, "*.list")))
+
+
+def run_build(stages, catalogs, jobs, pages_format, gzip):
+    """
+    Runs an incremental build with the in-memory catalogs, echoing only
+    what was rebuilt.
+    """
+    start = time.perf_counter()
+    out = io.StringIO()
+
+    try:
+        with redirect_stdout(out):
+            build.build(
+                stages=stages,
+                incremental=True,
+                jobs=jobs,
+                pages_format=pages_format,
+                gzip=gzip,
+                catalogs=catalogs
+            )
+    except Exception:
+        # Keep watching: the next save (e.g. fixing a broken CSV) retries
+        print(out.getvalue())
+        traceback.print_exc()
+        return
+
+    for line in out.getvalue().splitlines():
+        if line.strip() and not SKIP_LINE.search(line):
+            print(line)
+
+    print(f"✅ done in {time.perf_counter() - start:.2f}s")
+
+
+def watch(
+    stages=build.DEFAULT_STAGES,
+    interval=POLL_INTERVAL,
+    jobs=1,
+    pages_format="html",
+    gzip=False
+):
+    """
+    Polls list_files/*.list and the PhotoData CSVs, rebuilding incrementally
+    after every change. PhotoData catalogs stay loaded between builds and
+    are only reloaded when PhotoData itself changes, so a saved .list file
+    costs one user's rebuild.
+    """
+    lists = list_stats()
+    photodata = stat_files(photodata_sources())
+
+    print("📚 Loading PhotoData catalogs")
+    catalogs = build.load_catalogs(stages)
+    run_build(stages, catalogs, jobs, pages_format, gzip)
+
+    print(f"👀 Watching {LIST_DIR} and PhotoData (Ctrl+C to stop)")
+
+    try:
+        while True:
+            time.sleep(interval)
+
+            new_lists = list_stats()
+            new_photodata = stat_files(photodata_sources())
+
+            changed_lists = changed_paths(lists, new_lists)
+            changed_data = changed_paths(photodata, new_photodata)
+
+            if not changed_lists and not changed_data:
+                continue
+
+            lists, photodata = new_lists, new_photodata
+
+            if changed_data:
+                print(f"🔄 PhotoData changed ({len(changed_data)} files), reloading catalogs")
+                invalidate_snapshot()
+                per_system_pages.reload_fullnames()
+                catalogs = build.load_catalogs(stages)
+
+            for path in changed_lists:
+                print(f"✏️  {os.path.relpath(path, BASE_DIR)}")
+
+            run_build(stages, catalogs, jobs, pages_format, gzip)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped watching")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild pages whenever a .list file or PhotoData changes.")
+    parser.add_argument(
+        "--stages",
+        type=build.parse_stages,
+        default=list(build.DEFAULT_STAGES),
+        help=f"comma-separated stages to run, from {','.join(build.STAGES)} "
+             f"(default: {','.join(build.DEFAULT_STAGES)})"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=POLL_INTERVAL,
+        metavar="SECONDS",
+        help=f"how often to check for changes (default: {POLL_INTERVAL})"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="build users in N worker processes"
+    )
+    parser.add_argument(
+        "--pages-format",
+        choices=["html", "json"],
+        default="html",
+        help="output of the pages stage (see per_system_pages.py --format)"
+    )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="gzip the JSON payloads (with --pages-format json)"
+    )
+    args = parser.parse_args()
+
+    watch(
+        stages=args.stages,
+        interval=args.interval,
+        jobs=args.jobs,
+        pages_format=args.pages_format,
+        gzip=args.gzip
+    )